@@ -1,5 +1,11 @@
 import streamlit as st
 
+from jobdata import refresher
+
+
+# Keep the shared jobdata snapshot fresh in the background (started once per process)
+refresher.start()
+
 
 # ---- PAGE SETUP ------
 
@@ -0,0 +1,17 @@
+"""Shared data access for the yourfirstdatajob pages.
+
+Every page imports its dataset from here instead of talking to S3 itself, so
+a jobdata snapshot is downloaded and decoded once per server process.
+"""
+from jobdata.loader import (
+    get_latest_file, load_cooccurrence, load_cube, load_data, load_distribution_sketches, load_geo, load_hexbins,
+    load_kpis, load_model_from_s3, load_rollups, load_salary_histogram, load_skill_index,
+)
+from jobdata.preprocess import RECENT_POSTINGS
+from jobdata.skills import PLATFORM_COLUMNS, SKILLS_COLUMNS
+
+__all__ = [
+    'get_latest_file', 'load_cooccurrence', 'load_cube', 'load_data', 'load_distribution_sketches', 'load_geo',
+    'load_hexbins', 'load_kpis', 'load_model_from_s3', 'load_rollups', 'load_salary_histogram', 'load_skill_index',
+    'PLATFORM_COLUMNS', 'RECENT_POSTINGS', 'SKILLS_COLUMNS',
+]
@@ -0,0 +1,53 @@
+"""Exact box plot statistics of the statistics page.
+
+``px.box`` ships every sample to the browser, where plotly.js sorts them to
+find each box. ``summarize`` computes the same numbers server-side (plotly's
+default "linear" quartiles and its 1.5 IQR whisker rule), so the page can draw
+``go.Box`` traces from a handful of values per group. The page reads them
+from the mergeable sketches of ``jobdata.sketches``, laid out the same way;
+``build`` is the exact reference they are checked against.
+"""
+import numpy as np
+import pandas as pd
+
+
+STATISTICS = ['q1', 'median', 'q3', 'lowerfence', 'upperfence', 'mean', 'count']
+
+
+def _box(values):
+    # plotly.js: quartiles interpolate at position p * n - 0.5 ("hazen"),
+    # whiskers end at the furthest samples within 1.5 IQR of the box
+    values = np.sort(values)
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75], method='hazen')
+    iqr = q3 - q1
+    low = values[min(np.searchsorted(values, q1 - 1.5 * iqr, side='left'), len(values) - 1)]
+    high = values[max(np.searchsorted(values, q3 + 1.5 * iqr, side='right') - 1, 0)]
+    return [q1, median, q3, min(q1, low), max(q3, high), values.mean(), len(values)]
+
+
+def summarize(values, groups):
+    """Box statistics of ``values`` per group, one row per group in order of
+    first appearance (the order plotly places categories in). Missing values
+    are left out, like plotly does."""
+    frame = pd.DataFrame({'group': groups, 'value': values}).dropna(subset=['value'])
+    rows = {
+        group: _box(part.to_numpy(np.float64))
+        for group, part in frame.groupby('group', sort=False, observed=True)['value']
+    }
+    summary = pd.DataFrame.from_dict(rows, orient='index', columns=STATISTICS)
+    summary['count'] = summary['count'].astype(np.int64)
+    return summary
+
+
+def build(data):
+    """Statistics of the three box plots of analysis_statistics.py, from a
+    prepared frame: experience and salary per job category and salary per
+    year of experience, over postings with a salary in range (and some
+    experience, for the experience boxes)."""
+    in_range = data[data['salary_in_range']]
+    with_experience = in_range[in_range['experience_years'] > 0]
+    return {
+        'experience_by_category': summarize(with_experience['experience_years'], with_experience['job_category']),
+        'salary_by_category': summarize(in_range['avg_salary_rounded'], in_range['job_category']),
+        'salary_by_experience': summarize(with_experience['avg_salary_rounded'], with_experience['experience_years']),
+    }
@@ -0,0 +1,53 @@
+import os
+
+from dotenv import load_dotenv
+
+
+# Load environment variables from .env
+load_dotenv('../.env')
+
+# Access the environment variables
+AWS_ACCESS_KEY = os.getenv('AWS_ACCESS_KEY')
+AWS_SECRET_KEY = os.getenv('AWS_SECRET_KEY')
+BUCKET_NAME = os.getenv('BUCKET_NAME')
+FILE_PREFIX = os.getenv('FILE_PREFIX')
+S3_MODEL_PATH = os.getenv('S3_MODEL_PATH')
+
+# Local disk cache of downloaded jobdata files
+CACHE_DIR = os.path.expanduser(os.getenv('JOBDATA_CACHE_DIR', '~/.cache/yourfirstdatajob'))
+CACHE_MAX_BYTES = int(os.getenv('JOBDATA_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+CACHE_MAX_AGE_DAYS = float(os.getenv('JOBDATA_CACHE_MAX_AGE_DAYS', 30))
+
+# How long the bucket listing is trusted before looking for new files
+LISTING_TTL_SECONDS = float(os.getenv('JOBDATA_LISTING_TTL_SECONDS', 300))
+
+# Size of the chunks an S3 body is streamed to disk with
+DOWNLOAD_CHUNK_BYTES = int(os.getenv('JOBDATA_DOWNLOAD_CHUNK_BYTES', 8 * 1024 ** 2))
+
+# Objects at least this big are fetched as parallel byte ranges
+DOWNLOAD_PART_BYTES = int(os.getenv('JOBDATA_DOWNLOAD_PART_BYTES', 16 * 1024 ** 2))
+DOWNLOAD_CONCURRENCY = int(os.getenv('JOBDATA_DOWNLOAD_CONCURRENCY', 8))
+DOWNLOAD_THRESHOLD_BYTES = int(os.getenv('JOBDATA_DOWNLOAD_THRESHOLD_BYTES', 2 * DOWNLOAD_PART_BYTES))
+DOWNLOAD_RETRIES = int(os.getenv('JOBDATA_DOWNLOAD_RETRIES', 3))
+
+# Postings extracted up to this day are dated by their creation date, later
+# ones by the day they were extracted (see preprocess.effective_date)
+EFFECTIVE_DATE_CUTOVER = os.getenv('JOBDATA_EFFECTIVE_DATE_CUTOVER', '2024-11-04')
+
+# How often the background refresher looks for a new jobdata file
+REFRESH_INTERVAL_SECONDS = float(os.getenv('JOBDATA_REFRESH_INTERVAL_SECONDS', 300))
+
+# Where jobdata files come from: 's3' (the bucket above) or 'local', a folder
+# laid out like the bucket (FILE_PREFIX and S3_MODEL_PATH are relative to it)
+STORAGE_BACKEND = os.getenv('JOBDATA_STORAGE', 's3')
+LOCAL_DATA_DIR = os.path.expanduser(os.getenv('JOBDATA_LOCAL_DIR', 'data'))
+
+# Shared S3 client tuning
+S3_MAX_POOL_CONNECTIONS = int(os.getenv('JOBDATA_S3_MAX_POOL_CONNECTIONS', 32))
+S3_CONNECT_TIMEOUT = float(os.getenv('JOBDATA_S3_CONNECT_TIMEOUT', 5))
+S3_READ_TIMEOUT = float(os.getenv('JOBDATA_S3_READ_TIMEOUT', 60))
+S3_MAX_ATTEMPTS = int(os.getenv('JOBDATA_S3_MAX_ATTEMPTS', 5))
+S3_METRICS = os.getenv('JOBDATA_S3_METRICS', '0') == '1'
+
+# Print the memory saved by the dtype compaction of each snapshot projection
+DTYPE_REPORT = os.getenv('JOBDATA_DTYPE_REPORT', '0') == '1'
@@ -0,0 +1,97 @@
+"""Skill co-occurrence counts and phi correlations.
+
+The correlation section used to build a float64 DataFrame of the top skills
+and call ``.corr()`` on every rerun. For 0/1 flags, the Pearson correlation
+of two skills is their phi coefficient, which only needs four counts: the
+number of postings, how many ask for each skill and how many ask for both.
+``build`` gets every pairwise count at once from the packed skill bits
+(one AND + popcount per pair of 64-row words), once per snapshot; any top-k
+slice or threshold is then a lookup in a 63 x 63 matrix.
+
+Counts are additive over rows, so ``extend`` folds in appended rows (e.g. a
+new day's postings) without recounting the ones already seen.
+"""
+import numpy as np
+import pandas as pd
+
+from jobdata.skills import MASK_COLUMNS, SKILLS_COLUMNS, query_mask
+
+
+class Cooccurrence:
+    """Pairwise skill counts over ``n_rows`` postings.
+
+    ``counts[i, j]`` is the number of postings asking for both
+    ``columns[i]`` and ``columns[j]``; the diagonal holds each skill's count.
+    """
+
+    def __init__(self, counts, n_rows, columns=SKILLS_COLUMNS):
+        self.counts = counts
+        self.n_rows = n_rows
+        self.columns = list(columns)
+
+    def __add__(self, other):
+        return Cooccurrence(self.counts + other.counts, self.n_rows + other.n_rows, self.columns)
+
+    def extend(self, data):
+        """Counts over these rows plus the rows of ``data``."""
+        return self + build(data)
+
+    def skill_counts(self):
+        return pd.Series(np.diag(self.counts), index=self.columns)
+
+    def phi(self, names=None):
+        """Phi correlations (the Pearson correlation of the 0/1 flags) between
+        ``names`` (default: every skill), as a DataFrame. NaN for skills
+        asked for by every posting or by none."""
+        names = self.columns if names is None else list(names)
+        positions = [self.columns.index(name) for name in names]
+        both = self.counts[np.ix_(positions, positions)]
+        single = np.diag(both).astype(np.float64)
+        n = self.n_rows
+        # All integers up to n**2: exact in float64
+        covariance = n * both - np.outer(single, single)
+        spread = single * (n - single)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            phi = covariance / np.sqrt(np.outer(spread, spread))
+        return pd.DataFrame(phi, index=names, columns=names)
+
+    def strong_pairs(self, names, above, below):
+        """Pairs of ``names`` whose correlation is above ``above`` or below
+        ``below``, each pair once (first skill sorting before the second), in
+        the order of ``names``."""
+        phi = self.phi(names).to_numpy()
+        first, second = np.meshgrid(np.arange(len(names)), np.arange(len(names)), indexing='ij')
+        labels = np.array(names, dtype=object)
+        keep = ((phi > above) | (phi < below)) & (labels[first] < labels[second])
+        return pd.DataFrame({
+            'Skill 1': labels[first][keep],
+            'Skill 2': labels[second][keep],
+            'Correlation': phi[keep],
+        })
+
+
+def _packed_flags(data):
+    # One row of uint64 words per skill, bit r set when row r has the skill
+    words = [data[column].to_numpy() for column in MASK_COLUMNS]
+    n_words = (len(data) + 63) // 64
+    packed = np.empty((len(SKILLS_COLUMNS), n_words), dtype=np.uint64)
+    for i, name in enumerate(SKILLS_COLUMNS):
+        word, bits = next((w, bits) for w, bits in enumerate(query_mask([name])) if bits)
+        flags = (words[word] & bits) != 0
+        row = np.zeros(n_words * 64, dtype=bool)
+        row[:len(flags)] = flags
+        packed[i] = np.packbits(row, bitorder='little').view('<u8')
+    return packed
+
+
+def build(data):
+    """Count skill co-occurrences in a prepared frame (from its
+    ``skill_bits_*`` columns)."""
+    packed = _packed_flags(data)
+    k = len(SKILLS_COLUMNS)
+    counts = np.zeros((k, k), dtype=np.int64)
+    for i in range(k):
+        both = np.bitwise_count(packed[i] & packed[i:]).sum(axis=1, dtype=np.int64)
+        counts[i, i:] = both
+        counts[i:, i] = both
+    return Cooccurrence(counts, len(data))
@@ -0,0 +1,248 @@
+"""Materialized aggregates of a jobdata snapshot.
+
+Almost every chart in the app is a count, sum or mean over a handful of
+dimensions. ``build`` computes those once from the prepared snapshot and the
+result is stored next to the parquet file as a small ``.cube.parquet``
+artifact, so page renders read a few thousand pre-aggregated rows instead of
+scanning every posting.
+
+Each aggregate keeps ``year`` among its dimensions and only stores additive
+measures (counts and sums), so any filter on its dimensions followed by a
+roll-up is exact: ``Cube.query('postings', by=['job_category'],
+filters=RECENT_POSTINGS)`` gives the same counts as a ``value_counts`` over
+the filtered rows.
+
+``jobdata.rebuild_cube`` rebuilds the cube of a jobdata file by hand.
+"""
+import hashlib
+import operator
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from jobdata.skills import PLATFORM_COLUMNS, SKILLS_COLUMNS, any_of
+
+
+SUFFIX = '.cube.parquet'
+
+# name: (dimensions, measures)
+AGGREGATES = {
+    # KPIs, category counts, salary and experience by category
+    'postings': (
+        ['year', 'job_category', 'experience_years', 'salary_in_range'],
+        ['jobs', 'with_experience', 'with_skill', 'with_platform',
+         'salary_sum', 'salary_n', 'rounded_salary_sum', 'rounded_salary_n'],
+    ),
+    # Jobs per day and category, by effective date
+    'postings_by_day': (['year', 'job_category', 'effective_date'], ['jobs']),
+    # Postings asking for each skill, per creation day
+    'skills_by_day': (['year', 'salary_in_range', 'date_creation', 'skill'], ['jobs']),
+    # Postings asking for each skill, with their salary and experience
+    'skills_by_category': (
+        ['year', 'job_category', 'salary_in_range', 'skill'],
+        ['jobs', 'salary_sum', 'salary_n', 'avg_experience_sum'],
+    ),
+    'company_fields': (['year', 'month', 'job_category', 'company_field'], ['jobs']),
+    'locations': (['year', 'latitude', 'longitude'], ['jobs']),
+}
+
+_OPERATORS = {
+    '=': operator.eq, '==': operator.eq, '!=': operator.ne,
+    '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+}
+
+
+class Cube:
+    """The aggregates of one snapshot, as small DataFrames."""
+
+    def __init__(self, tables, last_extracted_date=None):
+        self.tables = tables
+        self.last_extracted_date = last_extracted_date
+
+    def query(self, name, by=None, filters=None, dropna=True):
+        """Roll aggregate ``name`` up to the ``by`` dimensions.
+
+        ``filters`` uses the parquet filter syntax (a list of
+        ``(column, op, value)`` tuples, all of which must hold) on the
+        aggregate's dimensions. Returns the summed measures indexed by ``by``,
+        or a Series of grand totals when ``by`` is None. Like a pandas
+        groupby, rows with a missing ``by`` value are left out unless
+        ``dropna`` is False.
+        """
+        table = self.tables[name]
+        if filters:
+            table = table[filter_mask(table, filters)]
+        measures = AGGREGATES[name][1]
+        if by is None:
+            # object dtype, so counts stay integers next to the float sums
+            return pd.Series({name: table[name].sum() for name in measures}, dtype=object)
+        return table.groupby(by, dropna=dropna)[measures].sum()
+
+    def skill_counts(self, filters=None, columns=SKILLS_COLUMNS):
+        """Postings asking for each skill, as a Series in ``columns`` order
+        (what ``data[columns].sum()`` gives on the rows)."""
+        counts = self.query('skills_by_category', by=['skill'], filters=filters)['jobs']
+        return counts.reindex(columns, fill_value=0).rename_axis(None)
+
+    def skills_over_time(self, freq, filters=None, columns=SKILLS_COLUMNS):
+        """Postings asking for each skill per ``freq`` period of their creation
+        date, one column per skill.
+
+        Periods span the days on which at least one of ``columns`` was asked
+        for, as a ``pd.Grouper`` over the matching postings would.
+        """
+        filters = list(filters or []) + [('skill', 'in', list(columns))]
+        daily = self.query('skills_by_day', by=['date_creation', 'skill'], filters=filters)['jobs']
+        if daily.empty:
+            return pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], name='date_creation'))
+        daily = daily.unstack('skill', fill_value=0).reindex(columns=columns, fill_value=0)
+        daily.columns.name = None
+        return daily.groupby(pd.Grouper(freq=freq)).sum()
+
+
+def filter_mask(table, filters):
+    """Mask of the rows of ``table`` matching every filter (parquet filter
+    syntax)."""
+    mask = np.ones(len(table), dtype=bool)
+    for column, op, value in filters:
+        if op == 'in':
+            mask &= table[column].isin(value).to_numpy()
+        elif op == 'not in':
+            mask &= ~table[column].isin(value).to_numpy()
+        else:
+            mask &= _OPERATORS[op](table[column], value).to_numpy()
+    return mask
+
+
+def _dimensions(data, dims):
+    # Categoricals go back to plain values: the cube is written per aggregate
+    # and its tables are small
+    return [
+        data[d].astype(object) if isinstance(data[d].dtype, pd.CategoricalDtype) else data[d]
+        for d in dims
+    ]
+
+
+def _group(data, dims, measures):
+    keys = _dimensions(data, dims)
+    return pd.DataFrame(measures, index=data.index).groupby(keys, dropna=False).sum().reset_index()
+
+
+def _by_skill(data, dims, weights):
+    # One bincount per skill and measure over the group codes, instead of
+    # materializing a weighted copy of the whole (rows x skills) matrix
+    grouped = pd.DataFrame(index=data.index).groupby(_dimensions(data, dims), dropna=False)
+    codes = grouped.ngroup().to_numpy()
+    keys = grouped.size().index.to_frame(index=False)
+    n_groups = len(keys)
+
+    flags = data[SKILLS_COLUMNS].to_numpy()
+    parts = []
+    for i, skill in enumerate(SKILLS_COLUMNS):
+        flag = flags[:, i]
+        part = keys.copy()
+        part['skill'] = skill
+        part['jobs'] = np.bincount(codes, weights=flag, minlength=n_groups).astype(np.int64)
+        for name, values in weights.items():
+            sums = np.bincount(codes, weights=flag * values, minlength=n_groups)
+            part[name] = sums.astype(np.int64) if values.dtype == bool else sums
+        parts.append(part[part['jobs'] > 0])
+    return pd.concat(parts, ignore_index=True)
+
+
+def build(data):
+    """Compute every aggregate from a full, prepared snapshot frame."""
+    salary = data['avg_salary'].astype(np.float64)
+    rounded = data['avg_salary_rounded'].astype(np.float64)
+    tables = {}
+
+    tables['postings'] = _group(data, AGGREGATES['postings'][0], {
+        'jobs': np.ones(len(data), dtype=np.int64),
+        'with_experience': (data['experience_bool'] != 'N').astype(np.int64),
+        'with_skill': any_of(data, SKILLS_COLUMNS).astype(np.int64),
+        'with_platform': any_of(data, PLATFORM_COLUMNS).astype(np.int64),
+        'salary_sum': salary.fillna(0),
+        'salary_n': salary.notnull().astype(np.int64),
+        'rounded_salary_sum': rounded.fillna(0),
+        'rounded_salary_n': rounded.notnull().astype(np.int64),
+    })
+    for name in ('postings_by_day', 'company_fields', 'locations'):
+        tables[name] = _group(data, AGGREGATES[name][0], {'jobs': np.ones(len(data), dtype=np.int64)})
+
+    tables['skills_by_day'] = _by_skill(data, ['year', 'salary_in_range', 'date_creation'], {})
+    tables['skills_by_category'] = _by_skill(data, ['year', 'job_category', 'salary_in_range'], {
+        'salary_sum': salary.fillna(0).to_numpy(),
+        'salary_n': salary.notnull().to_numpy(),
+        'avg_experience_sum': data['avg_experience'].to_numpy(np.float64),
+    })
+    return Cube(tables, data['extracted_date'].max())
+
+
+def fingerprint(path):
+    """MD5 of a file's content, recorded in the cube built from it."""
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(8 * 1024 ** 2), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write(cube, path, source):
+    tables = []
+    for name, table in cube.tables.items():
+        table = pa.Table.from_pandas(table, preserve_index=False)
+        tables.append(table.append_column('aggregate', pa.array([name] * len(table), pa.string())))
+    table = pa.concat_tables(tables, promote_options='default')
+
+    last = cube.last_extracted_date
+    table = table.replace_schema_metadata({
+        'jobdata.source_md5': source,
+        'jobdata.last_extracted_date': '' if pd.isna(last) else last.isoformat(),
+    })
+    # Write next to the target and rename, so readers never see half a file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    os.close(fd)
+    try:
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read(path, source=None):
+    """Load a cube file; None if it is missing or was built from another
+    version of the source file than ``source`` (an MD5)."""
+    try:
+        table = pq.read_table(path)
+    except (OSError, pa.ArrowInvalid):
+        return None
+    meta = table.schema.metadata or {}
+    if source is not None and meta.get(b'jobdata.source_md5', b'').decode() != source:
+        return None
+
+    tables = {}
+    for name, (dims, measures) in AGGREGATES.items():
+        part = table.filter(pc.equal(table['aggregate'], name))
+        tables[name] = part.select(dims + measures).to_pandas()
+    last = meta.get(b'jobdata.last_extracted_date', b'').decode()
+    return Cube(tables, pd.Timestamp(last) if last else pd.NaT)
+
+
+def load(path, read_frame):
+    """Return the cube of the jobdata file at ``path``, building it (from
+    ``read_frame()``) and storing it next to the file if it is missing or
+    stale."""
+    source = fingerprint(path)
+    cube = read(path + SUFFIX, source)
+    if cube is None:
+        cube = build(read_frame())
+        write(cube, path + SUFFIX, source)
+    return cube
+
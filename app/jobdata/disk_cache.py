@@ -0,0 +1,126 @@
+"""Persistent local copies of jobdata files, validated against their S3 ETag.
+
+Each cached object is stored as ``<CACHE_DIR>/<name>`` next to a small
+``<name>.json`` sidecar holding the S3 key and ETag it was downloaded with.
+A restart (or a new replica pointing at the same directory) revalidates the
+copy with a conditional HeadObject (If-None-Match) and only pulls the body
+again when the object changed in the bucket. Files derived from a cached copy
+(its ``<name>.cube.parquet``) live next to it and are evicted with it.
+"""
+import json
+import os
+import tempfile
+import time
+
+from jobdata import download
+from jobdata.cube import SUFFIX as CUBE_SUFFIX
+from jobdata.config import CACHE_DIR, CACHE_MAX_AGE_DAYS, CACHE_MAX_BYTES
+from jobdata.storage import get_storage
+from jobdata.singleflight import SingleFlight
+
+
+_flights = SingleFlight()
+# (key, path) of the last copy validated against the bucket. The current
+# snapshot is read once per projection; only the first read pays the
+# HeadObject, the next ones reuse the copy until another key is fetched.
+_validated = (None, None)
+
+
+def _local_path(key):
+    return os.path.join(CACHE_DIR, key.replace('/', '__'))
+
+
+def _read_meta(path):
+    try:
+        with open(path + '.json') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_atomic(path, write):
+    # Write next to the target and rename, so readers never see half a file
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def fetch(key):
+    """Return the path of an up-to-date local copy of ``key``."""
+    # Checked before joining the flight and again inside it, like
+    # loader._once: a reader that missed the validated copy while the leader
+    # was fetching, but only reaches the flight once it is over, reuses it
+    def validated():
+        validated_key, path = _validated
+        return path if validated_key == key and os.path.exists(path) else None
+
+    def run():
+        global _validated
+        path = validated()
+        if path is None:
+            path = _fetch(key)
+            _validated = (key, path)
+        return path
+
+    path = validated()
+    if path is not None:
+        return path
+    # Concurrent readers of different projections of one file share a download
+    return _flights.do(key, run)
+
+
+def _fetch(key):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _local_path(key)
+    meta = _read_meta(path)
+
+    storage = get_storage()
+    known_etag = meta['etag'] if meta and os.path.exists(path) else None
+
+    head = storage.head(key, if_none_match=known_etag)
+    if head is None:
+        # Local copy is still current: bump its mtime for the LRU eviction
+        os.utime(path)
+        return path
+
+    etag = head['etag']
+    _write_atomic(path, lambda f: download.download(storage, key, f, head['size'], etag))
+    meta = {'key': key, 'etag': etag, 'size': os.path.getsize(path)}
+    _write_atomic(path + '.json', lambda f: f.write(json.dumps(meta).encode()))
+
+    evict(keep=path)
+    return path
+
+
+def evict(keep=None):
+    """Drop cached files older than the age limit, then the least recently
+    used ones until the directory fits in the size budget."""
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        path = os.path.join(CACHE_DIR, name)
+        if name.endswith(('.json', '.tmp', CUBE_SUFFIX)) or not os.path.isfile(path):
+            continue
+        stat = os.stat(path)
+        # An entry's sidecar and derived cube count toward the budget too
+        size = stat.st_size + sum(
+            os.path.getsize(p) for p in (path + '.json', path + CUBE_SUFFIX) if os.path.exists(p)
+        )
+        entries.append((stat.st_mtime, size, path))
+
+    max_age = CACHE_MAX_AGE_DAYS * 24 * 3600
+    now = time.time()
+    total = sum(size for _, size, _ in entries)
+    for mtime, size, path in sorted(entries):
+        if path == keep:
+            continue
+        if now - mtime > max_age or total > CACHE_MAX_BYTES:
+            for p in (path, path + '.json', path + CUBE_SUFFIX):
+                if os.path.exists(p):
+                    os.remove(p)
+            total -= size
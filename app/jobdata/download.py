@@ -0,0 +1,82 @@
+"""Copying S3 objects to local files without holding them in memory.
+
+Small objects are streamed with a single GET. Large ones are split into
+byte ranges fetched in parallel on a thread pool, each range written at its
+own offset in the target file and retried independently.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+from jobdata.config import (
+    DOWNLOAD_CHUNK_BYTES, DOWNLOAD_CONCURRENCY, DOWNLOAD_PART_BYTES, DOWNLOAD_RETRIES, DOWNLOAD_THRESHOLD_BYTES
+)
+from jobdata.storage import ObjectChangedError
+
+
+def stream_to_file(body, f, chunk_size=DOWNLOAD_CHUNK_BYTES):
+    """Copy a streaming S3 body into the open file ``f`` chunk by chunk.
+
+    Only one chunk is in memory at a time, instead of the whole object as
+    with ``body.read()``. Returns the number of bytes written.
+    """
+    written = 0
+    for chunk in body.iter_chunks(chunk_size):
+        f.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def _is_retryable(error):
+    if isinstance(error, ClientError):
+        code = error.response.get('Error', {}).get('Code')
+        return code not in ('NoSuchKey', 'AccessDenied')
+    return True
+
+
+def _fetch_range(storage, key, fd, start, end, etag, retries):
+    for attempt in range(retries + 1):
+        try:
+            body = storage.get_range(key, start, end, if_match=etag)
+            offset = start
+            for chunk in body.iter_chunks(DOWNLOAD_CHUNK_BYTES):
+                os.pwrite(fd, chunk, offset)
+                offset += len(chunk)
+            if offset != end + 1:
+                raise IOError(f"Short read for {key} bytes {start}-{end}: got {offset - start} bytes")
+            return end - start + 1
+        except ObjectChangedError:
+            # The object changed under us: retrying the range cannot help
+            raise
+        except (BotoCoreError, ClientError, IOError) as e:
+            if attempt == retries or not _is_retryable(e):
+                raise
+            time.sleep(0.2 * 2 ** attempt)
+
+
+def download_ranges(storage, key, f, size, etag=None,
+                    part_size=DOWNLOAD_PART_BYTES, concurrency=DOWNLOAD_CONCURRENCY, retries=DOWNLOAD_RETRIES):
+    """Fetch ``size`` bytes of ``key`` into ``f`` as parallel ranged GETs.
+
+    Passing the ``etag`` from a previous HeadObject pins every range to the
+    same version of the object. Returns the number of bytes written.
+    """
+    f.truncate(size)
+    f.flush()
+    fd = f.fileno()
+    ranges = [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [
+            pool.submit(_fetch_range, storage, key, fd, start, end, etag, retries)
+            for start, end in ranges
+        ]
+        return sum(future.result() for future in futures)
+
+
+def download(storage, key, f, size, etag=None):
+    """Copy ``key`` into ``f``, in parallel ranges when it is large enough."""
+    if size >= DOWNLOAD_THRESHOLD_BYTES:
+        return download_ranges(storage, key, f, size, etag)
+    return stream_to_file(storage.get(key, if_match=etag), f)
@@ -0,0 +1,290 @@
+"""Job location counts on a grid pyramid, for maps drawn at any zoom.
+
+The location maps used to group the postings by exact coordinates on every
+rerun and send each distinct point to ``px.scatter_mapbox``, so the payload
+grew with the number of places. ``build`` instead counts the postings of a
+snapshot projection once, on square screen cells of ``CELL_PIXELS`` pixels
+at every web-map zoom level from ``MIN_ZOOM`` to ``MAX_ZOOM``: each level
+halves the cells of the one below it. A map drawn at zoom z reads level z and
+gets at most one marker per cell of its viewport, whatever the number of
+postings; the marker sits at the mean position of the postings it counts (so
+a cell holding a single place shows it where it is).
+
+For density maps, ``build_hexbins`` counts the postings on a grid of
+hexagons ``HEX_PIXELS`` wide at a given zoom (its resolution), indexed in
+axial coordinates on the same Web Mercator plane, so hexagons look regular
+on the map.
+
+Counts are kept per job_category, year, month and salary bucket (the buckets
+of ``jobdata.kpis``), so the market page filters apply to the map too.
+"""
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from jobdata.kpis import SALARY_STEP, bucket_range, salary_buckets, salary_edges
+
+
+MIN_ZOOM = 2
+# Cells of about 3 km at the finest level; deeper zooms read that level
+MAX_ZOOM = 8
+# Side of a grid cell on screen; map tiles are 256 pixels wide
+CELL_PIXELS = 8
+TILE_PIXELS = 256
+# Distance between opposite corners of a hexagon on screen
+HEX_PIXELS = 16
+
+# Web-map projections stop at +-85.05 degrees of latitude
+_MAX_LATITUDE = 85.05112878
+
+DIMENSIONS = ['job_category', 'year', 'month']
+
+
+def _mercator(latitude, longitude):
+    # Web Mercator position, both coordinates in [0, 1] from the top left
+    latitude = np.radians(np.clip(latitude, -_MAX_LATITUDE, _MAX_LATITUDE))
+    x = (longitude + 180) / 360
+    y = (1 - np.log(np.tan(latitude) + 1 / np.cos(latitude)) / np.pi) / 2
+    return x, y
+
+
+def _geographic(x, y):
+    # Inverse of _mercator
+    return np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * y)))), x * 360 - 180
+
+
+def _cells(latitude, longitude, zoom):
+    # Grid coordinates of cells of CELL_PIXELS at ``zoom``
+    cells_per_side = (TILE_PIXELS // CELL_PIXELS) << zoom
+    to_cell = lambda position: np.clip((position * cells_per_side).astype(np.int64), 0, cells_per_side - 1)
+    x, y = _mercator(latitude, longitude)
+    return to_cell(x).astype(np.int16), to_cell(y).astype(np.int16)
+
+
+def _hex_size(resolution):
+    # Centre-to-corner distance of the hexagons, in Mercator units
+    return HEX_PIXELS / 2 / (TILE_PIXELS << resolution)
+
+
+def _hexagons(latitude, longitude, resolution):
+    """Axial coordinates (q, r) of the pointy-top hexagon holding each
+    position."""
+    size = _hex_size(resolution)
+    x, y = _mercator(latitude, longitude)
+    q = (np.sqrt(3) / 3 * x - y / 3) / size
+    r = (2 / 3 * y) / size
+    # Round in cube coordinates (q + r + s = 0), fixing the component that
+    # moved the most
+    s = -q - r
+    rounded_q, rounded_r, rounded_s = np.round(q), np.round(r), np.round(s)
+    moved_q, moved_r, moved_s = np.abs(rounded_q - q), np.abs(rounded_r - r), np.abs(rounded_s - s)
+    fix_q = (moved_q > moved_r) & (moved_q > moved_s)
+    fix_r = ~fix_q & (moved_r > moved_s)
+    rounded_q = np.where(fix_q, -rounded_r - rounded_s, rounded_q)
+    rounded_r = np.where(fix_r, -rounded_q - rounded_s, rounded_r)
+    return rounded_q.astype(np.int32), rounded_r.astype(np.int32)
+
+
+def _hexagon_centres(q, r, resolution):
+    size = _hex_size(resolution)
+    return size * np.sqrt(3) * (q + r / 2), size * 3 / 2 * r
+
+
+def _summed(level, keys):
+    # Cells with the same keys merged: jobs added, positions averaged
+    weights = level['jobs'].to_numpy(np.float64)
+    level = level.assign(
+        latitude=level['latitude'].to_numpy(np.float64) * weights,
+        longitude=level['longitude'].to_numpy(np.float64) * weights,
+    )
+    summed = level.groupby(keys, sort=False)[['jobs', 'latitude', 'longitude']].sum()
+    summed['latitude'] /= summed['jobs']
+    summed['longitude'] /= summed['jobs']
+    return summed.reset_index()
+
+
+def _combinations(dimensions, selections):
+    # Mask over filter combination codes matching every selection
+    allowed = np.ones([len(dimensions[name]) + 1 for name in DIMENSIONS], dtype=bool)
+    for axis, (name, value) in enumerate(zip(DIMENSIONS, selections)):
+        if value is not None:
+            keep = np.zeros(allowed.shape[axis], dtype=bool)
+            if value in dimensions[name]:
+                keep[dimensions[name].index(value)] = True
+            allowed &= np.expand_dims(keep, [other for other in range(allowed.ndim) if other != axis])
+    return allowed.ravel()
+
+
+def _matching(table, dimensions, edges, selections, salary_range):
+    # Mask of the rows of ``table`` matching the filters of a query
+    low, high = bucket_range(edges, salary_range)
+    bucket = table['bucket'].to_numpy()
+    mask = (bucket >= low) & (bucket <= high)
+    if selections != (None, None, None):
+        mask &= _combinations(dimensions, selections)[table['combination'].to_numpy()]
+    return mask
+
+
+class GeoPyramid:
+    """Postings per grid cell and filter combination, at every zoom level of
+    one snapshot projection."""
+
+    def __init__(self, levels, dimensions, edges, salary_top):
+        # ``levels[zoom]``: DataFrame of the cell (x, y), the filter
+        # combination (one code for job_category, year and month), the salary
+        # bucket, the number of postings and their mean latitude and longitude
+        self.levels = levels
+        # Values of each filter dimension, in order of appearance; codes of
+        # a dimension are their positions, then one for missing values
+        self.dimensions = dimensions
+        self.edges = edges
+        self.salary_top = salary_top
+
+    def query(self, zoom, job_category=None, year=None, month=None, salary_range=None):
+        """Markers of the postings matching every given filter (None: all),
+        at map zoom ``zoom``: a DataFrame of latitude, longitude and
+        job_count, one row per non-empty cell.
+
+        ``salary_range`` keeps postings whose average salary lies in the
+        inclusive ``(low, high)`` range, as ``KpiStore.query`` does.
+        """
+        level = self.levels[min(max(int(zoom), MIN_ZOOM), MAX_ZOOM)]
+        mask = _matching(level, self.dimensions, self.edges, (job_category, year, month), salary_range)
+        cells = _summed(level[mask], ['x', 'y'])
+        return pd.DataFrame({
+            # The float32 positions, to about a metre
+            'latitude': cells['latitude'].round(5),
+            'longitude': cells['longitude'].round(5),
+            'job_count': cells['jobs'],
+        })
+
+    @property
+    def nbytes(self):
+        return sum(int(level.memory_usage(index=False).sum()) for level in self.levels.values())
+
+
+class HexBins:
+    """Postings per hexagon and filter combination of one snapshot
+    projection, at one resolution (a map zoom)."""
+
+    def __init__(self, bins, resolution, dimensions, edges, salary_top):
+        # DataFrame of the hexagon (q, r), the filter combination, the salary
+        # bucket and the number of postings (see ``GeoPyramid``)
+        self.bins = bins
+        self.resolution = resolution
+        self.dimensions = dimensions
+        self.edges = edges
+        self.salary_top = salary_top
+
+    def query(self, job_category=None, year=None, month=None, salary_range=None):
+        """Hexagons holding postings that match every given filter (see
+        ``GeoPyramid.query``): a DataFrame of hexagon id ("q,r"), the
+        latitude and longitude of its centre and job_count."""
+        mask = _matching(self.bins, self.dimensions, self.edges, (job_category, year, month), salary_range)
+        counts = self.bins[mask].groupby(['q', 'r'])['jobs'].sum().reset_index()
+        q, r = counts['q'].to_numpy(), counts['r'].to_numpy()
+        latitude, longitude = _geographic(*_hexagon_centres(q, r, self.resolution))
+        return pd.DataFrame({
+            'hexagon': [f"{a},{b}" for a, b in zip(q.tolist(), r.tolist())],
+            'latitude': latitude.round(5),
+            'longitude': longitude.round(5),
+            'job_count': counts['jobs'],
+        })
+
+    def geojson(self, hexagons):
+        """GeoJSON outlines of ``hexagons`` (as returned by ``query``), with
+        the hexagon ids as feature ids (for ``px.choropleth_mapbox``)."""
+        axial = np.array([hexagon.split(',') for hexagon in hexagons['hexagon']], dtype=np.int64).reshape(-1, 2)
+        x, y = _hexagon_centres(axial[:, 0], axial[:, 1], self.resolution)
+        # Pointy-top corners, the first one repeated to close each ring
+        angles = np.radians(30 + 60 * np.arange(7))
+        size = _hex_size(self.resolution)
+        latitude, longitude = _geographic(x[:, None] + size * np.cos(angles), y[:, None] + size * np.sin(angles))
+        corners = np.stack([longitude, latitude], axis=2).round(5).tolist()
+        return {
+            'type': 'FeatureCollection',
+            'features': [
+                {'type': 'Feature', 'id': hexagon, 'properties': {},
+                 'geometry': {'type': 'Polygon', 'coordinates': [ring]}}
+                for hexagon, ring in zip(hexagons['hexagon'], corners)
+            ],
+        }
+
+    def figure(self, hexagons, zoom):
+        """Density map of ``hexagons`` (as returned by ``query``) at map zoom
+        ``zoom``: each hexagon shaded by the number of jobs it holds."""
+        fig = px.choropleth_mapbox(
+            hexagons,
+            geojson=self.geojson(hexagons),
+            locations='hexagon',
+            color='job_count',
+            color_continuous_scale='Viridis',
+            opacity=0.6,
+            center=dict(lat=hexagons['latitude'].mean(), lon=hexagons['longitude'].mean()) if len(hexagons) else None,
+            zoom=zoom,
+            mapbox_style='carto-positron',
+        )
+        fig.update_traces(marker_line_width=0)
+        return fig
+
+    @property
+    def nbytes(self):
+        return int(self.bins.memory_usage(index=False).sum())
+
+
+def _postings(data, step):
+    # Located postings of a prepared frame with their filter combination and
+    # salary bucket, and what the codes stand for
+    located = (data['latitude'].notna() & data['longitude'].notna()).to_numpy()
+    salary = data['avg_salary'].to_numpy(np.float64) if 'avg_salary' in data.columns else np.full(len(data), np.nan)
+    salary_top, edges = salary_edges(salary, step)
+
+    codes = []
+    dimensions = {}
+    for name in DIMENSIONS:
+        if name in data.columns:
+            dimension_codes, uniques = pd.factorize(data[name].to_numpy()[located])
+            dimensions[name] = uniques.tolist()
+        else:
+            dimension_codes, dimensions[name] = np.full(located.sum(), -1), []
+        # Missing values take the slot after the last value
+        codes.append(np.where(dimension_codes < 0, len(dimensions[name]), dimension_codes))
+    shape = [len(dimensions[name]) + 1 for name in DIMENSIONS]
+
+    postings = pd.DataFrame({
+        'latitude': data['latitude'].to_numpy(np.float64)[located],
+        'longitude': data['longitude'].to_numpy(np.float64)[located],
+        'combination': np.ravel_multi_index(codes, shape).astype(np.int32),
+        'bucket': salary_buckets(salary[located], edges).astype(np.int16),
+    })
+    return postings, dimensions, edges, salary_top
+
+
+def _compact(level):
+    return level.astype({'jobs': np.int32, 'latitude': np.float32, 'longitude': np.float32})
+
+
+def build(data, step=SALARY_STEP):
+    """Count the postings of a prepared frame with latitude and longitude
+    (and job_category, year, month and avg_salary, when present, to filter
+    on) on every zoom level."""
+    postings, dimensions, edges, salary_top = _postings(data, step)
+    x, y = _cells(postings['latitude'].to_numpy(), postings['longitude'].to_numpy(), MAX_ZOOM)
+    level = postings.assign(x=x, y=y, jobs=1)
+
+    # Each level merges the cells of the one below it, two by two on each side
+    keys = ['x', 'y', 'combination', 'bucket']
+    levels = {}
+    for zoom in range(MAX_ZOOM, MIN_ZOOM - 1, -1):
+        level = levels[zoom] = _compact(_summed(level, keys))
+        level = level.assign(x=level['x'].to_numpy() >> 1, y=level['y'].to_numpy() >> 1)
+    return GeoPyramid(levels, dimensions, edges, salary_top)
+
+
+def build_hexbins(data, resolution, step=SALARY_STEP):
+    """Count the postings of a prepared frame (as for ``build``) on the
+    hexagons of map zoom ``resolution``."""
+    postings, dimensions, edges, salary_top = _postings(data, step)
+    q, r = _hexagons(postings['latitude'].to_numpy(), postings['longitude'].to_numpy(), resolution)
+    bins = postings.assign(q=q, r=r).groupby(['q', 'r', 'combination', 'bucket'], sort=False).size()
+    return HexBins(bins.astype(np.int32).reset_index(name='jobs'), resolution, dimensions, edges, salary_top)
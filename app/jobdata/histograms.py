@@ -0,0 +1,42 @@
+"""Salary histograms over fixed bins, for any selection of rows.
+
+The impostor section of the home page used to send every matching posting to
+``px.histogram`` on each interaction, binned in the browser. Here each
+posting's salary bin is computed once per snapshot projection; the histogram
+of a selection (a ``RowSet`` from ``jobdata.skill_index``) is a ``bincount``
+of those bins, and the page draws the resulting bar heights.
+
+Bins are ``BIN_WIDTH`` euros wide, starting at 0.
+"""
+import numpy as np
+import pandas as pd
+
+
+BIN_WIDTH = 2000
+
+
+class SalaryHistogram:
+    """Salary bin of every row of one projection (-1: no salary)."""
+
+    def __init__(self, bins, n_bins, width=BIN_WIDTH):
+        self.bins = bins
+        self.n_bins = n_bins
+        self.width = width
+
+    def counts(self, rows):
+        """Postings per salary bin among ``rows`` (a ``RowSet``), as a Series
+        indexed by the lower edge of each bin."""
+        bins = self.bins[rows.to_array()]
+        counts = np.bincount(bins[bins >= 0], minlength=self.n_bins)
+        return pd.Series(counts, index=np.arange(self.n_bins) * self.width, name='count')
+
+
+def build(data, width=BIN_WIDTH):
+    """Bin the ``avg_salary`` of a prepared frame (negative salaries count as
+    missing)."""
+    salary = data['avg_salary'].to_numpy(np.float64)
+    known = salary >= 0
+    bins = np.full(len(salary), -1, dtype=np.int32)
+    bins[known] = (salary[known] // width).astype(np.int32)
+    n_bins = int(bins.max()) + 1 if known.any() else 0
+    return SalaryHistogram(bins, n_bins, width)
@@ -0,0 +1,194 @@
+"""Pre-aggregated KPIs for any (category, year, month, salary range) filter.
+
+The filter panel of the market page used to re-filter the rows and recompute
+its KPIs on every widget change. ``build`` instead sums the rows once into a
+dense array of cells over (job_category, year, month, salary bucket), each
+holding the counts, sums, min/max and contract-type counts the KPIs need.
+Every dimension has an extra slot holding its total ("All"), and the additive
+measures are stored as running sums along the salary buckets, so a query reads
+two cells per measure whatever the number of rows; min/max scan the salary
+buckets of a single (category, year, month) cell.
+
+Salary buckets are split on the values the page's slider can take (multiples
+of ``SALARY_STEP`` up to the top salary), with a bucket of their own for
+postings exactly on an edge, so an inclusive ``[low, high]`` range selects
+whole buckets and the results are exact. Means are exact float64 means of the
+(float32) columns.
+"""
+import numpy as np
+import pandas as pd
+
+from jobdata.preprocess import MAX_SALARY_LIMIT
+
+
+# Step of the salary slider on the market page
+SALARY_STEP = 5000
+
+_ADDITIVE = ['jobs', 'experience_sum', 'experience_n', 'salary_sum', 'salary_n']
+
+
+class KpiStore:
+    """KPIs of one projection of a snapshot, for any filter combination."""
+
+    def __init__(self, dimensions, edges, sums, salary_min, salary_max, contract_types, salary_top):
+        self.dimensions = dimensions
+        self.edges = edges
+        self.sums = sums
+        self.salary_min = salary_min
+        self.salary_max = salary_max
+        self.contract_types = contract_types
+        # Highest average salary under MAX_SALARY_LIMIT, as a whole number
+        # (the upper end of the slider)
+        self.salary_top = salary_top
+
+    def options(self, name):
+        """Distinct values of dimension ``name``, in order of appearance (as
+        ``data[name].unique().tolist()``)."""
+        return self.dimensions[name][0]
+
+    def _slot(self, name, value):
+        values, slots = self.dimensions[name]
+        if value is None:
+            return len(slots) + 1
+        return slots.get(value)
+
+    def query(self, job_category=None, year=None, month=None, salary_range=None):
+        """KPIs of the postings matching every given filter (None: all).
+
+        ``salary_range`` keeps postings whose average salary lies in the
+        inclusive ``(low, high)`` range. Returns a dict with ``jobs``,
+        ``average_experience`` (over postings with experience > 0),
+        ``average_salary`` / ``min_salary`` / ``max_salary`` (over salaries in
+        (0, MAX_SALARY_LIMIT)), each 0 when there is nothing to average, and
+        ``contract_counts``, non-zero contract-type counts sorted like a
+        ``value_counts``.
+        """
+        low, high = bucket_range(self.edges, salary_range)
+        cell = tuple(self._slot(name, value) for name, value in
+                     (('job_category', job_category), ('year', year), ('month', month)))
+        if None in cell:
+            # A value the snapshot does not have
+            totals = np.zeros(self.sums.shape[0])
+            minimum = maximum = np.nan
+        else:
+            running = self.sums[(slice(None),) + cell]
+            totals = running[:, high + 1] - running[:, low]
+            minimum = self.salary_min[cell][low:high + 1].min()
+            maximum = self.salary_max[cell][low:high + 1].max()
+
+        measures = dict(zip(_ADDITIVE, totals))
+        contract_counts = pd.Series(
+            totals[len(_ADDITIVE):].round().astype(np.int64), index=self.contract_types, name='count'
+        )
+        contract_counts = contract_counts[contract_counts > 0].sort_values(ascending=False, kind='stable')
+        has_salary = measures['salary_n'] > 0
+        return {
+            'jobs': int(round(measures['jobs'])),
+            'average_experience': (
+                measures['experience_sum'] / measures['experience_n'] if measures['experience_n'] > 0 else 0
+            ),
+            'average_salary': measures['salary_sum'] / measures['salary_n'] if has_salary else 0,
+            'min_salary': minimum if has_salary else 0,
+            'max_salary': maximum if has_salary else 0,
+            'contract_counts': contract_counts,
+        }
+
+
+def salary_edges(salary, step=SALARY_STEP):
+    """The top salary (highest under MAX_SALARY_LIMIT, as a whole number) and
+    the salary bucket edges: multiples of ``step`` up to it, then itself."""
+    in_limit = salary[salary < MAX_SALARY_LIMIT]
+    salary_top = int(in_limit.max()) if len(in_limit) else 0
+    return salary_top, np.unique(np.append(np.arange(0, salary_top + 1, step), salary_top)).astype(np.float64)
+
+
+def salary_buckets(salary, edges):
+    """Bucket code of each salary: 1 + 2i for salaries equal to edges[i],
+    2 + 2i for those strictly between edges[i] and edges[i + 1], 0 for
+    missing or negative salaries."""
+    position = np.searchsorted(edges, salary, side='right') - 1
+    on_edge = edges[np.clip(position, 0, None)] == salary
+    return np.where(np.isnan(salary) | (position < 0), 0, 2 + 2 * position - on_edge)
+
+
+def bucket_range(edges, salary_range):
+    """Inclusive ``(low, high)`` salary range as an inclusive range of
+    bucket codes (None: every bucket, missing salaries included). Raises
+    ValueError for a bound that is not an edge."""
+    if salary_range is None:
+        return 0, 2 * len(edges)
+    low, high = salary_range
+    positions = np.searchsorted(edges, [low, high])
+    for bound, position in zip((low, high), positions):
+        if position == len(edges) or edges[position] != bound:
+            raise ValueError(f"salary bound {bound} is not a multiple of {SALARY_STEP} or the top salary")
+    return 1 + 2 * positions[0], 1 + 2 * positions[1]
+
+
+def _factorize(column):
+    # Codes of a dimension: its values in order of appearance, then one slot
+    # for missing values and one for the total
+    values = column.unique().tolist()
+    codes, uniques = pd.factorize(column)
+    codes = np.where(codes < 0, len(uniques), codes)
+    return codes, len(uniques) + 2, (values, {value: i for i, value in enumerate(uniques.tolist())})
+
+
+def _with_totals(array, axes, reduce):
+    # Write the reduction over the other slots of each axis into its last slot
+    for axis in axes:
+        index = [slice(None)] * array.ndim
+        index[axis] = slice(0, -1)
+        total = reduce(array[tuple(index)], axis=axis)
+        index[axis] = -1
+        array[tuple(index)] = total
+    return array
+
+
+def build(data, step=SALARY_STEP):
+    """Build the ``KpiStore`` of a prepared frame with the job_category,
+    year, month, avg_salary, experience and contract_type columns."""
+    salary = data['avg_salary'].to_numpy()
+    salary_top, edges = salary_edges(salary, step)
+    bucket = salary_buckets(salary, edges)
+    n_buckets = 2 * len(edges) + 1
+
+    dimensions = {}
+    codes = []
+    shape = []
+    for name in ('job_category', 'year', 'month'):
+        dim_codes, size, dimensions[name] = _factorize(data[name])
+        codes.append(dim_codes)
+        shape.append(size)
+    cell = np.ravel_multi_index(codes + [bucket], shape + [n_buckets])
+    n_cells = int(np.prod(shape)) * n_buckets
+
+    experience = data['experience'].to_numpy(np.float64)
+    has_experience = experience > 0
+    salary_kpi = (salary > 0) & (salary < MAX_SALARY_LIMIT)
+    contract_codes, contract_types = pd.factorize(data['contract_type'])
+    contract_types = contract_types.tolist()
+
+    weights = [
+        None,
+        np.where(has_experience, experience, 0),
+        has_experience,
+        np.where(salary_kpi, salary.astype(np.float64), 0),
+        salary_kpi,
+    ] + [contract_codes == i for i in range(len(contract_types))]
+    sums = np.stack([
+        np.bincount(cell, weights=w, minlength=n_cells).reshape(shape + [n_buckets]) for w in weights
+    ])
+    sums = _with_totals(sums, (1, 2, 3), np.sum)
+    # Running sums along the salary buckets, with a leading 0
+    sums = np.concatenate([np.zeros(sums.shape[:-1] + (1,)), np.cumsum(sums, axis=-1)], axis=-1)
+
+    extremes = pd.Series(salary[salary_kpi]).groupby(cell[salary_kpi]).agg(['min', 'max'])
+    salary_min = np.full(n_cells, np.inf, dtype=salary.dtype)
+    salary_max = np.full(n_cells, -np.inf, dtype=salary.dtype)
+    salary_min[extremes.index] = extremes['min']
+    salary_max[extremes.index] = extremes['max']
+    salary_min = _with_totals(salary_min.reshape(shape + [n_buckets]), (0, 1, 2), np.min)
+    salary_max = _with_totals(salary_max.reshape(shape + [n_buckets]), (0, 1, 2), np.max)
+
+    return KpiStore(dimensions, edges, sums, salary_min, salary_max, contract_types, salary_top)
@@ -0,0 +1,58 @@
+"""Manifest of the jobdata files available in the bucket.
+
+The first lookup pages through the whole prefix; after that the manifest is
+only refreshed once LISTING_TTL_SECONDS have passed, and then only for keys
+after the latest file already known (daily files sort by name), so resolving the
+latest snapshot is a dict lookup on the hot path.
+"""
+import re
+import threading
+import time
+
+from jobdata.config import FILE_PREFIX, LISTING_TTL_SECONDS
+from jobdata.singleflight import SingleFlight
+from jobdata.storage import get_storage
+
+
+date_pattern = re.compile(r'jobdata_(\d{8})\.parquet')
+
+_lock = threading.Lock()
+_flights = SingleFlight()
+_files_by_date = {}
+_latest_date = None
+_refreshed_at = None
+
+
+def refresh():
+    """Add the jobdata files listed after the latest known one to the manifest."""
+    # Callers that find the manifest stale at the same time share one listing
+    _flights.do('refresh', _refresh)
+
+
+def _refresh():
+    global _latest_date, _refreshed_at
+    with _lock:
+        start_after = _files_by_date[_latest_date] if _latest_date else None
+        for key in get_storage().list(FILE_PREFIX, start_after):
+            match = date_pattern.search(key)
+            if not key.endswith('.parquet') or not match:
+                continue
+            date = match.group(1)
+            _files_by_date[date] = key
+            if _latest_date is None or date > _latest_date:
+                _latest_date = date
+        _refreshed_at = time.monotonic()
+
+
+def latest_key():
+    """Return the S3 key of the most recent jobdata file."""
+    _refresh_if_stale()
+    with _lock:
+        if _latest_date is None:
+            raise FileNotFoundError(f"No jobdata_YYYYMMDD.parquet file under {get_storage().describe(FILE_PREFIX)}")
+        return _files_by_date[_latest_date]
+
+
+def _refresh_if_stale():
+    if _refreshed_at is None or time.monotonic() - _refreshed_at > LISTING_TTL_SECONDS:
+        refresh()
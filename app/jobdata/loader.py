@@ -0,0 +1,337 @@
+import threading
+from functools import partial
+from io import BytesIO
+
+import joblib
+import pandas as pd
+import pyarrow.parquet as pq
+
+from jobdata import (
+    cooccurrence, cube, disk_cache, geo, histograms, kpis, listing, preprocess, rollups, sketches, skill_index, skills,
+)
+from jobdata.config import DTYPE_REPORT, S3_MODEL_PATH
+from jobdata.singleflight import SingleFlight
+from jobdata.storage import get_storage
+
+
+# Process-wide cache of decoded snapshots. Streamlit imports this module once
+# per server process, so every session and every page reads from the same
+# object. ``_current`` only ever holds one jobdata version: its S3 key, the
+# frames read from it (one DataFrame per column/filter projection), the arguments each projection was read with, its aggregate
+# cube and the time series rolled up from it once a page asked for them and
+# the structures derived from its frames (with how to rebuild them). Swapping
+# versions replaces the whole dict.
+def _new_snapshot(key, **parts):
+    return dict({
+        'key': key, 'frames': {}, 'projections': {}, 'cube': None, 'rollups': None, 'derived': {}, 'derivations': {},
+    }, **parts)
+
+
+_current = _new_snapshot(None)
+_datasets_lock = threading.Lock()
+_flights = SingleFlight()
+
+# Set by the background refresher: requests then use the published snapshot
+# and never list the bucket themselves
+_serve_published = False
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_latest_file():
+    # Resolved from the cached bucket manifest, not a fresh listing per rerun
+    return listing.latest_key()
+
+
+def read_frame(path, columns=None, filters=None):
+    """Read a local jobdata file into a DataFrame.
+
+    ``columns`` and ``filters`` are pushed down into the parquet reader:
+    unused columns are never decoded, and row groups whose statistics cannot
+    match the filters (e.g. ``[('year', '>', 2023)]``) are skipped. The file
+    is memory-mapped, so the reader decodes straight from the page cache
+    instead of a second in-memory copy of the raw bytes.
+
+    Skill columns come back as 0/1 uint8 instead of 'Y'/'N', plus the
+    ``skill_bits_*`` bitmask columns, then the whole frame goes through
+    ``preprocess.prepare`` and ``preprocess.compact``. The intermediate
+    ``SkillMatrix`` is not kept: the frame holds the same flags.
+    """
+    table = pq.read_table(path, columns=columns, filters=filters, memory_map=True)
+    matrix = skills.decode(table)
+
+    data = table.drop_columns(matrix.columns).to_pandas()
+    flags = pd.DataFrame(matrix.values, columns=matrix.columns, index=data.index)
+    data = pd.concat([data, flags], axis=1)
+    # Keep the column order of the file
+    data = data[[name for name in table.column_names if name in data.columns]]
+    if matrix.columns:
+        # Packed copy of the flags for skills.any_of / all_of / count_of;
+        # as columns, they follow whatever row filtering a page applies
+        bits = matrix.pack()
+        for i, name in enumerate(skills.MASK_COLUMNS):
+            data[name] = bits[:, i]
+    data = preprocess.prepare(data)
+
+    report = preprocess.compact(data)
+    if DTYPE_REPORT:
+        saved = report['saved'].sum()
+        print(f"{path} columns={columns} filters={filters}: dtypes saved {saved / 1024 ** 2:.1f} MiB")
+        print(report.to_string())
+    return data
+
+
+def read_snapshot(key, columns=None, filters=None):
+    """Read a jobdata file through the local cache (see ``read_frame``)."""
+    return read_frame(disk_cache.fetch(key), columns, filters)
+
+
+def read_cube(key):
+    """Return the aggregate cube of a jobdata file, built on first use and
+    kept next to its local copy."""
+    path = disk_cache.fetch(key)
+    return cube.load(path, lambda: read_frame(path))
+
+
+def _freeze(value):
+    # Turn column lists and (nested) filter lists into a hashable cache key
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _read_shared(key, columns, filters):
+    # Concurrent readers of the same projection share a single read
+    frame_key = (_freeze(columns), _freeze(filters))
+    return _flights.do((key, frame_key), lambda: read_snapshot(key, columns, filters))
+
+
+def _once(flight_key, cached, load, store):
+    # ``cached()`` (None on a miss) is checked before joining the flight and
+    # again inside it, and the leader ``store``s its result before the flight
+    # ends: a caller that missed the cache while the leader was loading, but
+    # only reaches the flight once it is over, finds the result instead of
+    # loading it again. ``store`` returns the value kept; it runs once more
+    # after the flight for results of a flight started by swap_snapshot.
+    value = cached()
+    if value is not None:
+        return value
+
+    def run():
+        value = cached()
+        return store(load()) if value is None else value
+
+    return store(_flights.do(flight_key, run))
+
+
+def _frame(snapshot, columns, filters):
+    frame_key = (_freeze(columns), _freeze(filters))
+
+    def cached():
+        with _datasets_lock:
+            return snapshot['frames'].get(frame_key)
+
+    def store(data):
+        with _datasets_lock:
+            snapshot['projections'][frame_key] = (columns, filters)
+            return snapshot['frames'].setdefault(frame_key, data)
+
+    load = lambda: read_snapshot(snapshot['key'], columns, filters)
+    return _once((snapshot['key'], frame_key), cached, load, store)
+
+
+def _snapshot(key):
+    global _current
+    with _datasets_lock:
+        if _current['key'] != key:
+            _current = _new_snapshot(key)
+        return _current
+
+
+def _cube(snapshot):
+    def cached():
+        with _datasets_lock:
+            return snapshot['cube']
+
+    def store(data_cube):
+        with _datasets_lock:
+            if snapshot['cube'] is None:
+                snapshot['cube'] = data_cube
+            return snapshot['cube']
+
+    key = snapshot['key']
+    return _once((key, 'cube'), cached, lambda: read_cube(key), store)
+
+
+def _rollups(snapshot):
+    def cached():
+        with _datasets_lock:
+            return snapshot['rollups']
+
+    def store(data_rollups):
+        with _datasets_lock:
+            if snapshot['rollups'] is None:
+                snapshot['rollups'] = data_rollups
+            return snapshot['rollups']
+
+    load = lambda: rollups.build(_cube(snapshot))
+    return _once((snapshot['key'], 'rollups'), cached, load, store)
+
+
+def _derived(snapshot, name, columns, filters, build):
+    # ``build(data)`` over a projection, computed once per snapshot
+    derived_key = (name, _freeze(columns), _freeze(filters))
+
+    def cached():
+        with _datasets_lock:
+            return snapshot['derived'].get(derived_key)
+
+    def store(value):
+        with _datasets_lock:
+            snapshot['derivations'][derived_key] = (columns, filters, build)
+            return snapshot['derived'].setdefault(derived_key, value)
+
+    load = lambda: build(_frame(snapshot, columns, filters))
+    return _once((snapshot['key'], derived_key), cached, load, store)
+
+
+def swap_snapshot(key):
+    """Make ``key`` the current snapshot, fully loaded before it is visible.
+
+    Every projection pages asked for on the previous version (and the cube,
+    its rollups and derived structures, if they were used) is read from the
+    new file first;
+    only then is the shared reference replaced, in a single assignment.
+    Requests in flight keep the frames they already hold.
+    """
+    global _current
+    with _datasets_lock:
+        if _current['key'] == key:
+            return
+        projections = dict(_current['projections']) or {(None, None): (None, None)}
+        had_cube = _current['cube'] is not None
+        had_rollups = _current['rollups'] is not None
+        derivations = dict(_current['derivations'])
+    frames = {
+        frame_key: _read_shared(key, columns, filters)
+        for frame_key, (columns, filters) in projections.items()
+    }
+    data_cube = _flights.do((key, 'cube'), lambda: read_cube(key)) if had_cube else None
+    data_rollups = rollups.build(data_cube) if had_rollups else None
+    derived = {
+        derived_key: build(frames[(_freeze(columns), _freeze(filters))])
+        for derived_key, (columns, filters, build) in derivations.items()
+    }
+    with _datasets_lock:
+        _current = _new_snapshot(
+            key, frames=frames, projections=projections, cube=data_cube, rollups=data_rollups, derived=derived,
+            derivations=derivations,
+        )
+
+
+def current_key():
+    # S3 key of the snapshot currently held in memory, if any
+    return _current['key']
+
+
+def serve_published(enabled=True):
+    global _serve_published
+    _serve_published = enabled
+
+
+def _published():
+    snapshot = _current
+    if _serve_published and snapshot['key']:
+        # The refresher keeps this up to date: no listing on the request path
+        return snapshot
+    return _snapshot(get_latest_file())
+
+
+def load_data(columns=None, filters=None):
+    data = _frame(_published(), columns, filters)
+    # A shallow copy: no data is copied, but columns a page adds or replaces
+    # stay out of the shared snapshot
+    return data.copy(deep=False)
+
+
+def load_cube():
+    """Return the aggregate cube (see ``jobdata.cube``) of the current snapshot."""
+    return _cube(_published())
+
+
+def load_rollups():
+    """Return the time series rollups of the cube of the current snapshot: a
+    dict of ``Rollup`` per series family (see ``jobdata.rollups``)."""
+    return _rollups(_published())
+
+
+def load_kpis(columns=None, filters=None):
+    """Return the ``KpiStore`` (see ``jobdata.kpis``) of the same projection
+    ``load_data`` reads."""
+    return _derived(_published(), 'kpis', columns, filters, kpis.build)
+
+
+def load_geo(columns=None, filters=None):
+    """Return the ``GeoPyramid`` of job locations (see ``jobdata.geo``) of the
+    same projection ``load_data`` reads."""
+    return _derived(_published(), 'geo', columns, filters, geo.build)
+
+
+def load_hexbins(resolution, columns=None, filters=None):
+    """Return the ``HexBins`` of job locations at map zoom ``resolution``
+    (see ``jobdata.geo``) of the same projection ``load_data`` reads."""
+    build = partial(geo.build_hexbins, resolution=resolution)
+    return _derived(_published(), ('hexbins', resolution), columns, filters, build)
+
+
+def load_skill_index(columns=None, filters=None):
+    """Return the ``SkillIndex`` (see ``jobdata.skill_index``) of the same
+    projection ``load_data`` reads; its row positions index that frame."""
+    return _derived(_published(), 'skill_index', columns, filters, skill_index.build)
+
+
+def load_distribution_sketches(columns=None, filters=None):
+    """Return the salary and experience ``DistributionSketches`` (see
+    ``jobdata.sketches``) of the same projection ``load_data`` reads."""
+    return _derived(_published(), 'distribution_sketches', columns, filters, sketches.build)
+
+
+def load_cooccurrence(columns=None, filters=None):
+    """Return the skill ``Cooccurrence`` counts (see ``jobdata.cooccurrence``)
+    of the same projection ``load_data`` reads."""
+    return _derived(_published(), 'cooccurrence', columns, filters, cooccurrence.build)
+
+
+def load_salary_histogram(columns=None, filters=None):
+    """Return the ``SalaryHistogram`` (see ``jobdata.histograms``) of the
+    same projection ``load_data`` reads."""
+    return _derived(_published(), 'salary_histogram', columns, filters, histograms.build)
+
+
+def _download_model(key):
+    try:
+        # Download the model file from storage
+        model_data = get_storage().get(key).read()
+
+        # Load the model using joblib
+        return joblib.load(BytesIO(model_data))
+    except Exception as e:
+        print(f"Error loading model from S3: {e}")
+        return None
+
+
+def load_model_from_s3():
+    def cached():
+        with _models_lock:
+            return _models.get(S3_MODEL_PATH)
+
+    def store(model):
+        # A failed download is not kept: the next rerun tries again
+        if model is None:
+            return None
+        with _models_lock:
+            return _models.setdefault(S3_MODEL_PATH, model)
+
+    # Sessions opening the prediction page together share one download
+    return _once(('model', S3_MODEL_PATH), cached, lambda: _download_model(S3_MODEL_PATH), store)
@@ -0,0 +1,95 @@
+"""Canonical cleanup of a jobdata projection, run once per snapshot.
+
+Pages used to repeat the same cleanup on every rerun (date parsing, the
+experience cast, salary rounding and outlier masks), some of it with a Python
+call per row, and to write the results back into the frame they were given.
+``prepare`` does all of it once, vectorized, when a projection is read. The
+resulting frame is shared by every session: pages select from it and must not
+write to it (``load_data`` hands out shallow copies, so adding or replacing a
+column on the copy is fine).
+
+Each derived column is only added when the projection carries its inputs.
+Last, ``compact`` shrinks the frame: low-cardinality strings become
+categoricals and numbers get the narrowest dtype that holds them.
+"""
+import numpy as np
+import pandas as pd
+
+from jobdata.config import EFFECTIVE_DATE_CUTOVER
+
+
+# Pushed down into the parquet reader by the pages that only show the current
+# market: ``load_data(filters=RECENT_POSTINGS)``
+RECENT_POSTINGS = [('year', '>', 2023)]
+
+# Postings announcing a max salary outside (0, MAX_SALARY_LIMIT) are outliers
+MAX_SALARY_LIMIT = 300000
+
+# Low-cardinality strings, dictionary-encoded as categoricals
+CATEGORY_COLUMNS = ['job_category', 'contract_type', 'company_field', 'experience_bool']
+
+# Floats that do not need double precision (salaries are whole or half euros)
+FLOAT32_COLUMNS = ['min_salary', 'max_salary', 'avg_salary', 'avg_salary_rounded', 'experience']
+
+
+def effective_date(data, cutover=EFFECTIVE_DATE_CUTOVER):
+    """Date a posting counts for in the time series.
+
+    Before the cutover the extracts were not daily, so a posting is dated by
+    its creation date; from then on by the day it was extracted.
+    """
+    creation = pd.to_datetime(data['date_creation'], errors='coerce')
+    extracted = pd.to_datetime(data['extracted_date'], errors='coerce')
+    return creation.where(extracted <= pd.Timestamp(cutover), extracted)
+
+
+def prepare(data):
+    """Parse, derive and mask the columns of a freshly read projection.
+
+    - ``date_creation`` / ``extracted_date``: parsed to datetimes
+    - ``effective_date``: see ``effective_date``
+    - ``experience_years``: experience truncated to whole years, 0 if unknown
+    - ``avg_experience``: experience rounded to whole years, 0 if unknown
+    - ``avg_salary_rounded``: average salary rounded to the euro
+    - ``salary_in_range``: mask of postings whose max salary is not an outlier
+    """
+    columns = set(data.columns)
+    for name in ('date_creation', 'extracted_date'):
+        if name in columns:
+            data[name] = pd.to_datetime(data[name], errors='coerce')
+    if {'date_creation', 'extracted_date'} <= columns:
+        data['effective_date'] = effective_date(data)
+
+    if 'experience' in columns:
+        experience = data['experience'].fillna(0)
+        data['experience_years'] = experience.astype(int)
+        data['avg_experience'] = experience.round().astype(int)
+    if 'avg_salary' in columns:
+        data['avg_salary_rounded'] = data['avg_salary'].round()
+    if 'max_salary' in columns:
+        data['salary_in_range'] = (data['max_salary'] > 0) & (data['max_salary'] < MAX_SALARY_LIMIT)
+    return data
+
+
+def compact(data):
+    """Narrow the dtypes of ``data`` in place.
+
+    Integers (e.g. year, month, experience_years) are downcast to the smallest
+    type holding their range. Returns a report of the memory used by each
+    column that changed, in bytes: ``before``, ``after`` and ``saved``.
+    """
+    before = data.memory_usage(index=False, deep=True)
+    for name in data.columns:
+        dtype = data[name].dtype
+        if name in CATEGORY_COLUMNS and dtype == object:
+            data[name] = data[name].astype('category')
+        elif name in FLOAT32_COLUMNS and dtype == np.float64:
+            data[name] = data[name].astype(np.float32)
+        elif dtype in (np.int64, np.int32):
+            data[name] = pd.to_numeric(data[name], downcast='integer')
+    after = data.memory_usage(index=False, deep=True)
+
+    report = pd.DataFrame({'before': before, 'after': after})
+    report = report[report['before'] != report['after']]
+    report['saved'] = report['before'] - report['after']
+    return report.sort_values('saved', ascending=False)
@@ -0,0 +1,30 @@
+"""Rebuild the aggregate cube of a jobdata file (from the app/ folder)::
+
+    python -m jobdata.rebuild_cube path/to/jobdata_20250101.parquet
+
+Kept out of ``jobdata.cube``: the package imports that module, so running it
+with ``-m`` would execute a second copy of it as ``__main__``.
+"""
+import argparse
+import os
+
+from jobdata import cube
+from jobdata.loader import read_frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild the aggregate cube of a jobdata file.')
+    parser.add_argument('path', help='jobdata_YYYYMMDD.parquet file')
+    parser.add_argument('--output', help=f'cube file to write (default: <path>{cube.SUFFIX})')
+    args = parser.parse_args()
+
+    data = read_frame(args.path)
+    data_cube = cube.build(data)
+    output = args.output or args.path + cube.SUFFIX
+    cube.write(data_cube, output, cube.fingerprint(args.path))
+    rows = sum(len(table) for table in data_cube.tables.values())
+    print(f"{output}: {rows} rows, {os.path.getsize(output) / 1024:.0f} KiB")
+
+
+if __name__ == '__main__':
+    main()
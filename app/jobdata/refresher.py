@@ -0,0 +1,59 @@
+"""Background thread that keeps the shared snapshot up to date.
+
+Started once per server process from app.py. It polls the bucket for a newer
+jobdata_YYYYMMDD.parquet, downloads and loads it off the request path, and
+then swaps it in atomically (see ``loader.swap_snapshot``). Page reruns only
+ever read the snapshot that is already published.
+"""
+import threading
+
+from jobdata import listing, loader, s3
+from jobdata.config import REFRESH_INTERVAL_SECONDS, S3_METRICS
+
+
+_lock = threading.Lock()
+_thread = None
+_stop = threading.Event()
+
+
+def refresh_once():
+    """Publish the latest jobdata file if it is not the current one yet."""
+    listing.refresh()
+    key = listing.latest_key()
+    if key != loader.current_key():
+        loader.swap_snapshot(key)
+    return key
+
+
+def _run(interval):
+    while not _stop.is_set():
+        try:
+            refresh_once()
+        except Exception as e:
+            print(f"Error refreshing jobdata snapshot: {e}")
+        if S3_METRICS:
+            print(f"S3 client metrics: {s3.metrics()}")
+        _stop.wait(interval)
+
+
+def start(interval=REFRESH_INTERVAL_SECONDS):
+    """Start the refresher thread; later calls are no-ops."""
+    global _thread
+    with _lock:
+        if _thread is not None and _thread.is_alive():
+            return _thread
+        _stop.clear()
+        _thread = threading.Thread(target=_run, args=(interval,), name='jobdata-refresher', daemon=True)
+        _thread.start()
+        loader.serve_published(True)
+        return _thread
+
+
+def stop():
+    global _thread
+    with _lock:
+        _stop.set()
+        if _thread is not None:
+            _thread.join()
+        _thread = None
+        loader.serve_published(False)
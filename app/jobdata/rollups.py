@@ -0,0 +1,151 @@
+"""Time series of the cube at day, week and month grain.
+
+The time series charts used to roll the cube's daily counts up to weeks or
+months on every rerun (a ``pd.Grouper`` over the rows of ``postings_by_day``
+or ``skills_by_day``). ``build`` materializes them once per snapshot: each
+series family (jobs per job category, postings per skill) becomes a dense
+array of counts per filter combination, period and series, at every grain in
+``GRAINS``. A chart reads a slice of it.
+
+Filters on the family's other dimensions (year, salary_in_range) select
+filter combinations; filters on its date select a range of days, read from
+the materialized periods it covers whole plus the days of the periods it
+only covers in part, so any date range stays exact.
+"""
+import numpy as np
+import pandas as pd
+
+from jobdata.cube import AGGREGATES, filter_mask
+
+
+GRAINS = {'day': 'D', 'week': 'W-SUN', 'month': 'ME'}
+
+# name: (cube aggregate, date dimension, series dimension)
+FAMILIES = {
+    'jobs_by_category': ('postings_by_day', 'effective_date', 'job_category'),
+    'skills': ('skills_by_day', 'date_creation', 'skill'),
+}
+
+
+class Rollup:
+    """Counts of one series family per filter combination, period and series,
+    at every grain."""
+
+    def __init__(self, date, combinations, series, days, grains):
+        self.date = date
+        # DataFrame of the filter dimensions, one row per combination
+        self.combinations = combinations
+        self.series = series
+        # Every day from the first to the last of the snapshot
+        self.days = days
+        # grain: (period labels, period of each day, counts of shape
+        # (combinations, periods, series))
+        self.grains = grains
+
+    def _day_range(self, filters):
+        # Inclusive start, exclusive end of the days matching date filters
+        start, end = 0, len(self.days)
+        for _, op, value in filters:
+            value = pd.Timestamp(value)
+            if op in ('>=', '>'):
+                start = max(start, np.searchsorted(self.days, value, side='left' if op == '>=' else 'right'))
+            elif op in ('<=', '<'):
+                end = min(end, np.searchsorted(self.days, value, side='right' if op == '<=' else 'left'))
+            elif op in ('=', '=='):
+                start = max(start, np.searchsorted(self.days, value, side='left'))
+                end = min(end, np.searchsorted(self.days, value, side='right'))
+            else:
+                raise ValueError(f"unsupported filter on {self.date}: {op}")
+        return start, max(start, end)
+
+    def _counts(self, grain, start, end):
+        # Counts per period of ``grain`` over days [start, end): whole periods
+        # from their materialized counts, partial ones summed from the days
+        labels, period_of_day, counts = self.grains[grain]
+        _, _, daily = self.grains['day']
+        if start == end:
+            return labels[:0], counts[:, :0]
+        first, last = period_of_day[start], period_of_day[end - 1]
+        starts = np.searchsorted(period_of_day, np.arange(first, last + 1), side='left')
+        ends = np.searchsorted(period_of_day, np.arange(first, last + 1), side='right')
+        result = counts[:, first:last + 1].copy()
+        for position, (period_start, period_end) in [(0, (starts[0], ends[0])), (-1, (starts[-1], ends[-1]))]:
+            if period_start < start or period_end > end:
+                result[:, position] = daily[:, max(period_start, start):min(period_end, end)].sum(axis=1)
+        return labels[first:last + 1], result
+
+    def query(self, grain, filters=None, columns=None):
+        """Counts per ``grain`` period (see ``GRAINS``) of each series in
+        ``columns`` (default: all), one column per series, over the
+        combinations and days matching ``filters`` (parquet filter syntax).
+
+        Periods span the first to the last one with a count, as a
+        ``pd.Grouper`` over the matching rows of the cube would.
+        """
+        filters = list(filters or [])
+        date_filters = [f for f in filters if f[0] == self.date]
+        combination_filters = [f for f in filters if f[0] != self.date]
+        combinations = filter_mask(self.combinations, combination_filters)
+        labels, counts = self._counts(grain, *self._day_range(date_filters))
+
+        columns = self.series if columns is None else list(columns)
+        positions = [self.series.index(name) for name in columns if name in self.series]
+        selected = np.zeros((len(labels), len(columns)), dtype=np.int64)
+        present = [i for i, name in enumerate(columns) if name in self.series]
+        selected[:, present] = counts[combinations][:, :, positions].sum(axis=0)
+
+        # Trim the periods before the first and after the last count
+        nonzero = np.flatnonzero(selected.any(axis=1))
+        if not len(nonzero):
+            return pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], name=self.date), dtype=np.int64)
+        span = slice(nonzero[0], nonzero[-1] + 1)
+        return pd.DataFrame(selected[span], index=pd.DatetimeIndex(labels[span], name=self.date), columns=columns)
+
+    @property
+    def nbytes(self):
+        return sum(counts.nbytes for _, _, counts in self.grains.values())
+
+
+def _periods(days, freq):
+    # Labels of the ``freq`` periods covering ``days`` (their end for weeks
+    # and months, as pd.Grouper labels them) and the period of each day
+    if freq == 'D':
+        return days, np.arange(len(days))
+    labels = pd.Series(0, index=days).groupby(pd.Grouper(freq=freq)).sum().index
+    return labels, np.searchsorted(labels, days, side='left')
+
+
+def _rollup(table, date, series_name, dimensions):
+    # Like a groupby, rows without a date or series are left out
+    table = table[table[date].notna() & table[series_name].notna()]
+    if table.empty:
+        # No dated posting: every query answers an empty frame
+        days = pd.DatetimeIndex([])
+        counts = np.zeros((0, 0, 0), dtype=np.int64)
+        grains = {grain: (days, np.zeros(0, dtype=np.int64), counts) for grain in GRAINS}
+        return Rollup(date, pd.DataFrame(columns=dimensions), [], days, grains)
+    days = pd.date_range(table[date].min().normalize(), table[date].max().normalize(), freq='D')
+    day = (table[date].dt.normalize() - days[0]).dt.days.to_numpy()
+    grouped = table.groupby(dimensions, dropna=False, sort=False)
+    combination_codes = grouped.ngroup().to_numpy()
+    combinations = grouped.size().index.to_frame(index=False)
+    series_codes, series_values = pd.factorize(table[series_name].astype(object), sort=True)
+    daily = np.zeros((len(combinations), len(days), len(series_values)), dtype=np.int64)
+    np.add.at(daily, (combination_codes, day, series_codes), table['jobs'].to_numpy(np.int64))
+
+    grains = {}
+    for grain, freq in GRAINS.items():
+        labels, period_of_day = _periods(days, freq)
+        # Sum the days of each period: they are consecutive
+        starts = np.searchsorted(period_of_day, np.arange(len(labels)), side='left')
+        grains[grain] = (labels, period_of_day, np.add.reduceat(daily, starts, axis=1))
+    return Rollup(date, combinations, series_values.tolist(), days, grains)
+
+
+def build(cube):
+    """Materialize every series family of ``FAMILIES`` from a ``Cube``."""
+    rollups = {}
+    for name, (aggregate, date, series) in FAMILIES.items():
+        dimensions = [d for d in AGGREGATES[aggregate][0] if d not in (date, series)]
+        rollups[name] = _rollup(cube.tables[aggregate], date, series, dimensions)
+    return rollups
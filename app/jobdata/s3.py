@@ -0,0 +1,128 @@
+"""The process-wide S3 client.
+
+Built lazily on first use and shared by every page, the listing, the disk
+cache, ranged downloads and model loading, so endpoint resolution and the
+HTTP connection pool are set up once per process. botocore clients are
+thread-safe, so the background refresher and download threads use it too.
+
+With ``JOBDATA_S3_METRICS=1`` every call is timed per operation and new HTTP
+connections are counted, which shows whether the pool is being reused; see
+``metrics()``.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+
+import boto3
+from botocore.config import Config
+
+from jobdata.config import (
+    AWS_ACCESS_KEY, AWS_SECRET_KEY, S3_CONNECT_TIMEOUT, S3_MAX_ATTEMPTS, S3_MAX_POOL_CONNECTIONS, S3_METRICS,
+    S3_READ_TIMEOUT
+)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+_metrics_lock = threading.Lock()
+_calls = defaultdict(lambda: {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+_connections_opened = 0
+_started = threading.local()
+
+
+def client_config():
+    return Config(
+        max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+        tcp_keepalive=True,
+        connect_timeout=S3_CONNECT_TIMEOUT,
+        read_timeout=S3_READ_TIMEOUT,
+        retries={'mode': 'adaptive', 'max_attempts': S3_MAX_ATTEMPTS},
+    )
+
+
+def get_s3_client():
+    """Return the shared S3 client, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = boto3.client(
+                's3',
+                aws_access_key_id=AWS_ACCESS_KEY,
+                aws_secret_access_key=AWS_SECRET_KEY,
+                config=client_config()
+            )
+            if S3_METRICS:
+                instrument(_client)
+        return _client
+
+
+class _ConnectionCounter(logging.Handler):
+    # urllib3 logs "Starting new HTTP(S) connection" each time the pool has
+    # no idle connection to hand out
+    def emit(self, record):
+        global _connections_opened
+        if record.getMessage().startswith('Starting new'):
+            with _metrics_lock:
+                _connections_opened += 1
+
+
+def _timers():
+    if not hasattr(_started, 'times'):
+        _started.times = {}
+    return _started.times
+
+
+def _before_call(model, **kwargs):
+    _timers()[model.name] = time.perf_counter()
+
+
+def _after_call(model, **kwargs):
+    start = _timers().pop(model.name, None)
+    if start is None:
+        return
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    with _metrics_lock:
+        stats = _calls[model.name]
+        stats['count'] += 1
+        stats['total_ms'] += elapsed_ms
+        stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+
+
+def instrument(client):
+    """Record per-operation latency and new connections for ``client``."""
+    events = client.meta.events
+    events.register('before-call.s3', _before_call, unique_id='jobdata-metrics-before-call')
+    events.register('after-call.s3', _after_call, unique_id='jobdata-metrics-after-call')
+    events.register('after-call-error.s3', _after_call, unique_id='jobdata-metrics-after-call-error')
+
+    pool_logger = logging.getLogger('urllib3.connectionpool')
+    if not any(isinstance(h, _ConnectionCounter) for h in pool_logger.handlers):
+        pool_logger.addHandler(_ConnectionCounter(level=logging.DEBUG))
+        pool_logger.setLevel(logging.DEBUG)
+        # Keep urllib3's debug lines out of the app's own log output
+        pool_logger.propagate = False
+
+
+def metrics():
+    """Return call counts and latencies per S3 operation, and connection reuse."""
+    with _metrics_lock:
+        calls = {
+            name: dict(stats, avg_ms=stats['total_ms'] / stats['count'])
+            for name, stats in _calls.items() if stats['count']
+        }
+        opened = _connections_opened
+    total = sum(stats['count'] for stats in calls.values())
+    return {
+        'calls': calls,
+        'connections_opened': opened,
+        'connection_reuse': 1 - opened / total if total else None,
+    }
+
+
+def reset_metrics():
+    global _connections_opened
+    with _metrics_lock:
+        _calls.clear()
+        _connections_opened = 0
@@ -0,0 +1,400 @@
+"""Mergeable quantile sketches of the salary and experience distributions.
+
+The statistics page draws its box plots, and the averages next to them, for
+a period of days. Exact percentiles (``jobdata.boxes``) would mean rescanning
+the rows of every selected day on each change, and once daily extracts are
+combined into a history, every row of every day. Instead, each distribution
+is kept as a KLL sketch per (job_category, experience_years, day) cell: a few
+hundred retained values per cell whatever its size, and two sketches merge
+into a sketch of the union of their rows. Percentiles for any combination of
+categories, experience values and days are then answered by merging the
+sketches of the selected cells.
+
+A KLL sketch holds its values in levels; a value at level ``h`` stands for
+``2 ** h`` input values. When a level overflows its capacity it is sorted and
+every other value moves up a level, so the rank of any value is off by at
+most about ``1.7 / k`` of the count (k = ``K``). Until a first compaction a
+sketch holds its input values as they are and its quantiles are exact (the
+same "linear" quantiles plotly uses, see ``jobdata.boxes``). Count, sum, min
+and max are always exact.
+
+Cell sketches are stored flat (values, their levels and the offsets of each
+cell) so building and merging them is vectorized.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from jobdata.boxes import STATISTICS
+
+
+# Capacity of the top level; rank error ~1.7% of the count
+K = 200
+# Smallest capacity of a lower level
+MIN_CAPACITY = 8
+
+KEYS = ['job_category', 'experience_years', 'day']
+
+MEASURES = ['salary', 'experience']
+
+
+class KllSketch:
+    """KLL sketch of a stream of numbers, mergeable with ``+``."""
+
+    def __init__(self, k=K, levels=None, count=0, total=0.0, minimum=math.inf, maximum=-math.inf):
+        self.k = k
+        self.levels = levels or [np.empty(0)]
+        self.count = count
+        self.total = total
+        self.minimum = minimum
+        self.maximum = maximum
+        # Whether the next compaction of each level keeps the odd or the even
+        # positions (alternated: compactions stay deterministic and unbiased)
+        self._parities = [0] * len(self.levels)
+
+    @classmethod
+    def from_values(cls, values, k=K):
+        sketch = cls(k)
+        sketch.update(values)
+        return sketch
+
+    def __len__(self):
+        return self.count
+
+    def _capacity(self, level):
+        depth = len(self.levels) - 1 - level
+        return max(MIN_CAPACITY, math.ceil(self.k * (2 / 3) ** depth))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                    self._parities.append(0)
+                values = np.sort(self.levels[level])
+                # An odd value out stays behind, so no weight is lost
+                kept, values = values[:len(values) % 2], values[len(values) % 2:]
+                parity = self._parities[level]
+                self._parities[level] ^= 1
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], values[parity::2]])
+                self.levels[level] = kept
+            level += 1
+        return self
+
+    def update(self, values):
+        """Add ``values`` (missing values are skipped)."""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.count += len(values)
+            self.total += float(values.sum())
+            self.minimum = min(self.minimum, float(values.min()))
+            self.maximum = max(self.maximum, float(values.max()))
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    @staticmethod
+    def merge(sketches, k=K):
+        """One sketch of the union of the inputs of ``sketches``."""
+        sketches = list(sketches)
+        depth = max((len(sketch.levels) for sketch in sketches), default=1)
+        levels = [
+            np.concatenate([sketch.levels[level] for sketch in sketches if level < len(sketch.levels)] or [np.empty(0)])
+            for level in range(depth)
+        ]
+        merged = KllSketch(
+            k, levels,
+            count=sum(sketch.count for sketch in sketches),
+            total=sum(sketch.total for sketch in sketches),
+            minimum=min((sketch.minimum for sketch in sketches), default=math.inf),
+            maximum=max((sketch.maximum for sketch in sketches), default=-math.inf),
+        )
+        return merged._compress()
+
+    def __add__(self, other):
+        return KllSketch.merge([self, other], self.k)
+
+    @property
+    def exact(self):
+        """Whether no value was compacted yet (quantiles are then exact)."""
+        return len(self.levels) == 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else math.nan
+
+    def _weighted(self):
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(values), 2 ** level) for level, values in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        return values[order], weights[order]
+
+    def quantile(self, q):
+        """Quantile(s) ``q`` in [0, 1], interpolated between retained values
+        like numpy's "hazen" method (exact while no value was compacted);
+        NaN for an empty sketch."""
+        values, weights = self._weighted()
+        if not len(values):
+            return np.full(np.shape(q), np.nan)[()]
+        # Each retained value sits at the middle of the ranks it stands for
+        positions = np.cumsum(weights) - weights / 2
+        return np.interp(np.asarray(q, dtype=np.float64) * self.count, positions, values)[()]
+
+    def box(self):
+        """Box plot statistics, in the ``STATISTICS`` order of
+        ``jobdata.boxes``: quartiles and the furthest retained values within
+        1.5 IQR of the box."""
+        values, _ = self._weighted()
+        q1, median, q3 = self.quantile([0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        low = values[min(np.searchsorted(values, q1 - 1.5 * iqr, side='left'), len(values) - 1)]
+        high = values[max(np.searchsorted(values, q3 + 1.5 * iqr, side='right') - 1, 0)]
+        return [q1, median, q3, min(q1, low), max(q3, high), self.mean, self.count]
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self.levels)
+
+
+def _selected(values, selection):
+    # None: everything; a scalar or a collection of values otherwise
+    if selection is None:
+        return np.ones(len(values), dtype=bool)
+    if np.ndim(selection) == 0 and not isinstance(selection, (set, frozenset)):
+        selection = [selection]
+    return np.asarray(values.isin(list(selection)))
+
+
+class SketchTable:
+    """One ``KllSketch`` of a measure per cell, stored flat.
+
+    Cell ``i`` (keys in ``keys.iloc[i]``) retains ``values[offsets[i]:
+    offsets[i + 1]]``, at levels ``levels[offsets[i]:offsets[i + 1]]``;
+    ``count``, ``total``, ``minimum`` and ``maximum`` hold its exact
+    aggregates.
+    """
+
+    def __init__(self, keys, values, levels, offsets, count, total, minimum, maximum, k=K):
+        self.keys = keys
+        self.values = values
+        self.levels = levels
+        self.offsets = offsets
+        self.count = count
+        self.total = total
+        self.minimum = minimum
+        self.maximum = maximum
+        self.k = k
+
+    def __len__(self):
+        return len(self.keys)
+
+    def sketch(self, cell):
+        """The ``KllSketch`` of cell ``cell``."""
+        start, end = self.offsets[cell], self.offsets[cell + 1]
+        values, levels = self.values[start:end], self.levels[start:end]
+        depth = int(levels.max()) + 1 if len(levels) else 1
+        return KllSketch(
+            self.k, [values[levels == level] for level in range(depth)], int(self.count[cell]),
+            float(self.total[cell]), float(self.minimum[cell]), float(self.maximum[cell]),
+        )
+
+    def select(self, **selections):
+        """Mask of the cells matching every selection (see
+        ``DistributionSketches.merged``)."""
+        mask = np.ones(len(self), dtype=bool)
+        for name, selection in selections.items():
+            mask &= _selected(self.keys[name], selection)
+        return mask
+
+    def merged(self, mask):
+        """One sketch of the cells in ``mask``."""
+        cells = np.flatnonzero(mask)
+        starts, ends = self.offsets[cells], self.offsets[cells + 1]
+        lengths = ends - starts
+        # Positions of the retained values of every selected cell
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        values, levels = self.values[positions], self.levels[positions]
+        depth = int(levels.max()) + 1 if len(levels) else 1
+        counts = self.count[cells]
+        sketch = KllSketch(
+            self.k, [values[levels == level] for level in range(depth)],
+            count=int(counts.sum()),
+            total=float(self.total[cells].sum()),
+            minimum=float(self.minimum[cells].min()) if len(cells) else math.inf,
+            maximum=float(self.maximum[cells].max()) if len(cells) else -math.inf,
+        )
+        return sketch._compress()
+
+    def __add__(self, other):
+        return _combine([self, other], self.k)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.levels.nbytes + self.offsets.nbytes
+
+
+def _table(sketches, keys, k):
+    # SketchTable of a list of KllSketch, one per row of ``keys``
+    pieces = [sketch.levels for sketch in sketches]
+    values = [values for levels in pieces for values in levels]
+    levels = [np.full(len(values), level, dtype=np.uint8) for levels in pieces for level, values in enumerate(levels)]
+    lengths = [sum(len(values) for values in levels) for levels in pieces]
+    return SketchTable(
+        keys.reset_index(drop=True),
+        np.concatenate(values) if values else np.empty(0),
+        np.concatenate(levels) if levels else np.empty(0, dtype=np.uint8),
+        np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]).astype(np.int64),
+        np.array([sketch.count for sketch in sketches], dtype=np.int64),
+        np.array([sketch.total for sketch in sketches], dtype=np.float64),
+        np.array([sketch.minimum for sketch in sketches], dtype=np.float64),
+        np.array([sketch.maximum for sketch in sketches], dtype=np.float64),
+        k,
+    )
+
+
+def _combine(tables, k):
+    # Cells of every table, the ones with the same keys merged
+    keys = pd.concat([table.keys for table in tables], ignore_index=True)
+    codes = keys.groupby(KEYS, sort=False, dropna=False, observed=True).ngroup().to_numpy()
+    sketches = {}
+    for table_codes, table in zip(np.split(codes, np.cumsum([len(table) for table in tables])[:-1]), tables):
+        for cell, code in enumerate(table_codes.tolist()):
+            sketch = table.sketch(cell)
+            sketches[code] = sketches[code] + sketch if code in sketches else sketch
+    _, first = np.unique(codes, return_index=True)
+    return _table([sketches[code] for code in range(len(first))], keys.iloc[first], k)
+
+
+def _sketch_cells(values, keys, k=K):
+    """``SketchTable`` of ``values`` per distinct row of ``keys``, cells in
+    order of first appearance."""
+    codes = keys.groupby(KEYS, sort=False, dropna=False, observed=True).ngroup().to_numpy()
+    values = np.asarray(values, dtype=np.float64)
+    known = ~np.isnan(values)
+    codes, values = codes[known], values[known]
+    n_cells = int(codes.max()) + 1 if len(codes) else 0
+    first = np.unique(codes, return_index=True)[1]
+    keys = keys[known].iloc[first].reset_index(drop=True)
+
+    order = np.lexsort((values, codes))
+    codes, values = codes[order], values[order]
+    count = np.bincount(codes, minlength=n_cells).astype(np.int64)
+    offsets = np.concatenate([[0], np.cumsum(count)]).astype(np.int64)
+    total = np.bincount(codes, weights=values, minlength=n_cells)
+    starts = offsets[:-1]
+    minimum = values[starts] if n_cells else np.empty(0)
+    maximum = values[offsets[1:] - 1] if n_cells else np.empty(0)
+    table = SketchTable(
+        keys, values, np.zeros(len(values), dtype=np.uint8), offsets, count, total, minimum, maximum, k
+    )
+
+    # Most cells (one day of one category) fit in a sketch as they are; only
+    # the larger ones are compacted
+    large = np.flatnonzero(count > k)
+    if not len(large):
+        return table
+    sketches = [table.sketch(cell) for cell in range(n_cells)]
+    for cell in large.tolist():
+        sketches[cell] = KllSketch.from_values(values[offsets[cell]:offsets[cell + 1]], k)
+    return _table(sketches, keys, k)
+
+
+def _cell_selections(job_category, experience_years, days):
+    # Selections by cell key, and a hashable form of them
+    selections = {'job_category': job_category, 'experience_years': experience_years, 'day': days}
+    frozen = tuple(value if value is None or np.ndim(value) == 0 else tuple(value) for value in selections.values())
+    return selections, frozen
+
+
+class DistributionSketches:
+    """Salary and experience sketches per (job_category, experience_years,
+    day) cell, over the postings of the statistics page box plots.
+
+    - ``salary``: ``avg_salary_rounded`` of postings whose salary is in range
+    - ``experience``: ``experience_years`` of those postings asking for some
+      experience
+    """
+
+    def __init__(self, tables, k=K):
+        self.tables = tables
+        self.k = k
+        # Merged sketches and box statistics already asked for
+        self._merged = {}
+
+    def merged(self, measure, job_category=None, experience_years=None, days=None):
+        """One sketch of ``measure`` over the cells matching every selection:
+        None for all, else a value or a collection of values (``days`` are
+        normalized timestamps, e.g. a ``pd.date_range``)."""
+        selections, frozen = _cell_selections(job_category, experience_years, days)
+        cache_key = (measure,) + frozen
+        if cache_key not in self._merged:
+            table = self.tables[measure]
+            self._merged[cache_key] = table.merged(table.select(**selections))
+        return self._merged[cache_key]
+
+    def summary(self, measure, quantiles=(0.25, 0.5, 0.75), **selections):
+        """Exact ``count``, ``mean``, ``min`` and ``max`` and approximate
+        ``quantiles`` (a Series indexed by q) of ``measure`` over a selection
+        (see ``merged``)."""
+        sketch = self.merged(measure, **selections)
+        return {
+            'count': sketch.count,
+            'mean': sketch.mean,
+            'min': sketch.minimum if sketch.count else math.nan,
+            'max': sketch.maximum if sketch.count else math.nan,
+            'quantiles': pd.Series(sketch.quantile(list(quantiles)), index=list(quantiles)),
+        }
+
+    def box_stats(self, measure, by, job_category=None, experience_years=None, days=None):
+        """Box statistics of ``measure`` per value of ``by`` (a cell key),
+        laid out like ``jobdata.boxes.summarize``, over a selection (see
+        ``merged``)."""
+        selections, frozen = _cell_selections(job_category, experience_years, days)
+        cache_key = ('box_stats', measure, by) + frozen
+        if cache_key not in self._merged:
+            table = self.tables[measure]
+            mask = table.select(**selections)
+            rows = {}
+            for group, cells in table.keys[mask].groupby(by, sort=False, observed=True):
+                cell_mask = np.zeros(len(table), dtype=bool)
+                cell_mask[cells.index] = True
+                rows[group] = table.merged(cell_mask).box()
+            summary = pd.DataFrame.from_dict(rows, orient='index', columns=STATISTICS)
+            summary['count'] = summary['count'].astype(np.int64)
+            self._merged[cache_key] = summary
+        return self._merged[cache_key]
+
+    def __add__(self, other):
+        return DistributionSketches({
+            measure: self.tables[measure] + other.tables[measure] for measure in MEASURES
+        }, self.k)
+
+    @property
+    def nbytes(self):
+        return sum(table.nbytes for table in self.tables.values())
+
+
+def _days(data):
+    # The day a posting counts for: its effective date when the projection
+    # has one
+    name = 'effective_date' if 'effective_date' in data.columns else 'extracted_date'
+    return data[name].dt.normalize()
+
+
+def build(data, k=K):
+    """Sketch the distributions of a prepared frame (with ``job_category``,
+    ``experience``, ``avg_salary``, ``max_salary`` and ``extracted_date``)."""
+    keys = pd.DataFrame({
+        'job_category': data['job_category'].to_numpy(),
+        'experience_years': data['experience_years'].to_numpy(),
+        'day': _days(data).to_numpy(),
+    })
+    in_range = data['salary_in_range'].to_numpy()
+    with_experience = in_range & (data['experience_years'].to_numpy() > 0)
+    return DistributionSketches({
+        'salary': _sketch_cells(data['avg_salary_rounded'].to_numpy()[in_range], keys[in_range], k),
+        'experience': _sketch_cells(data['experience_years'].to_numpy()[with_experience], keys[with_experience], k),
+    }, k)
@@ -0,0 +1,218 @@
+"""Inverted index from skills (and a few predicates) to compressed row sets.
+
+The multiselect sections filter postings by "any of these skills", then by an
+experience range and a salary predicate, on every rerun. ``SkillIndex``
+answers those as set operations: each skill, each experience value and the
+"has a salary" predicate maps to the sorted set of row positions it holds,
+built once per snapshot projection, so a query only reads the sets of the
+selected skills.
+
+Row sets are stored roaring-style: rows are split into chunks of 2**16 and
+each chunk is kept either as a sorted uint16 array (up to 4096 rows) or as a
+65536-bit bitmap, whichever is smaller. Unions and intersections run chunk by
+chunk on those containers.
+"""
+import numpy as np
+
+from jobdata.skills import MASK_COLUMNS, SKILLS_COLUMNS, query_mask
+
+
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+# Above this many rows a chunk takes less room as a bitmap (8 KiB)
+ARRAY_LIMIT = 4096
+
+
+def _to_bitmap(values):
+    flags = np.zeros(CHUNK_SIZE, dtype=bool)
+    flags[values] = True
+    return np.packbits(flags, bitorder='little').view('<u8')
+
+
+def _to_values(bitmap):
+    # Only unpack the non-zero words
+    words = np.flatnonzero(bitmap)
+    flags = np.unpackbits(bitmap[words].view(np.uint8), bitorder='little').reshape(-1, 64)
+    word, bit = np.nonzero(flags)
+    return (words[word] * 64 + bit).astype(np.uint16)
+
+
+def _is_bitmap(container):
+    return container.dtype == np.uint64
+
+
+def _cardinality(container):
+    return int(np.bitwise_count(container).sum()) if _is_bitmap(container) else len(container)
+
+
+def _compact(container):
+    # The smaller representation of a chunk, None when it is empty
+    if _is_bitmap(container):
+        count = _cardinality(container)
+        if count > ARRAY_LIMIT:
+            return container
+        container = _to_values(container)
+    elif len(container) > ARRAY_LIMIT:
+        return _to_bitmap(container)
+    return container if len(container) else None
+
+
+def _contains(bitmap, values):
+    words = bitmap[values >> 6]
+    return ((words >> (values & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)
+
+
+def _and(a, b):
+    if _is_bitmap(a) and _is_bitmap(b):
+        return _compact(a & b)
+    if _is_bitmap(a):
+        a, b = b, a
+    if _is_bitmap(b):
+        return _compact(a[_contains(b, a)])
+    return _compact(np.intersect1d(a, b, assume_unique=True))
+
+
+def _or(containers):
+    if len(containers) == 1:
+        return containers[0]
+    if sum(_cardinality(c) for c in containers) <= ARRAY_LIMIT:
+        return _compact(np.unique(np.concatenate(containers)))
+    result = np.zeros(CHUNK_SIZE // 64, dtype=np.uint64)
+    for container in containers:
+        result |= container if _is_bitmap(container) else _to_bitmap(container)
+    return _compact(result)
+
+
+class RowSet:
+    """Sorted set of row positions, as ``{chunk: container}``."""
+
+    def __init__(self, containers=None):
+        self.containers = containers or {}
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from sorted, unique row positions."""
+        rows = np.asarray(rows, dtype=np.int64)
+        chunks, starts = np.unique(rows >> CHUNK_BITS, return_index=True)
+        containers = {}
+        for chunk, values in zip(chunks.tolist(), np.split(rows, starts[1:])):
+            containers[chunk] = _compact((values & (CHUNK_SIZE - 1)).astype(np.uint16))
+        return cls(containers)
+
+    @classmethod
+    def from_mask(cls, mask):
+        return cls.from_rows(np.flatnonzero(mask))
+
+    def __len__(self):
+        return sum(_cardinality(c) for c in self.containers.values())
+
+    def __and__(self, other):
+        containers = {}
+        for chunk in self.containers.keys() & other.containers.keys():
+            container = _and(self.containers[chunk], other.containers[chunk])
+            if container is not None:
+                containers[chunk] = container
+        return RowSet(containers)
+
+    def __or__(self, other):
+        return RowSet.union([self, other])
+
+    @staticmethod
+    def union(row_sets):
+        by_chunk = {}
+        for row_set in row_sets:
+            for chunk, container in row_set.containers.items():
+                by_chunk.setdefault(chunk, []).append(container)
+        return RowSet({chunk: _or(containers) for chunk, containers in by_chunk.items()})
+
+    @staticmethod
+    def intersection(row_sets):
+        # Smallest first: the result can only shrink
+        row_sets = sorted(row_sets, key=len)
+        result = row_sets[0]
+        for row_set in row_sets[1:]:
+            result = result & row_set
+        return result
+
+    def to_array(self):
+        """Row positions, sorted (for ``DataFrame.take``)."""
+        parts = [
+            (chunk << CHUNK_BITS) + (_to_values(c) if _is_bitmap(c) else c).astype(np.int64)
+            for chunk, c in sorted(self.containers.items())
+        ]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    @property
+    def nbytes(self):
+        return sum(c.nbytes for c in self.containers.values())
+
+
+class SkillIndex:
+    """Row sets of one snapshot projection: one per skill, per experience
+    value and for postings with a salary.
+
+    Row positions follow the projection's DataFrame, so
+    ``data.take(row_set.to_array())`` gives the matching rows.
+    """
+
+    def __init__(self, n_rows, skills, experience, with_salary):
+        self.n_rows = n_rows
+        self.skills = skills
+        # Keys 2k: experience of exactly k years, 2k + 1: strictly between
+        # k and k + 1 years (missing experience is in neither)
+        self.experience = experience
+        self.with_salary = with_salary
+        # Experience ranges already asked for (a slider only has a few)
+        self._ranges = {}
+
+    def any_of(self, names):
+        """Rows having at least one of ``names``."""
+        return RowSet.union([self.skills[name] for name in names])
+
+    def all_of(self, names):
+        """Rows having every skill in ``names``."""
+        if not names:
+            return RowSet.from_rows(np.arange(self.n_rows))
+        return RowSet.intersection([self.skills[name] for name in names])
+
+    def experience_between(self, low, high):
+        """Rows whose experience lies in the inclusive range [low, high]
+        (whole years)."""
+        if (low, high) not in self._ranges:
+            self._ranges[(low, high)] = RowSet.union([
+                row_set for key, row_set in self.experience.items() if 2 * low <= key <= 2 * high
+            ])
+        return self._ranges[(low, high)]
+
+    @property
+    def nbytes(self):
+        row_sets = list(self.skills.values()) + list(self.experience.values()) + [self.with_salary]
+        return sum(row_set.nbytes for row_set in row_sets)
+
+
+def build(data):
+    """Index the skills, ``experience`` and ``avg_salary`` of a prepared
+    frame (with its ``skill_bits_*`` columns)."""
+    skills = {}
+    words = [data[column].to_numpy() for column in MASK_COLUMNS]
+    for name in SKILLS_COLUMNS:
+        word, bits = next((i, bits) for i, bits in enumerate(query_mask([name])) if bits)
+        skills[name] = RowSet.from_mask(words[word] & bits)
+
+    experience = {}
+    if 'experience' in data.columns:
+        values = data['experience'].to_numpy(np.float64)
+        known = ~np.isnan(values)
+        years = np.floor(values[known])
+        keys = 2 * years + (values[known] != years)
+        rows = np.flatnonzero(known)
+        order = np.argsort(keys, kind='stable')
+        keys, rows = keys[order], rows[order]
+        unique_keys, starts = np.unique(keys, return_index=True)
+        for key, key_rows in zip(unique_keys.tolist(), np.split(rows, starts[1:])):
+            experience[int(key)] = RowSet.from_rows(key_rows)
+
+    with_salary = RowSet()
+    if 'avg_salary' in data.columns:
+        with_salary = RowSet.from_mask(data['avg_salary'].to_numpy() > 0)
+    return SkillIndex(len(data), skills, experience, with_salary)
@@ -0,0 +1,110 @@
+"""Skill flags decoded once per snapshot into a packed uint8 matrix.
+
+The jobdata files store every skill as a 'Y'/'N' string column. Pages used to
+turn each of them into 0/1 with a Python lambda per cell, on every rerun.
+Here the comparison runs inside Arrow while the parquet file is read, and the
+result lands in one contiguous ``(rows, skills)`` uint8 array. The DataFrame
+handed to pages gets its 0/1 skill columns and its packed bitmask columns
+from that array; the array itself is dropped once they are built.
+"""
+import numpy as np
+import pyarrow.compute as pc
+
+
+# Skills columns
+SKILLS_COLUMNS = [
+    'sql', 'python', 'pyspark', 'azure', 'aws', 'gcp', 'etl', 'airflow', 'kafka', 'spark',
+    'power_bi', 'tableau', 'snowflake', 'docker', 'kubernetes', 'git', 'data_warehouse',
+    'hadoop', 'mlops', 'data_lake', 'bigquery', 'databricks', 'dbt', 'mlflow', 'java',
+    'scala', 'sas', 'matlab', 'power_query', 'looker', 'apache', 'hive', 'terraform',
+    'jenkins', 'gitlab', 'machine_learning', 'deep_learning', 'nlp', 'api', 'pipeline',
+    'data_governance', 'erp', 'ssis', 'ssas', 'ssrs', 'ssms', 'postgre', 'mysql', 'mongodb',
+    'cloud', 'synapse', 'blobstorage', 'azure_devops', 'fabric', 'glue', 'redshift', 's3',
+    'lambda', 'emr', 'athena', 'kinesis', 'rds', 'sagemaker'
+]
+
+# Cloud platforms, a subset of the skills above
+PLATFORM_COLUMNS = ['azure', 'aws', 'gcp']
+
+# Every row also carries its skills as a bitmask: bit ``i`` of the packed
+# words is SKILLS_COLUMNS[i], whatever columns a projection was read with
+_BIT = {name: i for i, name in enumerate(SKILLS_COLUMNS)}
+MASK_WORDS = (len(SKILLS_COLUMNS) + 63) // 64
+MASK_COLUMNS = [f'skill_bits_{w}' for w in range(MASK_WORDS)]
+
+
+class SkillMatrix:
+    """0/1 skill flags of one snapshot projection.
+
+    ``values`` is a C-contiguous ``(rows, len(columns))`` uint8 array, in the
+    row order of the matching DataFrame.
+    """
+
+    def __init__(self, values, columns):
+        self.values = values
+        self.columns = list(columns)
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    def pack(self):
+        """Return the flags as a ``(rows, MASK_WORDS)`` uint64 bitmask."""
+        bits = np.zeros((len(self), MASK_WORDS * 64), dtype=np.uint8)
+        bits[:, [_BIT[name] for name in self.columns]] = self.values
+        return np.packbits(bits, axis=1, bitorder='little').view('<u8')
+
+
+def decode(table, columns=SKILLS_COLUMNS):
+    """Decode the 'Y'/'N' skill columns present in an Arrow ``table``.
+
+    Anything other than 'Y' (including nulls) becomes 0, like the old
+    per-page conversion. Returns a ``SkillMatrix``, empty when the table has
+    none of the skill columns.
+    """
+    present = [name for name in columns if name in table.column_names]
+    values = np.empty((table.num_rows, len(present)), dtype=np.uint8)
+    for i, name in enumerate(present):
+        flags = pc.fill_null(pc.equal(table[name], 'Y'), False)
+        values[:, i] = flags.to_numpy(zero_copy_only=False)
+    return SkillMatrix(values, present)
+
+
+def query_mask(names):
+    """Bitmask words, one uint64 per mask column, with the bits of ``names``."""
+    words = np.zeros(MASK_WORDS, dtype=np.uint64)
+    for name in names:
+        bit = _BIT[name]
+        words[bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+    return words
+
+
+def _masked(data, names):
+    # (word, query) pairs that have at least one selected bit
+    query = query_mask(names)
+    for column, words in zip(MASK_COLUMNS, query):
+        if words:
+            yield data[column].to_numpy() & words, words
+
+
+def any_of(data, names):
+    """Boolean array: rows of ``data`` having at least one of ``names``."""
+    result = np.zeros(len(data), dtype=bool)
+    for hits, _ in _masked(data, names):
+        result |= hits != 0
+    return result
+
+
+def all_of(data, names):
+    """Boolean array: rows of ``data`` having every skill in ``names``."""
+    result = np.ones(len(data), dtype=bool)
+    for hits, words in _masked(data, names):
+        result &= hits == words
+    return result
+
+
+def count_of(data, names):
+    """Number of ``names`` each row of ``data`` has."""
+    result = np.zeros(len(data), dtype=np.uint8)
+    for hits, _ in _masked(data, names):
+        result += np.bitwise_count(hits)
+    return result
@@ -0,0 +1,168 @@
+"""Object storage the jobdata files are read from.
+
+Everything above this module (listing, disk cache, downloads, model loading)
+talks to a storage object with the same four operations: ``list``, ``head``,
+``get`` and ``get_range``. ``S3Storage`` is the production bucket;
+``LocalStorage`` serves a folder of jobdata_*.parquet files, so the app and
+its benchmarks can run without AWS. ``JOBDATA_STORAGE`` picks one.
+"""
+import hashlib
+import os
+import threading
+
+from botocore.exceptions import ClientError
+
+from jobdata.config import BUCKET_NAME, LOCAL_DATA_DIR, STORAGE_BACKEND
+
+
+class ObjectChangedError(Exception):
+    """The object no longer matches the ETag a read was pinned to."""
+
+
+def _error_code(error):
+    return error.response.get('Error', {}).get('Code')
+
+
+class S3Storage:
+    def __init__(self, client, bucket):
+        self.client = client
+        self.bucket = bucket
+
+    def describe(self, prefix=''):
+        return f"s3://{self.bucket}/{prefix}"
+
+    def list(self, prefix='', start_after=None):
+        """Yield the keys under ``prefix`` in lexicographic order."""
+        params = {'Bucket': self.bucket, 'Prefix': prefix}
+        if start_after:
+            params['StartAfter'] = start_after
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(**params):
+            for obj in page.get('Contents', []):
+                yield obj['Key']
+
+    def head(self, key, if_none_match=None):
+        """Return ``{'etag', 'size'}``, or None if the ETag still matches."""
+        params = {'Bucket': self.bucket, 'Key': key}
+        if if_none_match:
+            params['IfNoneMatch'] = if_none_match
+        try:
+            head = self.client.head_object(**params)
+        except ClientError as e:
+            status = e.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+            if if_none_match and (status == 304 or _error_code(e) in ('304', 'NotModified')):
+                return None
+            raise
+        return {'etag': head['ETag'], 'size': head['ContentLength']}
+
+    def _get(self, params, if_match):
+        if if_match:
+            params['IfMatch'] = if_match
+        try:
+            return self.client.get_object(**params)['Body']
+        except ClientError as e:
+            if _error_code(e) in ('PreconditionFailed', '412'):
+                raise ObjectChangedError(params['Key']) from e
+            raise
+
+    def get(self, key, if_match=None):
+        """Return a streaming body for the whole object."""
+        return self._get({'Bucket': self.bucket, 'Key': key}, if_match)
+
+    def get_range(self, key, start, end, if_match=None):
+        """Return a streaming body for bytes ``start``..``end`` (inclusive)."""
+        return self._get({'Bucket': self.bucket, 'Key': key, 'Range': f'bytes={start}-{end}'}, if_match)
+
+
+class _FileBody:
+    # Mimics the parts of botocore's StreamingBody the callers use
+    def __init__(self, path, start=0, length=None):
+        self._f = open(path, 'rb')
+        self._f.seek(start)
+        self._remaining = os.path.getsize(path) - start if length is None else length
+
+    def read(self, amt=None):
+        if not self._remaining:
+            return b''
+        amt = self._remaining if amt is None else min(amt, self._remaining)
+        chunk = self._f.read(amt)
+        self._remaining -= len(chunk)
+        if not self._remaining:
+            self.close()
+        return chunk
+
+    def iter_chunks(self, chunk_size=1024 ** 2):
+        while True:
+            chunk = self.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def close(self):
+        self._f.close()
+
+
+class LocalStorage:
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def describe(self, prefix=''):
+        return os.path.join(self.root, prefix)
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def list(self, prefix='', start_after=None):
+        keys = []
+        for dirpath, _, filenames in os.walk(self.root):
+            rel = os.path.relpath(dirpath, self.root)
+            for name in filenames:
+                key = name if rel == '.' else '/'.join(rel.split(os.sep) + [name])
+                if key.startswith(prefix) and (start_after is None or key > start_after):
+                    keys.append(key)
+        return iter(sorted(keys))
+
+    def _etag(self, path):
+        # Content-independent but stable: changes whenever the file is rewritten
+        stat = os.stat(path)
+        return '"' + hashlib.md5(f'{stat.st_mtime_ns}-{stat.st_size}'.encode()).hexdigest() + '"'
+
+    def head(self, key, if_none_match=None):
+        path = self._path(key)
+        etag = self._etag(path)
+        if if_none_match == etag:
+            return None
+        return {'etag': etag, 'size': os.path.getsize(path)}
+
+    def _check(self, path, if_match):
+        if if_match and self._etag(path) != if_match:
+            raise ObjectChangedError(path)
+
+    def get(self, key, if_match=None):
+        path = self._path(key)
+        self._check(path, if_match)
+        return _FileBody(path)
+
+    def get_range(self, key, start, end, if_match=None):
+        path = self._path(key)
+        self._check(path, if_match)
+        return _FileBody(path, start, end - start + 1)
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """Return the process-wide storage selected by ``JOBDATA_STORAGE``."""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            if STORAGE_BACKEND == 'local':
+                _storage = LocalStorage(LOCAL_DATA_DIR)
+            elif STORAGE_BACKEND == 's3':
+                from jobdata.s3 import get_s3_client
+                _storage = S3Storage(get_s3_client(), BUCKET_NAME)
+            else:
+                raise ValueError(f"Unknown JOBDATA_STORAGE {STORAGE_BACKEND!r}, expected 's3' or 'local'")
+        return _storage
@@ -1,10 +1,7 @@
 import streamlit as st
-import boto3
-import pandas as pd
-from io import BytesIO
 from dotenv import load_dotenv
+from jobdata import SKILLS_COLUMNS, load_cooccurrence, load_cube, load_rollups
 import os
-import re
 import seaborn as sns
 
 from PIL import Image
@@ -28,35 +25,12 @@ data_stack_2 = Image.open(data_stack_path_2)
 
 
 
-AWS_ACCESS_KEY = os.getenv('AWS_ACCESS_KEY')
-AWS_SECRET_KEY = os.getenv('AWS_SECRET_KEY')
-BUCKET_NAME = os.getenv('BUCKET_NAME')
-FILE_PREFIX = os.getenv('FILE_PREFIX')
 
-# Set up the S3 client
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=AWS_ACCESS_KEY,
-    aws_secret_access_key=AWS_SECRET_KEY
-)
-
-# Helper functions
-def get_latest_file():
-    response = s3_client.list_objects_v2(Bucket=BUCKET_NAME, Prefix=FILE_PREFIX)
-    files = [obj['Key'] for obj in response.get('Contents', []) if obj['Key'].endswith('.parquet')]
-    date_pattern = re.compile(r'jobdata_(\d{8})\.parquet')
-    files_with_dates = [(f, date_pattern.search(f).group(1)) for f in files if date_pattern.search(f)]
-    latest_file = max(files_with_dates, key=lambda x: x[1])[0]
-    return latest_file
-
-def load_data():
-    latest_file_key = get_latest_file()
-    obj = s3_client.get_object(Bucket=BUCKET_NAME, Key=latest_file_key)
-    data = pd.read_parquet(BytesIO(obj['Body'].read()))
-    return data
-
-data = load_data()
-max_extracted_date = data['extracted_date'].max()
+# Skill counts come from the pre-aggregated cube
+cube = load_cube()
+rollups = load_rollups()
+number_of_jobs = cube.query('postings')['jobs']
+max_extracted_date = cube.last_extracted_date.date()
 
 st.set_page_config(page_title="YourFirstDataJob", page_icon="🎯",layout="wide")
 st.sidebar.image(image_logo)
@@ -109,24 +83,9 @@ def display_big_metric(title, value, delta=None):
     )
 
 
-# Fetch data
-data = load_data()
-
-# Skills columns
-skills_columns = [
-    'sql', 'python', 'pyspark', 'azure', 'aws', 'gcp', 'etl', 'airflow', 'kafka', 'spark', 
-    'power_bi', 'tableau', 'snowflake', 'docker', 'kubernetes', 'git', 'data_warehouse', 
-    'hadoop', 'mlops', 'data_lake', 'bigquery', 'databricks', 'dbt', 'mlflow', 'java', 
-    'scala', 'sas', 'matlab', 'power_query', 'looker', 'apache', 'hive', 'terraform', 
-    'jenkins', 'gitlab', 'machine_learning', 'deep_learning', 'nlp', 'api', 'pipeline', 
-    'data_governance', 'erp', 'ssis', 'ssas', 'ssrs', 'ssms', 'postgre', 'mysql', 'mongodb', 
-    'cloud', 'synapse', 'blobstorage', 'azure_devops', 'fabric', 'glue', 'redshift', 's3', 
-    'lambda', 'emr', 'athena', 'kinesis', 'rds', 'sagemaker'
-]
 
-# Convert 'Y'/'N' to binary values (1 for Y, 0 for N)
-for col in skills_columns:
-    data[col] = data[col].apply(lambda x: 1 if x == 'Y' else 0)
+# Skills columns (0/1, decoded once per snapshot)
+skills_columns = SKILLS_COLUMNS
 
 #with col2:
 st.title("""
@@ -143,21 +102,21 @@ with col2:
 
 st.markdown("---")
 
-if not data.empty:
-    rows_with_skill = data[skills_columns].any(axis=1).sum()
-    perc_rows_with_skill = rows_with_skill / len(data) *100
+if number_of_jobs > 0:
+    rows_with_skill = cube.query('postings')['with_skill']
+    perc_rows_with_skill = rows_with_skill / number_of_jobs *100
 
     
     # filtered_data = data[data[skills_columns].any(axis=1)]  # Filter rows with at least one skill = 1
-    skill_counts = data[skills_columns].sum().sort_values(ascending=False)
+    skill_counts = cube.skill_counts().sort_values(ascending=False)
     
     top_skills = skill_counts.head(3).index.tolist() if not skill_counts.empty else []
     top_skill_1 = top_skills[0] if len(top_skills) > 0 else None
     top_skill_2 = top_skills[1] if len(top_skills) > 1 else None
     top_skill_3 = top_skills[2] if len(top_skills) > 2 else None
-    perc_jobs_with_skill_1 = (data[top_skill_1].sum() / len(data)) * 100
-    perc_jobs_with_skill_2 = (data[top_skill_2].sum() / len(data)) * 100
-    perc_jobs_with_skill_3 = (data[top_skill_3].sum() / len(data)) * 100
+    perc_jobs_with_skill_1 = (skill_counts[top_skill_1] / number_of_jobs) * 100
+    perc_jobs_with_skill_2 = (skill_counts[top_skill_2] / number_of_jobs) * 100
+    perc_jobs_with_skill_3 = (skill_counts[top_skill_3] / number_of_jobs) * 100
     
     #Insights
     if perc_rows_with_skill is not None:
@@ -193,7 +152,7 @@ if not data.empty:
         top_n_skills = skill_counts  # "All"
 
     # Calculate percentages for the selected top N skills
-    perc_top_n_skills = (top_n_skills.values / len(data)) * 100  # Calculate percentages for the skills
+    perc_top_n_skills = (top_n_skills.values / number_of_jobs) * 100  # Calculate percentages for the skills
 
     # Create a Plotly bar chart for the selected top skills
     fig = go.Figure(data=[go.Bar(
@@ -216,41 +175,41 @@ else:
     st.write("No data available for the selected filters.")
 
 st.markdown("---")
-if not data.empty:
+if number_of_jobs > 0:
     # Filter for job category with default selection set to "Data Engineer"
-    job_categories = data['job_category'].unique()
+    job_categories = cube.query('postings', by=['job_category']).index
     default_category = "Data Engineer" if "Data Engineer" in job_categories else job_categories[0]
     st.write("## Top 10 skills depending on the job category")
     selected_category = st.selectbox("Select job category", options=job_categories, index=list(job_categories).index(default_category))
 
-    if 'job_category' in data.columns:
-        # Filter data based on the selected job category
-        filtered_data = data[data['job_category'] == selected_category]
-
-        # Calculate skill counts for the filtered data
-        filtered_skill_counts = filtered_data[skills_columns].sum().sort_values(ascending=False).head(10)
+    # Calculate skill counts for the selected job category
+    filtered_skill_counts = (
+        cube.skill_counts(filters=[('job_category', '==', selected_category)])
+        .sort_values(ascending=False)
+        .head(10)
+    )
 
-        # Calculate the total count of skills for the selected job category
-        total_skill_count = filtered_skill_counts.sum()
+    # Calculate the total count of skills for the selected job category
+    total_skill_count = filtered_skill_counts.sum()
 
-        # Calculate the percentage for each skill
-        skill_percentages = (filtered_skill_counts / total_skill_count) * 100
+    # Calculate the percentage for each skill
+    skill_percentages = (filtered_skill_counts / total_skill_count) * 100
 
-        # Create a Plotly bar chart for the selected top skills
-        fig = go.Figure(data=[go.Bar(
-            x=filtered_skill_counts.index,
-            y=skill_percentages,  # Use skill percentages for the y-axis
-            text=[f"{percentage:.1f}%" for percentage in skill_percentages],  # Display percentages
-            textposition='auto'
-        )])
+    # Create a Plotly bar chart for the selected top skills
+    fig = go.Figure(data=[go.Bar(
+        x=filtered_skill_counts.index,
+        y=skill_percentages,  # Use skill percentages for the y-axis
+        text=[f"{percentage:.1f}%" for percentage in skill_percentages],  # Display percentages
+        textposition='auto'
+    )])
 
-        fig.update_layout(
-            xaxis_title="Most Demanded Skills",
-            yaxis_title="Percentage",
-            title=f"Top 10 most demanded skills for {selected_category}",
-            template="plotly_white"
-        )
-        st.plotly_chart(fig)
+    fig.update_layout(
+        xaxis_title="Most Demanded Skills",
+        yaxis_title="Percentage",
+        title=f"Top 10 most demanded skills for {selected_category}",
+        template="plotly_white"
+    )
+    st.plotly_chart(fig)
 
 else:      
     st.write("Job category data is not available for analysis.")
@@ -259,17 +218,9 @@ st.markdown("---")
 # Temporal Evolution of Skills
 st.write("## Temporal evolution of skills")
 
-if not data.empty and 'date_creation' in data.columns:
-    # Convert 'date_creation' to datetime format if it's not already
-    data['date_creation'] = pd.to_datetime(data['date_creation'])
-
-    # Filter to include only rows with at least one skill = 1
-    filtered_data = data[data[skills_columns].any(axis=1)]
-
-    # Create a DataFrame to count skills over time, grouping by month
-    skills_over_time = (filtered_data.groupby(pd.Grouper(key='date_creation', freq='M'))[skills_columns]
-                        .sum()
-                        .reset_index())
+if number_of_jobs > 0:
+    # Count skills over time, grouping by month (only postings with at least one skill)
+    skills_over_time = rollups['skills'].query('month', columns=SKILLS_COLUMNS).reset_index()
 
     # Melt the DataFrame to long format for easier plotting
     skills_long = skills_over_time.melt(id_vars='date_creation', var_name='Skill', value_name='Count')
@@ -315,22 +266,25 @@ st.markdown("---")
 # Correlation with Top Skills
 st.write("## Correlation between top skills")
 
-if not data.empty:
-    # Get the top 20 skills
-    top_10_skills = skill_counts.head(20).index
+if number_of_jobs > 0:
+    # Pairwise skill counts, computed once per snapshot
+    skill_pairs = load_cooccurrence()
 
-    # Create a new DataFrame with only the top skills
-    correlation_data = data[[*top_10_skills, 'job_category']].copy()
+    col1, col2 = st.columns(2)
+    with col1:
+        top_k = st.slider('Number of top skills:', min_value=5, max_value=len(skills_columns), value=20)
+    with col2:
+        threshold = st.slider('Strong correlation above:', min_value=0.0, max_value=1.0, value=0.4, step=0.05)
 
-    # Convert job_category to numeric for correlation calculation
-    correlation_data['job_category'] = pd.factorize(correlation_data['job_category'])[0]
+    # Get the top skills
+    top_10_skills = skill_counts.head(top_k).index.tolist()
 
-    # Calculate the correlation matrix
-    correlation_matrix = correlation_data.corr()
+    # Phi coefficient: the correlation of the 0/1 skill flags
+    correlation_matrix = skill_pairs.phi(top_10_skills)
 
     # Create a heatmap for top skills using Plotly
     fig_correlation = px.imshow(
-        correlation_matrix.loc[top_10_skills, top_10_skills],
+        correlation_matrix,
         color_continuous_scale='RdBu',
         zmin=-1, zmax=1,
         title='Correlation Matrix of Top Skills',
@@ -344,26 +298,13 @@ if not data.empty:
     # Display insights based on the correlation matrix
     st.write("### 📊 Insights")
 
-    # Extract significant correlations
-    significant_correlations = correlation_matrix.loc[top_10_skills, top_10_skills].stack().reset_index()
-    significant_correlations.columns = ['Skill 1', 'Skill 2', 'Correlation']
-
-    # Filter for strong positive or negative correlations, excluding self-correlations
-    strong_correlations = significant_correlations[
-        (significant_correlations['Correlation'] > 0.4) | 
-        (significant_correlations['Correlation'] < -0.5)
-    ]
-    strong_correlations = strong_correlations[strong_correlations['Skill 1'] != strong_correlations['Skill 2']]  # Exclude self-correlations
-
-    # Remove duplicate pairs by ensuring Skill 1 < Skill 2
-    strong_correlations = strong_correlations[
-        strong_correlations['Skill 1'] < strong_correlations['Skill 2']
-    ]
+    # Strong positive or negative correlations, each pair once
+    strong_correlations = skill_pairs.strong_pairs(top_10_skills, above=threshold, below=-0.5)
 
     # Display strong correlations
     if not strong_correlations.empty:
-        for _, row in strong_correlations.iterrows():
-            st.write(f"🔗 **{row['Skill 1']}** and **{row['Skill 2']}** have a correlation of **{row['Correlation']:.2f}**")
+        for skill_1, skill_2, correlation in strong_correlations.itertuples(index=False):
+            st.write(f"🔗 **{skill_1}** and **{skill_2}** have a correlation of **{correlation:.2f}**")
     else:
         st.write("🚫 No strong correlations found among the top skills.")
 else:      
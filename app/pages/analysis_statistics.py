@@ -1,14 +1,11 @@
 import streamlit as st
-import boto3
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
-from io import BytesIO
 from dotenv import load_dotenv
+from jobdata import load_cube, load_distribution_sketches
 
 from PIL import Image
 import os
-import re
 
 
 
@@ -28,44 +25,39 @@ statistics = Image.open(statistics_path)
 
 
 
-# Access the environment variables
-AWS_ACCESS_KEY = os.getenv('AWS_ACCESS_KEY')
-AWS_SECRET_KEY = os.getenv('AWS_SECRET_KEY')
-BUCKET_NAME = os.getenv('BUCKET_NAME')
-FILE_PREFIX = os.getenv('FILE_PREFIX')
-
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=AWS_ACCESS_KEY,
-    aws_secret_access_key=AWS_SECRET_KEY
-)
-
-def get_latest_file():
-    # List files in the bucket with the specified prefix
-    response = s3_client.list_objects_v2(Bucket=BUCKET_NAME, Prefix=FILE_PREFIX)
-    files = [obj['Key'] for obj in response.get('Contents', []) if obj['Key'].endswith('.parquet')]
-
-    # Extract dates from filenames and sort them to find the latest file
-    date_pattern = re.compile(r'jobdata_(\d{8})\.parquet')
-    files_with_dates = [(f, date_pattern.search(f).group(1)) for f in files if date_pattern.search(f)]
-    latest_file = max(files_with_dates, key=lambda x: x[1])[0]  # Get the file with the latest date
-
-    return latest_file
-
-def load_data():
-    # Get the latest file and read it as a Parquet file into a DataFrame
-    latest_file_key = get_latest_file()
-    obj = s3_client.get_object(Bucket=BUCKET_NAME, Key=latest_file_key)
-    data = pd.read_parquet(BytesIO(obj['Body'].read()))
-    return data
 
 # Format salary as € in thousands (k)
 def format_salary(value):
     return f"{value / 1000:.0f}k €"
 
 
-data = load_data()
-max_extracted_date = data['extracted_date'].max()
+# Box plot statistics drawn from values merged from the sketches
+def box_figure(stats, x_title, y_title):
+    fig = go.Figure(data=[go.Box(
+        x=stats.index.tolist(),
+        q1=stats['q1'],
+        median=stats['median'],
+        q3=stats['q3'],
+        lowerfence=stats['lowerfence'],
+        upperfence=stats['upperfence'],
+        mean=stats['mean'],
+        boxpoints=False,  # Disable outlier points
+        name='',
+        showlegend=False
+    )])
+    fig.update_layout(xaxis_title=x_title, yaxis_title=y_title, boxmode='group', margin=dict(t=60))
+    return fig
+
+
+# KPIs come from the pre-aggregated cube; the box plots and averages from
+# salary and experience sketches per category, experience and day, merged
+# over the selected period
+cube = load_cube()
+distribution_sketches = load_distribution_sketches(
+    columns=['job_category', 'experience', 'experience_bool', 'avg_salary', 'max_salary', 'date_creation',
+             'extracted_date']
+)
+max_extracted_date = cube.last_extracted_date.date()
 
 st.set_page_config(page_title="YourFirstDataJob", page_icon="🎯",layout="wide")
 st.sidebar.image(image_logo)
@@ -117,18 +109,16 @@ def display_big_metric(title, value, delta=None):
         unsafe_allow_html=True
     )
 
-# Fetch data
-data = load_data()
-number_of_jobs = len(data)
-jobs_with_salary = len(data[data['avg_salary'].notnull()])
-jobs_with_experience = len(data[data['experience_bool'] != 'N'])
+totals = cube.query('postings')
+number_of_jobs = totals['jobs']
+jobs_with_salary = totals['salary_n']
+jobs_with_experience = totals['with_experience']
 
 percent_with_salary = (jobs_with_salary / number_of_jobs) * 100 if number_of_jobs > 0 else 0
 percent_with_experience = (jobs_with_experience / number_of_jobs) * 100 if number_of_jobs > 0 else 0
 
-data_experience = data[data['experience'].notnull()]
-data_experience['experience'] = data_experience['experience'].astype(int) 
-data_experience= data_experience[data_experience['experience'] > 0]
+# Periods ending on the last extract, in months (None: every day)
+PERIODS = {'All time': None, 'Last 12 months': 12, 'Last 3 months': 3, 'Last month': 1}
 
 
 #with col2:
@@ -147,29 +137,32 @@ st.markdown("---")
 
 st.write("## Experience and salary by job .. ❓ ")
 
+period = st.selectbox("Select Period", options=list(PERIODS))
+if PERIODS[period] is None:
+    days = None
+else:
+    # Postings count for the day of their effective date
+    last_day = cube.last_extracted_date.normalize()
+    days = pd.date_range(last_day - pd.DateOffset(months=PERIODS[period]), last_day, inclusive='right')
+
 st.markdown("---")
 
 
 # ---- Experience Analysis ----
 st.write("## Experience by Job")
-data_experience['experience_rounded'] = data_experience['experience'].round().astype(int)  # Round experience for cleaner visuals
-data_experience = data_experience[(data_experience['max_salary'] < 300000)&(data_experience['max_salary'] > 0)]
-data_experience['avg_salary_rounded'] = data_experience['avg_salary'].round()  # Round average salary
 
-if not data_experience.empty:
+# Postings with a salary in range that ask for some experience
+experience_by_category = distribution_sketches.box_stats('experience', 'job_category', days=days)
+
+if not experience_by_category.empty:
     # Create box plot
-    fig_exp_box = px.box(
-        data_experience,
-        x='job_category',
-        y='experience_rounded',
-        points=False,  # Disable outlier points
-        #title="Experience Requirement by Job Category (Without Outliers)",
-        labels={'experience_rounded': 'Years of Experience', 'job_category': 'Job Category'}
-    )
+    #title="Experience Requirement by Job Category (Without Outliers)",
+    fig_exp_box = box_figure(experience_by_category, 'Job Category', 'Years of Experience')
     st.plotly_chart(fig_exp_box)
 
-    # Summary table for experience (transposed, only average)
-    exp_summary = data_experience.groupby('job_category')['experience_rounded'].mean().reset_index()
+    # Summary table for experience (transposed, only average); the means of
+    # the sketches are exact
+    exp_summary = experience_by_category['mean'].sort_index().reset_index()
     exp_summary.columns = ['Job Category', 'Average Experience']
     exp_summary['Average Experience'] = exp_summary['Average Experience'].astype(int)  # Convert to int for display
     exp_summary = exp_summary.set_index('Job Category').T  # Transpose the summary
@@ -178,7 +171,7 @@ if not data_experience.empty:
     # Insights for experience
     most_experience_job = exp_summary.loc['Average Experience'].idxmax()
     least_experience_job = exp_summary.loc['Average Experience'].idxmin()
-    average_experience = data_experience['experience'].mean() if not data_experience['experience'].isnull().all() else None
+    average_experience = distribution_sketches.summary('experience', days=days)['mean']
     col1, col2, col3 = st.columns(3)
     with col1:
         display_big_metric("Average experience needed:", f"{average_experience:.1f} years")
@@ -194,27 +187,22 @@ if not data_experience.empty:
 
 
 st.markdown("---")
-data = data[(data['max_salary'] < 300000)&(data['max_salary'] > 0)]
 # ---- Salary Analysis by Job ----
 
 
 st.write("## Salary by Job")
-data['avg_salary_rounded'] = data['avg_salary'].round()  # Round average salary
 
-if not data.empty:
+# Postings with a salary in range
+salary_by_category = distribution_sketches.box_stats('salary', 'job_category', days=days)
+
+if not salary_by_category.empty:
     # Create box plot
-    fig_salary_job_box = px.box(
-        data,
-        x='job_category',
-        y='avg_salary_rounded',
-        points=False,
-       # title="Salary Distribution by Job Category (Without Outliers)",
-        labels={'avg_salary_rounded': 'Average Salary (€)', 'job_category': 'Job Category'}
-    )
+    # title="Salary Distribution by Job Category (Without Outliers)",
+    fig_salary_job_box = box_figure(salary_by_category, 'Job Category', 'Average Salary (€)')
     st.plotly_chart(fig_salary_job_box)
 
     # Summary table for salary by job category (transposed, only average)
-    salary_summary = data.groupby('job_category')['avg_salary_rounded'].mean().reset_index()
+    salary_summary = salary_by_category['mean'].sort_index().reset_index()
     salary_summary.columns = ['Job Category', 'Average Salary (€)']
     salary_summary['Average Salary (€)'] = salary_summary['Average Salary (€)'].apply(lambda x: f"{int(x):,}")  # Format salary
     salary_summary = salary_summary.set_index('Job Category').T  # Transpose the summary
@@ -222,7 +210,7 @@ if not data.empty:
     # Insights for salary
     highest_salary_job = salary_summary.loc['Average Salary (€)'].idxmax()
     lowest_salary_job = salary_summary.loc['Average Salary (€)'].idxmin()
-    avg_salary = data['avg_salary'].mean() if not data['avg_salary'].isnull().all() else None
+    avg_salary = distribution_sketches.summary('salary', days=days)['mean']
     
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -241,20 +229,18 @@ st.markdown("---")
 # ---- Salary Analysis by Years of Experience ----
 st.write("## Salary by Years of Experience")
 
-if not data_experience.empty:
+# Whole years of experience; postings that do not say are 0 and left out
+salary_by_experience = distribution_sketches.box_stats('salary', 'experience_years', days=days)
+salary_by_experience = salary_by_experience[salary_by_experience.index > 0]
+
+if not salary_by_experience.empty:
     # Create box plot
-    fig_salary_exp = px.box(
-        data_experience,
-        x='experience_rounded',
-        y='avg_salary_rounded',
-        points=False,
-        #title="Salary by Years of Experience (Without Outliers)",
-        labels={'experience_rounded': 'Years of Experience', 'avg_salary_rounded': 'Average Salary (€)'}
-    )
+    #title="Salary by Years of Experience (Without Outliers)",
+    fig_salary_exp = box_figure(salary_by_experience, 'Years of Experience', 'Average Salary (€)')
     st.plotly_chart(fig_salary_exp)
 
     # Summary table for salary by years of experience (transposed, only average)
-    exp_salary_summary = data_experience.groupby('experience_rounded')['avg_salary_rounded'].mean().reset_index()
+    exp_salary_summary = salary_by_experience['mean'].sort_index().reset_index()
     exp_salary_summary.columns = ['Years of Experience', 'Average Salary (€)']
     exp_salary_summary['Average Salary (€)'] = exp_salary_summary['Average Salary (€)'].apply(lambda x: f"{int(x):,}")  # Format salary
     exp_salary_summary = exp_salary_summary.set_index('Years of Experience').T  # Transpose the summary
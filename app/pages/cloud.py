@@ -1,10 +1,7 @@
 import streamlit as st
-import boto3
-import pandas as pd
-from io import BytesIO
 from dotenv import load_dotenv
+from jobdata import PLATFORM_COLUMNS, load_cube, load_rollups
 import os
-import re
 import plotly.graph_objects as go
 import plotly.express as px
 from PIL import Image
@@ -24,42 +21,17 @@ cloud_path_2 = os.path.join(files_path, 'cloud_2.png')
 cloud = Image.open(cloud_path)
 cloud_2 = Image.open(cloud_path_2)
 
-# AWS credentials
-AWS_ACCESS_KEY = os.getenv('AWS_ACCESS_KEY')
-AWS_SECRET_KEY = os.getenv('AWS_SECRET_KEY')
-BUCKET_NAME = os.getenv('BUCKET_NAME')
-FILE_PREFIX = os.getenv('FILE_PREFIX')
-
-# Set up the S3 client
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=AWS_ACCESS_KEY,
-    aws_secret_access_key=AWS_SECRET_KEY
-)
-
-# Helper functions
-def get_latest_file():
-    response = s3_client.list_objects_v2(Bucket=BUCKET_NAME, Prefix=FILE_PREFIX)
-    files = [obj['Key'] for obj in response.get('Contents', []) if obj['Key'].endswith('.parquet')]
-    date_pattern = re.compile(r'jobdata_(\d{8})\.parquet')
-    files_with_dates = [(f, date_pattern.search(f).group(1)) for f in files if date_pattern.search(f)]
-    latest_file = max(files_with_dates, key=lambda x: x[1])[0]
-    return latest_file
-
-def load_data():
-    latest_file_key = get_latest_file()
-    obj = s3_client.get_object(Bucket=BUCKET_NAME, Key=latest_file_key)
-    data = pd.read_parquet(BytesIO(obj['Body'].read()))
-    return data
 
 # Format salary as € in thousands (k)
 def format_salary(value):
     return f"{value / 1000:.0f}k €"
 
 
-# Load the data
-data = load_data()
-max_extracted_date = data['extracted_date'].max()
+# Load the pre-aggregated snapshot
+cube = load_cube()
+rollups = load_rollups()
+totals = cube.query('postings')
+max_extracted_date = cube.last_extracted_date.date()
 
 st.set_page_config(page_title="YourFirstDataJob", page_icon="🎯", layout="wide")
 st.sidebar.image(image_logo)
@@ -123,18 +95,15 @@ with col2:
     st.image(cloud_2, use_column_width=True)
 st.markdown("---")
 
-platform_columns = ['azure', 'aws', 'gcp']
-
-for col in platform_columns:
-    data[col] = data[col].apply(lambda x: 1 if x == 'Y' else 0)
+# Platform flags arrive as 0/1, decoded once per snapshot
+platform_columns = PLATFORM_COLUMNS
 
 platform_labels = ['AWS', 'Azure', 'GCP']
-platform_counts = [sum(data['aws']), sum(data['azure']), sum(data['gcp'])]
+platform_counts = cube.skill_counts(columns=['aws', 'azure', 'gcp']).tolist()
 
-cloud_rows = (data[['azure', 'aws', 'gcp']] == 1).any(axis=1)
-cloud_rows_count = cloud_rows.sum()
+cloud_rows_count = totals['with_platform']
 
-perc_cloud_providers = cloud_rows_count / len(data) * 100 if len(data) > 0 else 0
+perc_cloud_providers = cloud_rows_count / totals['jobs'] * 100 if totals['jobs'] > 0 else 0
 
 display_big_metric("Jobs with cloud provided demanded", f"{perc_cloud_providers:.1f}%")
 
@@ -169,36 +138,16 @@ with col1:
     st.subheader("The most demanded platform")
     st.plotly_chart(fig)
 
-# Clean and prepare data for experience and salary comparison
-data['avg_experience'] = data['experience'].fillna(0).apply(lambda x: round(x))
-data = data[(data['max_salary'] < 300000)&(data['max_salary'] > 0)]
-
-# AWS Data
-aws_data = data[data['aws'] == 1]
-aws_data = aws_data.groupby(['aws']).agg(
-    avg_experience=('avg_experience', 'mean'),
-    avg_salary=('avg_salary', 'mean')
-).reset_index()
-
-# Azure Data
-azure_data = data[data['azure'] == 1]
-azure_data = azure_data.groupby(['azure']).agg(
-    avg_experience=('avg_experience', 'mean'),
-    avg_salary=('avg_salary', 'mean')
-).reset_index()
-
-# GCP Data
-gcp_data = data[data['gcp'] == 1]
-gcp_data = gcp_data.groupby(['gcp']).agg(
-    avg_experience=('avg_experience', 'mean'),
-    avg_salary=('avg_salary', 'mean')
-).reset_index()
+# Experience and salary comparison, without salary outliers
+in_range = [('salary_in_range', '==', True)]
+platform_sums = cube.query('skills_by_category', by=['skill'],
+                           filters=in_range + [('skill', 'in', ['aws', 'azure', 'gcp'])]).loc[['aws', 'azure', 'gcp']]
 
 # Combine the data for sorting
 platform_data = {
     'Platform': ['AWS', 'Azure', 'GCP'],
-    'Average Salary': [aws_data['avg_salary'].iloc[0], azure_data['avg_salary'].iloc[0], gcp_data['avg_salary'].iloc[0]],
-    'Average Experience': [aws_data['avg_experience'].iloc[0], azure_data['avg_experience'].iloc[0], gcp_data['avg_experience'].iloc[0]]
+    'Average Salary': (platform_sums['salary_sum'] / platform_sums['salary_n']).tolist(),
+    'Average Experience': (platform_sums['avg_experience_sum'] / platform_sums['jobs']).tolist()
 }
 
 # Sort the data by Average Salary (from highest to lowest)
@@ -263,14 +212,10 @@ with col3:
 st.markdown("---")
 st.write("## Temporal evolution")
 
-if not data.empty and 'date_creation' in data.columns:
-    data['date_creation'] = pd.to_datetime(data['date_creation'])
-    filtered_data = data[data[platform_columns].any(axis=1)]
-    cloud_over_time = (filtered_data.groupby(pd.Grouper(key='date_creation', freq='W'))[platform_columns]
-                        .sum()
-                        .reset_index())
+if totals['jobs'] > 0:
+    cloud_over_time = rollups['skills'].query('week', filters=in_range, columns=platform_columns).reset_index()
     
-    platform_counts = data[platform_columns].sum().sort_values(ascending=False)
+    platform_counts = cube.skill_counts(filters=in_range, columns=platform_columns).sort_values(ascending=False)
     platform_long = cloud_over_time.melt(id_vars='date_creation', var_name='Cloud platform', value_name='Count')
 
     all_platforms = platform_columns  
@@ -1,12 +1,13 @@
 import streamlit as st
-import boto3
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from io import BytesIO
 from dotenv import load_dotenv
+from jobdata import (
+    RECENT_POSTINGS, SKILLS_COLUMNS, load_cube, load_data, load_geo, load_hexbins, load_rollups,
+    load_salary_histogram, load_skill_index,
+)
 import os
-import re
 from PIL import Image
 from datetime import datetime
 
@@ -40,65 +41,27 @@ network_1 = Image.open(network_1_path)
 
 
 
-# Access the environment variables
-AWS_ACCESS_KEY = os.getenv('AWS_ACCESS_KEY')
-AWS_SECRET_KEY = os.getenv('AWS_SECRET_KEY')
-BUCKET_NAME = os.getenv('BUCKET_NAME')
-FILE_PREFIX = os.getenv('FILE_PREFIX')
-
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=AWS_ACCESS_KEY,
-    aws_secret_access_key=AWS_SECRET_KEY
-)
-
-#@st.cache_data
-def get_latest_file():
-    # List files in the bucket with the specified prefix
-    response = s3_client.list_objects_v2(Bucket=BUCKET_NAME, Prefix=FILE_PREFIX)
-    files = [obj['Key'] for obj in response.get('Contents', []) if obj['Key'].endswith('.parquet')]
-
-    # Extract dates from filenames and sort them to find the latest file
-    date_pattern = re.compile(r'jobdata_(\d{8})\.parquet')
-    files_with_dates = [(f, date_pattern.search(f).group(1)) for f in files if date_pattern.search(f)]
-    latest_file = max(files_with_dates, key=lambda x: x[1])[0]  # Get the file with the latest date
-
-    return latest_file
-
-#@st.cache_data
-def load_data():
-    # Get the latest file and read it as a Parquet file into a DataFrame
-    latest_file_key = get_latest_file()
-    obj = s3_client.get_object(Bucket=BUCKET_NAME, Key=latest_file_key)
-    data = pd.read_parquet(BytesIO(obj['Body'].read()))
-    return data
 
 # Format salary as € in thousands (k)
 def format_salary(value):
     return f"{value / 1000:.0f}k €"
 
 
-data = load_data()
-
-data = data[(data['year'] > 2023)]
-skills_columns = [
-    'sql', 'python', 'pyspark', 'azure', 'aws', 'gcp', 'etl', 'airflow', 'kafka', 'spark', 
-    'power_bi', 'tableau', 'snowflake', 'docker', 'kubernetes', 'git', 'data_warehouse', 
-    'hadoop', 'mlops', 'data_lake', 'bigquery', 'databricks', 'dbt', 'mlflow', 'java', 
-    'scala', 'sas', 'matlab', 'power_query', 'looker', 'apache', 'hive', 'terraform', 
-    'jenkins', 'gitlab', 'machine_learning', 'deep_learning', 'nlp', 'api', 'pipeline', 
-    'data_governance', 'erp', 'ssis', 'ssas', 'ssrs', 'ssms', 'postgre', 'mysql', 'mongodb', 
-    'cloud', 'synapse', 'blobstorage', 'azure_devops', 'fabric', 'glue', 'redshift', 's3', 
-    'lambda', 'emr', 'athena', 'kinesis', 'rds', 'sagemaker'
-]
+# Charts read the pre-aggregated cube; the rows are only needed for the
+# impostor section
+cube = load_cube()
+rollups = load_rollups()
+# Only what the impostor section reads; the skill index and the salary
+# histogram are built on the same projection, so their rows line up
+impostor_columns = ['job_category', 'experience', 'avg_salary'] + SKILLS_COLUMNS
+data = load_data(columns=impostor_columns, filters=RECENT_POSTINGS)
 
-# Convert 'Y'/'N' to binary values (1 for Y, 0 for N)
-for col in skills_columns:
-    data[col] = data[col].apply(lambda x: 1 if x == 'Y' else 0)
+# Skill flags arrive as 0/1, decoded once per snapshot
+skills_columns = SKILLS_COLUMNS
 
 
 
-max_extracted_date = data['extracted_date'].max()
+max_extracted_date = cube.last_extracted_date.date()
 
 st.set_page_config(page_title="YourFirstDataJob", page_icon="🎯",layout="wide")
 st.sidebar.image(image_logo)
@@ -184,9 +147,10 @@ with col2:
     st.image(market_trends, use_column_width=True)
 col1, col2 = st.columns(2)
 with col1:
-    number_of_jobs = len(data)
-    jobs_with_salary = len(data[data['avg_salary'].notnull()])
-    jobs_with_experience = len(data[data['experience_bool'] != 'N'])
+    totals = cube.query('postings', filters=RECENT_POSTINGS)
+    number_of_jobs = totals['jobs']
+    jobs_with_salary = totals['salary_n']
+    jobs_with_experience = totals['with_experience']
 
     percent_with_salary = (jobs_with_salary / number_of_jobs) * 100 if number_of_jobs > 0 else 0
     percent_with_experience = (jobs_with_experience / number_of_jobs) * 100 if number_of_jobs > 0 else 0
@@ -197,24 +161,15 @@ with col1:
     
 with col2:
 
-    df = data.copy()
-    
-
-    df['date_creation'] = pd.to_datetime(df['date_creation'])
-    df['extracted_date'] = pd.to_datetime(df['extracted_date'])
-
-    df['effective_date'] = df.apply(
-        lambda row: row['date_creation'] if row['extracted_date'] <= pd.Timestamp('2024-11-04') else row['extracted_date'], 
-        axis=1
-    )
-
     one_month_ago = pd.Timestamp.now() - pd.DateOffset(months=1)
-    df_filtered = df[df['effective_date'] >= one_month_ago]
+    job_counts = rollups['jobs_by_category'].query(
+        'day', filters=RECENT_POSTINGS + [('effective_date', '>=', one_month_ago)]
+    ).sum(axis=1)
+    job_counts = job_counts[job_counts > 0].reset_index(name='number_of_jobs')
 
-    if df_filtered.empty:
+    if job_counts.empty:
         st.write("No job data available for the last month.")
     else:
-        job_counts = df_filtered.groupby('effective_date').size().reset_index(name='number_of_jobs')
 
         fig = px.line(
             job_counts, 
@@ -239,11 +194,10 @@ col1, col2 = st.columns(2)
 with col1:
     st.write("### Most demanded job categories")
 
-    if not data.empty:
+    if number_of_jobs > 0:
 
         most_demanded_jobs = (
-            data['job_category']
-            .value_counts()
+            cube.query('postings', by=['job_category'], filters=RECENT_POSTINGS)['jobs']
             .sort_values(ascending=False)
             .head(10)
         )
@@ -279,18 +233,27 @@ with col1:
 with col2:
 
     st.write("### Job Locations Map")
-    if not data.empty:
-        job_counts = data.groupby(['latitude', 'longitude']).size().reset_index(name='job_count')
-        fig = px.scatter_mapbox(
-                job_counts,
-                lat="latitude",
-                lon="longitude",
-                size="job_count",
-                color_continuous_scale=px.colors.cyclical.IceFire,
-                size_max=15,
-                zoom=5,
-                mapbox_style="carto-positron",
-        )
+    if number_of_jobs > 0:
+        map_zoom = 5
+        map_mode = st.radio("Map mode", ["Points", "Density"], horizontal=True)
+        if map_mode == "Points":
+            # One marker per grid cell of the map's zoom, counted once per snapshot
+            job_counts = load_geo(filters=RECENT_POSTINGS).query(map_zoom)
+            fig = px.scatter_mapbox(
+                    job_counts,
+                    lat="latitude",
+                    lon="longitude",
+                    size="job_count",
+                    color_continuous_scale=px.colors.cyclical.IceFire,
+                    size_max=15,
+                    zoom=map_zoom,
+                    mapbox_style="carto-positron",
+            )
+        else:
+            # Jobs per hexagon, binned once per snapshot and resolution
+            hexbins = load_hexbins(map_zoom, filters=RECENT_POSTINGS)
+            job_counts = hexbins.query()
+            fig = hexbins.figure(job_counts, map_zoom)
         fig.update_layout(
                 autosize=False,
                 width=1000,
@@ -312,16 +275,16 @@ with col2:
     st.image(education, use_column_width=True)
     
     
-rows_with_skill = data[skills_columns].any(axis=1).sum()
-perc_rows_with_skill = rows_with_skill / len(data) *100
-skill_counts = data[skills_columns].sum().sort_values(ascending=False)
+rows_with_skill = totals['with_skill']
+perc_rows_with_skill = rows_with_skill / number_of_jobs *100
+skill_counts = cube.skill_counts(filters=RECENT_POSTINGS).sort_values(ascending=False)
 top_skills = skill_counts.head(3).index.tolist() if not skill_counts.empty else []
 top_skill_1 = top_skills[0] if len(top_skills) > 0 else None
 top_skill_2 = top_skills[1] if len(top_skills) > 1 else None
 top_skill_3 = top_skills[2] if len(top_skills) > 2 else None
-perc_jobs_with_skill_1 = (data[top_skill_1].sum() / len(data)) * 100
-perc_jobs_with_skill_2 = (data[top_skill_2].sum() / len(data)) * 100
-perc_jobs_with_skill_3 = (data[top_skill_3].sum() / len(data)) * 100
+perc_jobs_with_skill_1 = (skill_counts[top_skill_1] / number_of_jobs) * 100
+perc_jobs_with_skill_2 = (skill_counts[top_skill_2] / number_of_jobs) * 100
+perc_jobs_with_skill_3 = (skill_counts[top_skill_3] / number_of_jobs) * 100
     
 
 col_1, col_2 = st.columns(2)
@@ -345,17 +308,11 @@ with col_1:
 with col_2:
     st.write("## Temporal evolution of skills")
 
-    if not data.empty and 'date_creation' in data.columns:
+    if number_of_jobs > 0:
 
-        data['date_creation'] = pd.to_datetime(data['date_creation'])
-
-
-        filtered_data = data[data[skills_columns].any(axis=1)]
-
-
-        skills_over_time = (filtered_data.groupby(pd.Grouper(key='date_creation', freq='M'))[skills_columns]
-                            .sum()
-                            .reset_index())
+        skills_over_time = rollups['skills'].query(
+            'month', filters=RECENT_POSTINGS, columns=SKILLS_COLUMNS
+        ).reset_index()
 
 
         skills_long = skills_over_time.melt(id_vars='date_creation', var_name='Skill', value_name='Count')
@@ -424,22 +381,21 @@ with col_2:
         )
         st.write(f"Selected Experience Range: {experience_range[0]} - {experience_range[1]} years")
 
-        # Filter data by experience range
-        filtered_data = data[(data['experience'] >= experience_range[0]) & (data['experience'] <= experience_range[1]) & (data['avg_salary']>0)]
+        # Postings in the experience range with a salary, as a set of rows
+        skill_index = load_skill_index(columns=impostor_columns, filters=RECENT_POSTINGS)
+        filtered_rows = skill_index.experience_between(*experience_range) & skill_index.with_salary
 
         if selected_skills:
-            # Create a boolean mask for any of the selected skills being present
-            mask = filtered_data[selected_skills].any(axis=1)
-
             # Filter jobs where at least one of the selected skills is present
-            jobs_with_skills = filtered_data[mask]
+            matching_rows = skill_index.any_of(selected_skills) & filtered_rows
+            jobs_with_skills = data.take(matching_rows.to_array())
 
             # Count jobs by category
-            job_counts = jobs_with_skills['job_category'].value_counts().reset_index()
+            job_counts = jobs_with_skills['job_category'].value_counts().loc[lambda counts: counts > 0].reset_index()
             job_counts.columns = ['Job Category', 'Count']
 
             # Calculate percentage for each job category based on total dataset
-            total_jobs = len(filtered_data)  # Total number of jobs in the filtered dataset
+            total_jobs = len(filtered_rows)  # Total number of jobs in the filtered dataset
             job_counts['Percentage'] = (job_counts['Count'] / total_jobs) * 100
 
             # Display the most fitted job profile
@@ -454,16 +410,16 @@ with col_2:
                     avg_salary = salary_rows['avg_salary'].mean()
                     display_big_metric(f"Average salary:", f"{format_salary(avg_salary)}")
 
-                # Plot Salary Distribution with more detailed bins
+                # Plot Salary Distribution, pre-binned once per snapshot
                 st.subheader("Salary Distribution")
-                fig_salary_distribution = px.histogram(
-                    jobs_with_skills,
-                    x='avg_salary',
-                    nbins=50,  # Increased number of bins for more detail
-                    #title="Salary Distribution for Jobs Matching Selected Skills",
-                    labels={'avg_salary': 'Salary (€)'},
+                salary_histogram = load_salary_histogram(columns=impostor_columns, filters=RECENT_POSTINGS)
+                salary_counts = salary_histogram.counts(matching_rows)
+                fig_salary_distribution = go.Figure(data=[go.Bar(
+                    x=salary_counts.index + salary_histogram.width / 2,  # Bin centers
+                    y=salary_counts.values,
+                    #name="Salary Distribution for Jobs Matching Selected Skills",
                     opacity=0.7
-                )
+                )])
 
                 # Update layout to fix the x-axis range from 20000 to 80000
                 fig_salary_distribution.update_layout(
@@ -1,14 +1,12 @@
 import streamlit as st
-import boto3
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from io import BytesIO
 from dotenv import load_dotenv
+from jobdata import RECENT_POSTINGS, load_cube, load_data, load_geo, load_hexbins, load_kpis, load_rollups
 
 from PIL import Image
 import os
-import re
 
 
 
@@ -23,44 +21,16 @@ image_logo = Image.open(image_path)
 market_data_path = os.path.join(files_path, 'market_data.png')
 market_data = Image.open(market_data_path)
 
-# Access the environment variables
-AWS_ACCESS_KEY = os.getenv('AWS_ACCESS_KEY')
-AWS_SECRET_KEY = os.getenv('AWS_SECRET_KEY')
-BUCKET_NAME = os.getenv('BUCKET_NAME')
-FILE_PREFIX = os.getenv('FILE_PREFIX')
-
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=AWS_ACCESS_KEY,
-    aws_secret_access_key=AWS_SECRET_KEY
-)
-
-def get_latest_file():
-    # List files in the bucket with the specified prefix
-    response = s3_client.list_objects_v2(Bucket=BUCKET_NAME, Prefix=FILE_PREFIX)
-    files = [obj['Key'] for obj in response.get('Contents', []) if obj['Key'].endswith('.parquet')]
-
-    # Extract dates from filenames and sort them to find the latest file
-    date_pattern = re.compile(r'jobdata_(\d{8})\.parquet')
-    files_with_dates = [(f, date_pattern.search(f).group(1)) for f in files if date_pattern.search(f)]
-    latest_file = max(files_with_dates, key=lambda x: x[1])[0]  # Get the file with the latest date
-
-    return latest_file
-
-def load_data():
-    # Get the latest file and read it as a Parquet file into a DataFrame
-    latest_file_key = get_latest_file()
-    obj = s3_client.get_object(Bucket=BUCKET_NAME, Key=latest_file_key)
-    data = pd.read_parquet(BytesIO(obj['Body'].read()))
-    return data
 
 # Format salary as € in thousands (k)
 def format_salary(value):
     return f"{value / 1000:.0f}k €"
 
 
-data = load_data()
-max_extracted_date = data['extracted_date'].max()
+# Pre-aggregated counts for the charts that do not depend on the sidebar filters
+cube = load_cube()
+rollups = load_rollups()
+max_extracted_date = cube.last_extracted_date.date()
 
 st.set_page_config(page_title="YourFirstDataJob", page_icon="🎯",layout="wide")
 st.sidebar.image(image_logo)
@@ -113,19 +83,17 @@ def display_big_metric(title, value, delta=None):
     )
 
 # Fetch data
-data = load_data()
-data = data[(data['year'] > 2023)]
-number_of_jobs = len(data)
-jobs_with_salary = len(data[data['avg_salary'].notnull()])
-jobs_with_experience = len(data[data['experience_bool'] != 'N'])
+market_columns = ['job_category', 'year', 'month', 'avg_salary', 'experience', 'experience_bool', 'contract_type',
+                  'company_field', 'date_creation', 'extracted_date', 'latitude', 'longitude']
+data = load_data(columns=market_columns, filters=RECENT_POSTINGS)
+totals = cube.query('postings', filters=RECENT_POSTINGS)
+number_of_jobs = totals['jobs']
+jobs_with_salary = totals['salary_n']
+jobs_with_experience = totals['with_experience']
 
 percent_with_salary = (jobs_with_salary / number_of_jobs) * 100 if number_of_jobs > 0 else 0
 percent_with_experience = (jobs_with_experience / number_of_jobs) * 100 if number_of_jobs > 0 else 0
 
-data_experience = data[data['experience'].notnull()]
-data_experience['experience'] = data_experience['experience'].astype(int) 
-data_experience= data_experience[data_experience['experience'] > 0]
-
 
 #with col2:
 st.title("""
@@ -153,10 +121,9 @@ st.markdown("---")
 
 col1, col2 = st.columns(2)
 with col1:
-    if not data.empty:
+    if number_of_jobs > 0:
         most_demanded_jobs = (
-            data['job_category']
-            .value_counts()
+            cube.query('postings', by=['job_category'], filters=RECENT_POSTINGS)['jobs']
             .sort_values(ascending=False)
             .head(10)
         )
@@ -190,25 +157,16 @@ with col1:
         st.plotly_chart(fig)
     
 with col2:
-    if not data.empty and 'date_creation' in data.columns:
-        data['date_creation'] = pd.to_datetime(data['date_creation'], errors='coerce')
-        data['extracted_date'] = pd.to_datetime(data['extracted_date'], errors='coerce')
-
-        data['effective_date'] = data.apply(
-            lambda row: row['date_creation'] if row['extracted_date'] <= pd.Timestamp('2024-11-04') else row['extracted_date'], 
-            axis=1
-        )
-        
-        filtered_data = data[data['effective_date'] > pd.Timestamp('2024-11-01')]
-        
-
+    if number_of_jobs > 0:
+        weekly_jobs = rollups['jobs_by_category'].query(
+            'week', filters=RECENT_POSTINGS + [('effective_date', '>', pd.Timestamp('2024-11-01'))]
+        ).stack()
+        # Weeks in which a category had no posting are left out, as when grouping the postings
         job_category_over_time = (
-            filtered_data.groupby([pd.Grouper(key='effective_date', freq='W-SUN'), 'job_category'])
-            .size()
-            .reset_index(name='Count')
+            weekly_jobs[weekly_jobs > 0].rename_axis(['effective_date', 'job_category']).reset_index(name='Count')
         )
 
-        top_10_categories = job_category_over_time.groupby('job_category')['Count'].sum().nlargest(10).index
+        top_10_categories = job_category_over_time.groupby('job_category', observed=True)['Count'].sum().nlargest(10).index
         job_category_top10 = job_category_over_time[job_category_over_time['job_category'].isin(top_10_categories)]
 
         if not job_category_top10.empty:
@@ -235,23 +193,25 @@ st.markdown("---")
 st.write("### Filter Options")
 col1, col2, col3, col4 = st.columns(4)
 
+# KPIs of every filter combination, pre-aggregated once per snapshot
+market_kpis = load_kpis(columns=market_columns, filters=RECENT_POSTINGS)
+
 with col1:
-    job_categories = data['job_category'].unique().tolist()
+    job_categories = market_kpis.options('job_category')
     selected_category = st.selectbox("Select Job Category", options=["All"] + job_categories)
 
 with col2:
-    years = data['year'].unique().tolist()
+    years = market_kpis.options('year')
     selected_year = st.selectbox("Select Year", options=["All"] + years)
 
 with col3:
-    months = data['month'].unique().tolist()
+    months = market_kpis.options('month')
     selected_month = st.selectbox("Select Month", options=["All"] + months)
 
 
 with col4:
     # Add salary filter using slider
-    max_salary_data = data[data['avg_salary'] < 300000]
-    max_salary = int(max_salary_data['avg_salary'].max())
+    max_salary = market_kpis.salary_top
     salary_range = st.slider(
         "Select Salary Range (€)", 
         min_value=0, 
@@ -260,8 +220,8 @@ with col4:
         step=5000,
         format="€%d"
     )
-# Apply filters to data
-filtered_data = data.copy()
+# Apply filters to data (for the charts below; the KPIs come from market_kpis)
+filtered_data = data
 
 # Apply the selected filters to the dataset
 if selected_category != "All":
@@ -275,33 +235,38 @@ if selected_month != "All":
 
 
 # Apply filtering based on the dynamic max_salary
-if salary_range != (0, max_salary):
+salary_filter = salary_range if salary_range != (0, max_salary) else None
+if salary_filter:
     filtered_data = filtered_data[
         (filtered_data['avg_salary'] >= salary_range[0]) & 
         (filtered_data['avg_salary'] <= salary_range[1])
     ]
 
+kpis = market_kpis.query(
+    job_category=None if selected_category == "All" else selected_category,
+    year=None if selected_year == "All" else selected_year,
+    month=None if selected_month == "All" else selected_month,
+    salary_range=salary_filter,
+)
+
 # ---- Check if data is empty after filtering ----
-if filtered_data.empty:
+if kpis['jobs'] == 0:
     st.write("No data available for the selected filters.")
 else:
     # ---- KPIs Calculation ----
-    len_data = len(filtered_data)
-    avg_experience_data = filtered_data[filtered_data['experience'] > 0]
-    average_experience = avg_experience_data['experience'].mean() if not avg_experience_data['experience'].isnull().all() else 0
+    len_data = kpis['jobs']
+    average_experience = kpis['average_experience']
 
     # Calculate the contract type counts and percentages
-    contract_counts = filtered_data['contract_type'].value_counts()
+    contract_counts = kpis['contract_counts']
     total_contracts = contract_counts.sum()
     top_contract_type = contract_counts.idxmax() if not contract_counts.empty else "N/A"
     top_contract_percentage = (contract_counts.max() / total_contracts) * 100 if total_contracts > 0 else 0
 
-    # Salary calculation
-    filtered_data_salary = filtered_data[(filtered_data['avg_salary'] < 300000) & (filtered_data['avg_salary'] > 0)]
-   # filtered_data_salary = filtered_data[(filtered_data['avg_salary'] > 0)]
-    min_salary = filtered_data_salary['avg_salary'].min() if not filtered_data_salary['avg_salary'].isnull().all() else 0
-    max_salary = filtered_data_salary['avg_salary'].max() if not filtered_data_salary['avg_salary'].isnull().all() else 0
-    average_salary = filtered_data_salary['avg_salary'].mean() if not filtered_data_salary['avg_salary'].isnull().all() else 0
+    # Salary calculation (salaries in (0, 300000))
+    min_salary = kpis['min_salary']
+    max_salary = kpis['max_salary']
+    average_salary = kpis['average_salary']
 
     # ---- KPI Section ----
     st.write("### Key Performance Indicators (KPIs)")
@@ -339,17 +304,8 @@ else:
 with col1:
     # Job time series data
     st.write("### Number of jobs over the last month")
-    df = filtered_data.copy()
-    
-    # Ensure both columns are datetime
-    df['date_creation'] = pd.to_datetime(df['date_creation'])
-    df['extracted_date'] = pd.to_datetime(df['extracted_date'])
-
-    # Use the appropriate column for each row
-    df['effective_date'] = df.apply(
-        lambda row: row['date_creation'] if row['extracted_date'] <= pd.Timestamp('2024-11-04') else row['extracted_date'], 
-        axis=1
-    )
+    # effective_date comes precomputed with the snapshot
+    df = filtered_data
 
     # Filter to show data for the last month
     one_month_ago = pd.Timestamp.now() - pd.DateOffset(months=1)
@@ -381,17 +337,33 @@ with col1:
         # ---- Job Locations Map Section ----
         st.write("### Job Locations Map")
         if not filtered_data.empty:
-            job_counts = filtered_data.groupby(['latitude', 'longitude']).size().reset_index(name='job_count')
-            fig = px.scatter_mapbox(
-                job_counts,
-                lat="latitude",
-                lon="longitude",
-                size="job_count",
-                color_continuous_scale=px.colors.cyclical.IceFire,
-                size_max=15,
-                zoom=5,
-                mapbox_style="carto-positron",
+            map_zoom = 5
+            map_filters = dict(
+                job_category=None if selected_category == "All" else selected_category,
+                year=None if selected_year == "All" else selected_year,
+                month=None if selected_month == "All" else selected_month,
+                salary_range=salary_filter,
             )
+            map_mode = st.radio("Map mode", ["Points", "Density"], horizontal=True)
+            if map_mode == "Points":
+                # One marker per grid cell of the map's zoom, from counts of
+                # every filter combination made once per snapshot
+                job_counts = load_geo(columns=market_columns, filters=RECENT_POSTINGS).query(map_zoom, **map_filters)
+                fig = px.scatter_mapbox(
+                    job_counts,
+                    lat="latitude",
+                    lon="longitude",
+                    size="job_count",
+                    color_continuous_scale=px.colors.cyclical.IceFire,
+                    size_max=15,
+                    zoom=map_zoom,
+                    mapbox_style="carto-positron",
+                )
+            else:
+                # Jobs per hexagon, binned once per snapshot and resolution
+                hexbins = load_hexbins(map_zoom, columns=market_columns, filters=RECENT_POSTINGS)
+                job_counts = hexbins.query(**map_filters)
+                fig = hexbins.figure(job_counts, map_zoom)
             fig.update_layout(
                 autosize=False,
                 width=1000,
@@ -414,6 +386,7 @@ if not filtered_data.empty:
     most_demanded_company_fields = (
         filtered_data['company_field']
         .value_counts()
+        .loc[lambda counts: counts > 0]
         .sort_values(ascending=False)
         .head(10)
     )
@@ -1,10 +1,7 @@
 import streamlit as st
-import boto3
-import pandas as pd
-from io import BytesIO
 from dotenv import load_dotenv
+from jobdata import load_data
 import os
-import re
 import plotly.express as px
 from PIL import Image
 
@@ -25,36 +22,10 @@ network_1 = Image.open(network_1_path)
 
 
 
-AWS_ACCESS_KEY = os.getenv('AWS_ACCESS_KEY')
-AWS_SECRET_KEY = os.getenv('AWS_SECRET_KEY')
-BUCKET_NAME = os.getenv('BUCKET_NAME')
-FILE_PREFIX = os.getenv('FILE_PREFIX')
 
-# Set up the S3 client
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=AWS_ACCESS_KEY,
-    aws_secret_access_key=AWS_SECRET_KEY
-)
 
-# Helper functions
-def get_latest_file():
-    response = s3_client.list_objects_v2(Bucket=BUCKET_NAME, Prefix=FILE_PREFIX)
-    files = [obj['Key'] for obj in response.get('Contents', []) if obj['Key'].endswith('.parquet')]
-    date_pattern = re.compile(r'jobdata_(\d{8})\.parquet')
-    files_with_dates = [(f, date_pattern.search(f).group(1)) for f in files if date_pattern.search(f)]
-    latest_file = max(files_with_dates, key=lambda x: x[1])[0]
-    return latest_file
-
-def load_data():
-    latest_file_key = get_latest_file()
-    obj = s3_client.get_object(Bucket=BUCKET_NAME, Key=latest_file_key)
-    data = pd.read_parquet(BytesIO(obj['Body'].read()))
-    return data
-
-
-data = load_data()
-max_extracted_date = data['extracted_date'].max()
+data = load_data(columns=['extracted_date'])
+max_extracted_date = data['extracted_date'].max().date()
 
 st.set_page_config(page_title="YourFirstDataJob", page_icon="🎯",layout="wide")
 st.sidebar.image(image_logo)
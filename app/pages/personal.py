@@ -1,10 +1,7 @@
 import streamlit as st
-import boto3
-import pandas as pd
-from io import BytesIO
 from dotenv import load_dotenv
+from jobdata import PLATFORM_COLUMNS, SKILLS_COLUMNS, load_cube, load_data, load_skill_index
 import os
-import re
 import plotly.express as px
 from PIL import Image
 
@@ -22,35 +19,16 @@ profile = Image.open(profile_path)
 
 
 
-AWS_ACCESS_KEY = os.getenv('AWS_ACCESS_KEY')
-AWS_SECRET_KEY = os.getenv('AWS_SECRET_KEY')
-BUCKET_NAME = os.getenv('BUCKET_NAME')
-FILE_PREFIX = os.getenv('FILE_PREFIX')
 
-# Set up the S3 client
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=AWS_ACCESS_KEY,
-    aws_secret_access_key=AWS_SECRET_KEY
-)
-
-# Helper functions
-def get_latest_file():
-    response = s3_client.list_objects_v2(Bucket=BUCKET_NAME, Prefix=FILE_PREFIX)
-    files = [obj['Key'] for obj in response.get('Contents', []) if obj['Key'].endswith('.parquet')]
-    date_pattern = re.compile(r'jobdata_(\d{8})\.parquet')
-    files_with_dates = [(f, date_pattern.search(f).group(1)) for f in files if date_pattern.search(f)]
-    latest_file = max(files_with_dates, key=lambda x: x[1])[0]
-    return latest_file
-
-def load_data():
-    latest_file_key = get_latest_file()
-    obj = s3_client.get_object(Bucket=BUCKET_NAME, Key=latest_file_key)
-    data = pd.read_parquet(BytesIO(obj['Body'].read()))
-    return data
-
-data = load_data()
-max_extracted_date = data['extracted_date'].max()
+# Skill counts come from the pre-aggregated cube; the rows are only needed for
+# the ranking on the selected skills
+cube = load_cube()
+# The job matching only reads categories and skills; the skill index is
+# built on the same projection, so its rows line up
+matching_columns = ['job_category'] + SKILLS_COLUMNS
+data = load_data(columns=matching_columns)
+number_of_jobs = cube.query('postings')['jobs']
+max_extracted_date = cube.last_extracted_date.date()
 
 st.set_page_config(page_title="YourFirstDataJob", page_icon="🎯",layout="wide")
 st.sidebar.image(image_logo)
@@ -111,24 +89,9 @@ def display_big_metric(title, value, delta=None):
     )
     
     
-# Fetch data
-data = load_data()
-
-# Skills columns
-skills_columns = [
-    'sql', 'python', 'pyspark', 'etl', 'airflow', 'kafka', 'spark', 
-    'power_bi', 'tableau', 'snowflake', 'docker', 'kubernetes', 'git', 'data_warehouse', 
-    'hadoop', 'mlops', 'data_lake', 'bigquery', 'databricks', 'dbt', 'mlflow', 'java', 
-    'scala', 'sas', 'matlab', 'power_query', 'looker', 'apache', 'hive', 'terraform', 
-    'jenkins', 'gitlab', 'machine_learning', 'deep_learning', 'nlp', 'api', 'pipeline', 
-    'data_governance', 'erp', 'ssis', 'ssas', 'ssrs', 'ssms', 'postgre', 'mysql', 'mongodb', 
-    'cloud', 'synapse', 'blobstorage', 'azure_devops', 'fabric', 'glue', 'redshift', 's3', 
-    'lambda', 'emr', 'athena', 'kinesis', 'rds', 'sagemaker'
-]
-
-# Convert 'Y'/'N' to binary values (1 for Y, 0 for N)
-for col in skills_columns:
-    data[col] = data[col].apply(lambda x: 1 if x == 'Y' else 0)
+
+# Skills columns (0/1, decoded once per snapshot), without the cloud platforms
+skills_columns = [col for col in SKILLS_COLUMNS if col not in PLATFORM_COLUMNS]
 
 # Streamlit App Layout
 # st.title("Your profile analysis")
@@ -140,8 +103,8 @@ with col2:
     st.image(profile, use_column_width=True)
 st.markdown("---")
 
-if not data.empty:
-    skill_counts = data[skills_columns].sum().sort_values(ascending=False)
+if number_of_jobs > 0:
+    skill_counts = cube.skill_counts(columns=skills_columns).sort_values(ascending=False)
     # Get the top 5 skills
     top_10_skills = skill_counts.head(5).index
 
@@ -165,18 +128,16 @@ selected_skill = st.selectbox(
 
 # Calculate proficiency percentage
 if selected_skill:
-    proficiency = skill_counts[selected_skill] / len(data) * 100 if len(data) > 0 else 0
+    proficiency = skill_counts[selected_skill] / number_of_jobs * 100 if number_of_jobs > 0 else 0
     
 
 if selected_skills_for_ranking:
-    # Create a boolean mask for any of the selected skills being present
-    mask = data[selected_skills_for_ranking].any(axis=1)  # Ensure there's at least one skill (1)
-
     # Filter jobs where at least one of the selected skills is present
-    jobs_with_skills = data[mask]
+    matching_rows = load_skill_index(columns=matching_columns).any_of(selected_skills_for_ranking)
+    jobs_with_skills = data.take(matching_rows.to_array())
 
     # Only count jobs with at least one skill (no all-zero rows)
-    job_counts = jobs_with_skills['job_category'].value_counts().reset_index()
+    job_counts = jobs_with_skills['job_category'].value_counts().loc[lambda counts: counts > 0].reset_index()
     job_counts.columns = ['Job Category', 'Count']  # Change 'Job Title' to 'Job Category'
 
     # Sort by Count
@@ -222,12 +183,16 @@ if selected_skills_for_ranking:
 st.write("## Top 8 Skills Demanded Per Job Category")
 st.markdown("---")
 
-# Filter data to include only jobs with at least one skill defined
-has_at_least_one_skill = data[skills_columns].sum(axis=1) > 0
-filtered_data = data[has_at_least_one_skill]
+# Skill counts per job category (categories with no skill defined are left out)
+skill_sums = (
+    cube.query('skills_by_category', by=['job_category', 'skill'], filters=[('skill', 'in', skills_columns)])['jobs']
+    .unstack('skill', fill_value=0)
+    .reindex(columns=skills_columns, fill_value=0)
+    .rename_axis(columns=None)
+)
+skill_sums = skill_sums[skill_sums.sum(axis=1) > 0]
 
-# Group by job_category and calculate percentages
-skill_sums = filtered_data.groupby('job_category')[skills_columns].sum()
+# Calculate percentages
 skill_percentages = skill_sums.div(skill_sums.sum(axis=1), axis=0) * 100
 
 # Get the top 8 skills for each job category based on percentages
@@ -1,13 +1,10 @@
 import streamlit as st
-import boto3
 import pandas as pd
-from io import BytesIO
 from dotenv import load_dotenv
+from jobdata import load_data, load_model_from_s3
 import os
-import re
 import plotly.express as px
 from PIL import Image
-import joblib
 
 
 
@@ -36,57 +33,15 @@ model_2_path = os.path.join(files_path, 'model_2.png')
 model_2 = Image.open(model_2_path)
 
 
-AWS_ACCESS_KEY = os.getenv('AWS_ACCESS_KEY')
-AWS_SECRET_KEY = os.getenv('AWS_SECRET_KEY')
-BUCKET_NAME = os.getenv('BUCKET_NAME')
-FILE_PREFIX = os.getenv('FILE_PREFIX')
-S3_MODEL_PATH = os.getenv('S3_MODEL_PATH')
-
-# Set up the S3 client
-s3_client = boto3.client(
-    's3',
-    aws_access_key_id=AWS_ACCESS_KEY,
-    aws_secret_access_key=AWS_SECRET_KEY
-)
-
-# Helper functions
-def get_latest_file():
-    response = s3_client.list_objects_v2(Bucket=BUCKET_NAME, Prefix=FILE_PREFIX)
-    files = [obj['Key'] for obj in response.get('Contents', []) if obj['Key'].endswith('.parquet')]
-    date_pattern = re.compile(r'jobdata_(\d{8})\.parquet')
-    files_with_dates = [(f, date_pattern.search(f).group(1)) for f in files if date_pattern.search(f)]
-    latest_file = max(files_with_dates, key=lambda x: x[1])[0]
-    return latest_file
-
-def load_data():
-    latest_file_key = get_latest_file()
-    obj = s3_client.get_object(Bucket=BUCKET_NAME, Key=latest_file_key)
-    data = pd.read_parquet(BytesIO(obj['Body'].read()))
-    return data
-
-
-# Function to load model from S3
-def load_model_from_s3():
-    try:
-        # Download the model file from S3
-        response = s3_client.get_object(Bucket=BUCKET_NAME, Key=S3_MODEL_PATH)
-        model_data = response['Body'].read()
-        
-        # Load the model using joblib
-        model = joblib.load(BytesIO(model_data))
-        return model
-    except Exception as e:
-        print(f"Error loading model from S3: {e}")
-        return None
 
 
 # Load the model in your Streamlit app
 pipeline = load_model_from_s3()
-data = load_data()
+data = load_data(columns=['job_category', 'experience', 'avg_salary', 'extracted_date'])
 # if pipeline:
 #     print("Model loaded successfully")
     
-max_extracted_date = data['extracted_date'].max()
+max_extracted_date = data['extracted_date'].max().date()
 
 st.set_page_config(page_title="YourFirstDataJob", page_icon="🎯",layout="wide")
 st.sidebar.image(image_logo)
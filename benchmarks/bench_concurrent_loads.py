@@ -0,0 +1,128 @@
+"""N simultaneous cold loads must cost exactly one fetch.
+
+Starts N threads behind a barrier, all calling ``load_data()`` (and the model
+load) on a cold process, and counts the storage calls that were actually
+made. Exits non-zero if any of them ran more than once. Runs against an
+in-process moto S3 (``pip install moto``) or, with ``--storage local``, a
+temporary folder of jobdata files.
+
+    python benchmarks/bench_concurrent_loads.py --threads 64
+    python benchmarks/bench_concurrent_loads.py --threads 64 --storage local
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import synthetic
+
+BUCKET = 'jobdata-bench'
+SNAPSHOT_KEY = 'data/jobdata_20250101.parquet'
+MODEL_KEY = 'models/model.joblib'
+
+
+def _put_s3(objects):
+    import boto3
+    from moto import mock_aws
+
+    mock = mock_aws()
+    mock.start()
+    client = boto3.client('s3')
+    client.create_bucket(Bucket=BUCKET)
+    for key, body in objects.items():
+        client.put_object(Bucket=BUCKET, Key=key, Body=body)
+    return mock.stop
+
+
+def _put_local(root, objects):
+    for key, body in objects.items():
+        path = os.path.join(root, *key.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(body)
+    return lambda: None
+
+
+def _count_calls(storage, calls):
+    for name in ('list', 'head', 'get', 'get_range'):
+        method = getattr(storage, name)
+
+        def counted(*args, _name=name, _method=method, **kwargs):
+            calls.update([_name])
+            return _method(*args, **kwargs)
+
+        setattr(storage, name, counted)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--storage', choices=['s3', 'local'], default='s3')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='jobdata-bench-')
+    os.environ.update({
+        'AWS_ACCESS_KEY_ID': 'bench', 'AWS_SECRET_ACCESS_KEY': 'bench', 'AWS_DEFAULT_REGION': 'us-east-1',
+        'BUCKET_NAME': BUCKET, 'FILE_PREFIX': 'data/', 'S3_MODEL_PATH': MODEL_KEY,
+        'JOBDATA_STORAGE': args.storage, 'JOBDATA_LOCAL_DIR': os.path.join(tmp, 'bucket'),
+        'JOBDATA_CACHE_DIR': os.path.join(tmp, 'cache'),
+    })
+
+    import joblib
+
+    snapshot, model = io.BytesIO(), io.BytesIO()
+    synthetic.make_jobdata(args.rows).to_parquet(snapshot)
+    joblib.dump({'kind': 'stand-in model'}, model)
+    objects = {SNAPSHOT_KEY: snapshot.getvalue(), MODEL_KEY: model.getvalue()}
+    if args.storage == 's3':
+        teardown = _put_s3(objects)
+    else:
+        teardown = _put_local(os.environ['JOBDATA_LOCAL_DIR'], objects)
+
+    from jobdata import load_data, load_model_from_s3
+    from jobdata.storage import get_storage
+
+    calls = Counter()
+    _count_calls(get_storage(), calls)
+
+    barrier = threading.Barrier(args.threads)
+    errors = []
+
+    def worker(i):
+        barrier.wait()
+        try:
+            # Half the sessions ask for the full frame, half for a projection
+            load_data() if i % 2 else load_data(columns=['extracted_date'])
+            load_model_from_s3()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    start = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        stack.callback(teardown)
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    elapsed = time.perf_counter() - start
+
+    expected = {'list': 1, 'head': 1, 'get': 2}  # snapshot + model
+    print(f"{args.threads} concurrent callers on {args.storage} storage, {elapsed:.2f}s")
+    for name, count in expected.items():
+        print(f"  {name:<6}{calls[name]:>4} call(s), expected {count}")
+    if errors:
+        print(f"  {len(errors)} caller(s) failed: {errors[0]!r}")
+    if errors or dict(calls) != expected:
+        sys.exit(1)
+    print("OK: each fetch ran exactly once")
+
+
+if __name__ == '__main__':
+    main()
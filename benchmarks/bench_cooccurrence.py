@@ -0,0 +1,76 @@
+"""Skill correlations: DataFrame ``.corr()`` vs bit-packed co-occurrence counts.
+
+Builds a synthetic snapshot (with a few skills made to go together, so there
+are strong pairs to find), then computes the top-k correlation matrix and its
+strong pairs the way analysis_data_stack.py used to and through
+``jobdata.cooccurrence``. Checks the matrices agree to 1e-12 and the pairs are
+identical, and that extending the counts of the first half of the rows with
+the second half gives the counts of the whole.
+
+    python benchmarks/bench_cooccurrence.py --rows 100000 1000000
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import synthetic
+
+TOP_K = [20, 63]
+
+
+def _frame(n_rows):
+    # A few skills made to go together, so there are strong pairs to find
+    data = synthetic.make_jobdata(n_rows)
+    rng = np.random.default_rng(1)
+    for source, target, rate in [('spark', 'pyspark', 0.8), ('azure', 'synapse', 0.6), ('dbt', 'snowflake', 0.5)]:
+        copy = rng.random(n_rows) < rate
+        data.loc[copy, target] = data.loc[copy, source]
+    return synthetic.read_jobdata(n_rows, data=data)
+
+
+def _dataframe_corr(data, top_skills):
+    # What the page computed on every rerun
+    correlation_data = data[[*top_skills, 'job_category']].copy()
+    correlation_data['job_category'] = pd.factorize(correlation_data['job_category'])[0]
+    correlation_matrix = correlation_data.corr().loc[top_skills, top_skills]
+    pairs = correlation_matrix.stack().reset_index()
+    pairs.columns = ['Skill 1', 'Skill 2', 'Correlation']
+    pairs = pairs[(pairs['Correlation'] > 0.4) | (pairs['Correlation'] < -0.5)]
+    pairs = pairs[pairs['Skill 1'] != pairs['Skill 2']]
+    pairs = pairs[pairs['Skill 1'] < pairs['Skill 2']]
+    return correlation_matrix, pairs.reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    from jobdata import cooccurrence
+
+    for n_rows in args.rows:
+        data = _frame(n_rows)
+        build_time, counts = synthetic.best(lambda: cooccurrence.build(data), args.repeat)
+        half = n_rows // 2
+        extended = cooccurrence.build(data.iloc[:half]).extend(data.iloc[half:])
+        assert (extended.counts == counts.counts).all() and extended.n_rows == counts.n_rows
+        print(f"{n_rows:,} rows: 63x63 counts in {build_time * 1000:.2f} ms, once per snapshot")
+
+        for top_k in TOP_K:
+            top_skills = counts.skill_counts().sort_values(ascending=False).head(top_k).index.tolist()
+            corr_time, (expected_matrix, expected_pairs) = synthetic.best(
+                lambda: _dataframe_corr(data, top_skills), args.repeat
+            )
+            query_time, (matrix, pairs) = synthetic.best(
+                lambda: (counts.phi(top_skills), counts.strong_pairs(top_skills, above=0.4, below=-0.5)), args.repeat
+            )
+            assert np.allclose(matrix.to_numpy(), expected_matrix.to_numpy(), atol=1e-12, equal_nan=True)
+            pd.testing.assert_frame_equal(pairs, expected_pairs, check_exact=False, rtol=1e-12)
+            print(f"  top {top_k} skills, {len(pairs)} strong pairs: DataFrame .corr() {corr_time * 1000:8.2f} ms   "
+                  f"phi {query_time * 1000:5.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Peak memory of the old and new snapshot download paths.
+
+The old path reads the whole S3 body into ``bytes``, wraps it in ``BytesIO``
+and decodes it. The new path streams the body to a local file in chunks and
+decodes from a memory map. Each path runs in a fresh interpreter and reports
+its peak RSS, so the numbers are not polluted by the other run.
+
+    python benchmarks/bench_download_memory.py --rows 2000000
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+import pandas as pd
+from botocore.response import StreamingBody
+
+import synthetic  # noqa: F401  (puts app/ on sys.path)
+from jobdata import download
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _body(path):
+    # Same object boto3 hands back as obj['Body']
+    return StreamingBody(open(path, 'rb'), os.path.getsize(path))
+
+
+def run_old(path):
+    data = pd.read_parquet(BytesIO(_body(path).read()))
+    return data
+
+
+def run_new(path):
+    with tempfile.TemporaryDirectory() as tmp:
+        local = os.path.join(tmp, 'jobdata.parquet')
+        with open(local, 'wb') as f:
+            download.stream_to_file(_body(path), f)
+        data = pd.read_parquet(local, memory_map=True)
+    return data
+
+
+def child(mode, path):
+    before = _peak_rss_mb()
+    start = time.perf_counter()
+    data = run_old(path) if mode == 'old' else run_new(path)
+    elapsed = time.perf_counter() - start
+    frame_mb = data.memory_usage(deep=True).sum() / 1024 ** 2
+    print(f"{mode}\t{before:.0f}\t{_peak_rss_mb():.0f}\t{frame_mb:.0f}\t{elapsed:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--file', help='existing jobdata parquet to use instead of a synthetic one')
+    parser.add_argument('--child', choices=['old', 'new', 'generate'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child == 'generate':
+        synthetic.write_jobdata(args.file, args.rows)
+        return
+    if args.child:
+        child(args.child, args.file)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file
+        if not path:
+            # Generated in its own interpreter: Linux carries the peak RSS of a
+            # parent over to the children it starts, which would skew the runs
+            path = os.path.join(tmp, 'jobdata_synthetic.parquet')
+            subprocess.run(
+                [sys.executable, __file__, '--child', 'generate', '--file', path, '--rows', str(args.rows)],
+                check=True
+            )
+        file_mb = os.path.getsize(path) / 1024 ** 2
+        print(f"file: {path} ({file_mb:.0f} MB)")
+        print(f"{'path':<6}{'baseline MB':>14}{'peak RSS MB':>14}{'load delta MB':>16}{'frame MB':>11}{'seconds':>10}")
+        for mode in ('old', 'new'):
+            out = subprocess.run(
+                [sys.executable, __file__, '--child', mode, '--file', path],
+                check=True, capture_output=True, text=True
+            ).stdout.strip().splitlines()[-1]
+            _, before, peak, frame, elapsed = out.split('\t')
+            delta = float(peak) - float(before)
+            print(f"{mode:<6}{before:>14}{peak:>14}{delta:>16.0f}{frame:>11}{elapsed:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Memory and groupby speed of the compacted snapshot dtypes.
+
+Prepares a synthetic snapshot the way ``jobdata.loader`` does, prints the
+per-column report of ``preprocess.compact`` and times the value_counts /
+groupby calls the pages make, before and after compaction.
+
+    python benchmarks/bench_dtypes.py --rows 1000000
+"""
+import argparse
+
+import synthetic
+
+
+def _queries(data):
+    return [
+        ('value_counts(job_category)', lambda: data['job_category'].value_counts()),
+        ('value_counts(company_field)', lambda: data['company_field'].value_counts()),
+        ('groupby(job_category).avg_salary.mean', lambda: data.groupby('job_category', observed=True)['avg_salary'].mean()),
+        ('groupby(job_category).experience_years.mean',
+         lambda: data.groupby('job_category', observed=True)['experience_years'].mean()),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    from jobdata import preprocess
+
+    # Skill flags are already uint8 by the time compact runs; leave them out
+    data = synthetic.make_jobdata(args.rows).drop(columns=synthetic.SKILLS_COLUMNS)
+    data = preprocess.prepare(data)
+    wide = data.copy()
+    before = [synthetic.best(fn, args.repeat)[0] for _, fn in _queries(wide)]
+
+    report = preprocess.compact(data)
+    after = [synthetic.best(fn, args.repeat)[0] for _, fn in _queries(data)]
+
+    mib = 1024 ** 2
+    print(f"{args.rows:,} rows")
+    print((report / mib).round(2).rename(columns=lambda c: f'{c} MiB').to_string())
+    total_before = wide.memory_usage(index=False, deep=True).sum()
+    total_after = data.memory_usage(index=False, deep=True).sum()
+    print(f"frame: {total_before / mib:.1f} MiB -> {total_after / mib:.1f} MiB "
+          f"(x{total_before / total_after:.1f})")
+    for (label, _), b, a in zip(_queries(data), before, after):
+        print(f"  {label:46} {b * 1000:8.2f} ms -> {a * 1000:7.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
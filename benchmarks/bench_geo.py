@@ -0,0 +1,119 @@
+"""Job locations map: grouping the rows by coordinates vs the grid pyramid.
+
+Builds a synthetic snapshot, then answers random market page filters both the
+way the map used to (group the filtered rows by latitude and longitude) and
+through ``GeoPyramid.query`` at the map's zoom. Checks every posting is
+counted once and at its place (the markers' job-weighted positions sum to the
+postings' coordinates), and reports the number of markers and the JSON
+payload of each. The density mode (``HexBins`` at the same zoom, with its
+GeoJSON outlines) must count every posting once too. Exits non-zero on a
+mismatch.
+
+    python benchmarks/bench_geo.py --rows 100000 1000000
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+import synthetic
+
+MAP_ZOOM = 5
+
+
+def _filters(data, pyramid, n, rng):
+    steps = list(range(0, pyramid.salary_top + 1, 5000)) + [pyramid.salary_top]
+    for _ in range(n):
+        pick = lambda values: None if rng.random() < 0.4 else values[rng.integers(len(values))]
+        low, high = sorted(rng.choice(steps, 2))
+        salary_range = None if rng.random() < 0.3 else (int(low), int(high))
+        yield (pick(data['job_category'].unique().tolist()), pick(data['year'].unique().tolist()),
+               pick(data['month'].unique().tolist()), salary_range)
+
+
+def _row_counts(data, category, year, month, salary_range):
+    # What the market page computed on every widget change
+    filtered = data
+    if category is not None:
+        filtered = filtered[filtered['job_category'] == category]
+    if year is not None:
+        filtered = filtered[filtered['year'] == year]
+    if month is not None:
+        filtered = filtered[filtered['month'] == month]
+    if salary_range is not None:
+        filtered = filtered[(filtered['avg_salary'] >= salary_range[0]) & (filtered['avg_salary'] <= salary_range[1])]
+    return filtered.groupby(['latitude', 'longitude']).size().reset_index(name='job_count')
+
+
+def _payload(markers):
+    return len(json.dumps({name: markers[name].tolist() for name in ('latitude', 'longitude', 'job_count')}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+
+    from jobdata import geo
+
+    failures = 0
+    for n_rows in args.rows:
+        data = synthetic.read_jobdata(n_rows, columns=synthetic.MARKET_COLUMNS)
+
+        start = time.perf_counter()
+        pyramid = geo.build(data)
+        build_time = time.perf_counter() - start
+        print(f"{n_rows:,} rows: pyramid built in {build_time * 1000:.0f} ms, {pyramid.nbytes / 1024 ** 2:.1f} MiB")
+        start = time.perf_counter()
+        hexbins = geo.build_hexbins(data, MAP_ZOOM)
+        build_time = time.perf_counter() - start
+        print(f"  hexagons at zoom {MAP_ZOOM} binned in {build_time * 1000:.0f} ms, {hexbins.nbytes / 1024 ** 2:.1f} MiB")
+
+        rows_time = pyramid_time = rows_payload = pyramid_payload = rows_markers = pyramid_markers = 0
+        hex_time = hex_payload = hex_count = 0
+        for filters in _filters(data, pyramid, args.queries, np.random.default_rng(n_rows)):
+            start = time.perf_counter()
+            expected = _row_counts(data, *filters)
+            rows_time += time.perf_counter() - start
+            start = time.perf_counter()
+            markers = pyramid.query(MAP_ZOOM, *filters)
+            pyramid_time += time.perf_counter() - start
+
+            rows_markers, pyramid_markers = rows_markers + len(expected), pyramid_markers + len(markers)
+            rows_payload, pyramid_payload = rows_payload + _payload(expected), pyramid_payload + _payload(markers)
+            weights = expected['job_count'].to_numpy(np.float64)
+            same = markers['job_count'].sum() == weights.sum() and all(
+                np.isclose((markers[name] * markers['job_count']).sum(), (expected[name] * weights).sum())
+                for name in ('latitude', 'longitude')
+            )
+            if not same:
+                failures += 1
+                print(f"  MISMATCH for {filters}: {markers['job_count'].sum()} != {weights.sum()} postings")
+
+            start = time.perf_counter()
+            hexagons = hexbins.query(*filters)
+            outlines = hexbins.geojson(hexagons)
+            hex_time += time.perf_counter() - start
+            hex_count += len(hexagons)
+            hex_payload += _payload(hexagons) + len(json.dumps(outlines))
+            if hexagons['job_count'].sum() != weights.sum():
+                failures += 1
+                print(f"  MISMATCH for {filters}: {hexagons['job_count'].sum()} != {weights.sum()} postings in hexagons")
+
+        print(f"  per query: rows {rows_time / args.queries * 1000:8.2f} ms, {rows_markers / args.queries:8.0f} markers, "
+              f"{rows_payload / args.queries / 1024:7.1f} KiB")
+        print(f"          pyramid {pyramid_time / args.queries * 1000:8.2f} ms, "
+              f"{pyramid_markers / args.queries:8.0f} markers, {pyramid_payload / args.queries / 1024:7.1f} KiB")
+        print(f"         hexagons {hex_time / args.queries * 1000:8.2f} ms, "
+              f"{hex_count / args.queries:8.0f} hexagons, {hex_payload / args.queries / 1024:7.1f} KiB")
+        print("  markers per zoom, no filter: " + ", ".join(
+            f"{zoom}: {len(pyramid.query(zoom))}" for zoom in range(geo.MIN_ZOOM, geo.MAX_ZOOM + 1)
+        ))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
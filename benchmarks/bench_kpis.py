@@ -0,0 +1,110 @@
+"""Market page KPIs: re-filtering the rows vs the pre-aggregated KpiStore.
+
+Reads a synthetic snapshot through ``jobdata.loader.read_frame``, then answers
+random filter combinations (category, year, month, salary slider) both the
+way the market page used to, on the rows, and through ``KpiStore.query``.
+Counts, min/max and contract shares must be identical and means equal to
+float32 precision; the script exits non-zero otherwise.
+
+    python benchmarks/bench_kpis.py --rows 100000 1000000
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import synthetic
+
+
+def _row_kpis(data, category, year, month, salary_range):
+    # What market_data.py computed on every widget change
+    filtered = data.copy()
+    if category is not None:
+        filtered = filtered[filtered['job_category'] == category]
+    if year is not None:
+        filtered = filtered[filtered['year'] == year]
+    if month is not None:
+        filtered = filtered[filtered['month'] == month]
+    if salary_range is not None:
+        filtered = filtered[(filtered['avg_salary'] >= salary_range[0]) & (filtered['avg_salary'] <= salary_range[1])]
+
+    experience = filtered[filtered['experience'] > 0]['experience']
+    contract_counts = filtered['contract_type'].value_counts().loc[lambda counts: counts > 0]
+    salary = filtered[(filtered['avg_salary'] < 300000) & (filtered['avg_salary'] > 0)]['avg_salary']
+    has_salary = not salary.isnull().all()
+    return {
+        'jobs': len(filtered),
+        'average_experience': experience.mean() if not experience.isnull().all() else 0,
+        'average_salary': salary.mean() if has_salary else 0,
+        'min_salary': salary.min() if has_salary else 0,
+        'max_salary': salary.max() if has_salary else 0,
+        'contract_share': contract_counts.max() / contract_counts.sum() if contract_counts.sum() > 0 else 0,
+    }
+
+
+def _store_kpis(store, category, year, month, salary_range):
+    kpis = store.query(job_category=category, year=year, month=month, salary_range=salary_range)
+    contract_counts = kpis.pop('contract_counts')
+    kpis['contract_share'] = contract_counts.max() / contract_counts.sum() if contract_counts.sum() > 0 else 0
+    return kpis
+
+
+def _filters(store, n, rng):
+    steps = list(range(0, store.salary_top + 1, 5000)) + [store.salary_top]
+    for _ in range(n):
+        pick = lambda values: None if rng.random() < 0.4 else values[rng.integers(len(values))]
+        low, high = sorted(rng.choice(steps, 2))
+        salary_range = None if rng.random() < 0.3 else (int(low), int(high))
+        yield (pick(store.options('job_category')), pick(store.options('year')),
+               pick(store.options('month')), salary_range)
+
+
+def _same(expected, result):
+    for name, value in expected.items():
+        if name in ('average_experience', 'average_salary'):
+            if not np.isclose(value, result[name], rtol=1e-6):
+                return name
+        elif value != result[name]:
+            return name
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    from jobdata import kpis
+
+    failures = 0
+    for n_rows in args.rows:
+        data = synthetic.read_jobdata(n_rows, columns=synthetic.MARKET_COLUMNS)
+
+        start = time.perf_counter()
+        store = kpis.build(data)
+        build_time = time.perf_counter() - start
+
+        rows_time = store_time = 0
+        for filters in _filters(store, args.queries, np.random.default_rng(n_rows)):
+            start = time.perf_counter()
+            expected = _row_kpis(data, *filters)
+            rows_time += time.perf_counter() - start
+            start = time.perf_counter()
+            result = _store_kpis(store, *filters)
+            store_time += time.perf_counter() - start
+            mismatch = _same(expected, result)
+            if mismatch:
+                failures += 1
+                print(f"  MISMATCH {mismatch} for {filters}: {expected[mismatch]} != {result[mismatch]}")
+
+        print(f"{n_rows:,} rows: store built in {build_time * 1000:.0f} ms, "
+              f"{store.sums.nbytes / 1024 ** 2:.1f} MiB")
+        print(f"  per query: rows {rows_time / args.queries * 1000:8.2f} ms   "
+              f"store {store_time / args.queries * 1000:6.3f} ms")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Throughput of single-stream vs parallel ranged snapshot downloads.
+
+Runs against any S3 endpoint given with --endpoint-url, or starts a local moto
+server (``pip install "moto[server]"``) in a separate process so the numbers
+are repeatable without AWS:
+
+    python benchmarks/bench_ranged_download.py --size-mb 64 --concurrency 1 4 8 16
+
+moto serves a ranged GET by slicing the whole stored object, and loopback has
+no per-connection bandwidth limit, so on a local server parallel ranges mostly
+show their overhead. --per-connection-mbps emulates the per-connection cap
+that makes parallel ranges pay off against real S3, by pacing every response
+body read to that rate.
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import synthetic  # noqa: F401  (puts app/ on sys.path)
+
+BUCKET = 'jobdata-bench'
+KEY = 'bench/jobdata_20250101.parquet'
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _start_moto():
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'moto.server', '-p', str(port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f'http://127.0.0.1:{port}'
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            return server, url
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("moto server did not start")
+
+
+def _throttle_bodies(mb_per_second):
+    from botocore.response import StreamingBody
+
+    read = StreamingBody.read
+
+    def paced_read(self, amt=None):
+        start = time.perf_counter()
+        chunk = read(self, amt)
+        budget = len(chunk) / (mb_per_second * 1024 ** 2)
+        time.sleep(max(0.0, budget - (time.perf_counter() - start)))
+        return chunk
+
+    StreamingBody.read = paced_read
+
+
+def _timed(label, size, run):
+    with tempfile.TemporaryFile() as f:
+        start = time.perf_counter()
+        written = run(f)
+        elapsed = time.perf_counter() - start
+    assert written == size, (label, written, size)
+    print(f"{label:<34}{elapsed:>9.2f}{size / elapsed / 1024 ** 2:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--endpoint-url', help='S3 endpoint; a local moto server is started when omitted')
+    parser.add_argument('--size-mb', type=int, default=64)
+    parser.add_argument('--part-mb', type=int, nargs='+', default=[8, 16])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8, 16])
+    parser.add_argument('--per-connection-mbps', type=float, help='emulated bandwidth cap per connection, in MB/s')
+    args = parser.parse_args()
+
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'bench')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'bench')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+    server = None
+    endpoint_url = args.endpoint_url
+    if not endpoint_url:
+        server, endpoint_url = _start_moto()
+
+    import boto3
+    from botocore.config import Config
+    from jobdata import download
+    from jobdata.storage import S3Storage
+
+    try:
+        client = boto3.client(
+            's3', endpoint_url=endpoint_url,
+            config=Config(max_pool_connections=max(args.concurrency) + 2)
+        )
+        client.create_bucket(Bucket=BUCKET)
+        size = args.size_mb * 1024 ** 2
+        client.put_object(Bucket=BUCKET, Key=KEY, Body=os.urandom(size))
+        etag = client.head_object(Bucket=BUCKET, Key=KEY)['ETag']
+        if args.per_connection_mbps:
+            _throttle_bodies(args.per_connection_mbps)
+
+        cap = f", {args.per_connection_mbps:g} MB/s per connection" if args.per_connection_mbps else ""
+        print(f"object: {args.size_mb} MB at {endpoint_url}{cap}")
+        print(f"{'mode':<34}{'seconds':>9}{'MB/s':>12}")
+        storage = S3Storage(client, BUCKET)
+        _timed('single stream', size, lambda f: download.stream_to_file(storage.get(KEY), f))
+        for part_mb in args.part_mb:
+            for concurrency in args.concurrency:
+                _timed(f'ranged part={part_mb}MB threads={concurrency}', size, lambda f: download.download_ranges(
+                    storage, KEY, f, size, etag, part_size=part_mb * 1024 ** 2, concurrency=concurrency))
+    finally:
+        if server:
+            server.kill()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Time series charts: grouping the cube's daily rows vs the materialized rollups.
+
+Builds a synthetic snapshot and its cube, then answers random time series
+queries (a series family, a grain of ``rollups.GRAINS``, a date range that
+may cut periods in part, filters on the family's other dimensions) both the way the
+pages used to, a ``pd.Grouper`` over the cube's daily rows, and through
+``Rollup.query``. The counts must be identical; the script exits non-zero
+otherwise.
+
+    python benchmarks/bench_rollups.py --rows 100000 1000000
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import synthetic
+
+
+def _queries(rollups, n, rng):
+    for _ in range(n):
+        name = rng.choice(list(rollups))
+        rollup = rollups[name]
+        grain = rng.choice(['day', 'week', 'month'])
+        filters = []
+        if rng.random() < 0.7:
+            low, high = sorted(rng.integers(0, len(rollup.days), 2))
+            filters.append((rollup.date, rng.choice(['>=', '>']), rollup.days[low]))
+            if rng.random() < 0.5:
+                filters.append((rollup.date, rng.choice(['<=', '<']), rollup.days[high] + pd.Timedelta(hours=12)))
+        for dimension in rollup.combinations.columns:
+            if rng.random() < 0.5:
+                values = rollup.combinations[dimension].dropna().unique().tolist()
+                filters.append((dimension, '==', values[rng.integers(len(values))]))
+        columns = None if rng.random() < 0.5 else rng.choice(rollup.series, 3, replace=False).tolist()
+        yield name, str(grain), filters, columns
+
+
+def _grouped(cube, name, grain, filters, columns, all_series):
+    # What the pages computed on every rerun
+    from jobdata import rollups
+
+    aggregate, date, series = rollups.FAMILIES[name]
+    if columns is not None:
+        filters = filters + [(series, 'in', columns)]
+    daily = cube.query(aggregate, by=[date, series], filters=filters)['jobs']
+    if daily.empty:
+        return None
+    # Series without postings in range are zero columns, as in Rollup.query
+    daily = daily.unstack(series, fill_value=0).reindex(columns=columns or all_series, fill_value=0)
+    daily.columns.name = None
+    return daily.groupby(pd.Grouper(freq=rollups.GRAINS[grain])).sum()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    from jobdata import cube, rollups
+
+    failures = 0
+    for n_rows in args.rows:
+        data = synthetic.read_jobdata(n_rows)
+        data_cube = cube.build(data)
+
+        start = time.perf_counter()
+        data_rollups = rollups.build(data_cube)
+        build_time = time.perf_counter() - start
+        size = sum(rollup.nbytes for rollup in data_rollups.values())
+        print(f"{n_rows:,} rows: rollups built in {build_time * 1000:.0f} ms, {size / 1024 ** 2:.1f} MiB")
+
+        grouped_time = rollup_time = 0
+        for name, grain, filters, columns in _queries(data_rollups, args.queries, np.random.default_rng(n_rows)):
+            start = time.perf_counter()
+            expected = _grouped(data_cube, name, grain, filters, columns, data_rollups[name].series)
+            grouped_time += time.perf_counter() - start
+            start = time.perf_counter()
+            result = data_rollups[name].query(grain, filters=filters, columns=columns)
+            rollup_time += time.perf_counter() - start
+
+            if expected is None:
+                same = result.empty
+            else:
+                same = (result.index.equals(expected.index) and list(result.columns) == list(expected.columns)
+                        and np.array_equal(result.to_numpy(), expected.to_numpy()))
+            if not same:
+                failures += 1
+                print(f"  MISMATCH for {name} by {grain} with {filters}")
+
+        print(f"  per query: grouped {grouped_time / args.queries * 1000:8.2f} ms   "
+              f"rollups {rollup_time / args.queries * 1000:6.2f} ms")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Per-page boto3 clients vs the shared, tuned client.
+
+Replays a number of page runs against a local moto server (or
+--endpoint-url). Each run lists the prefix and revalidates the snapshot with
+a HeadObject, as a page rerun does. The "per page" mode builds a new
+boto3.client for each run, as every page used to at import. The "shared"
+mode uses ``jobdata.s3.get_s3_client()``. It reports the time per run, the
+per-operation latency and how many HTTP connections were opened.
+
+    python benchmarks/bench_s3_client.py --runs 200
+"""
+import argparse
+import os
+import time
+
+import synthetic  # noqa: F401  (puts app/ on sys.path)
+from bench_ranged_download import _start_moto
+
+BUCKET = 'jobdata-bench'
+KEY = 'data/jobdata_20250101.parquet'
+
+
+def _page_run(client):
+    client.list_objects_v2(Bucket=BUCKET, Prefix='data/')
+    client.head_object(Bucket=BUCKET, Key=KEY)
+
+
+def _report(label, runs, elapsed, metrics):
+    print(f"{label}: {elapsed / runs * 1000:.1f} ms per page run, "
+          f"{metrics['connections_opened']} connections opened, "
+          f"reuse {metrics['connection_reuse']:.0%}")
+    for name, stats in sorted(metrics['calls'].items()):
+        print(f"    {name:<14}{stats['count']:>6} calls  avg {stats['avg_ms']:6.2f} ms  max {stats['max_ms']:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--endpoint-url', help='S3 endpoint; a local moto server is started when omitted')
+    parser.add_argument('--runs', type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'bench')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'bench')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+    server = None
+    if not args.endpoint_url:
+        server, args.endpoint_url = _start_moto()
+    # The shared client picks the endpoint up from the environment
+    os.environ['AWS_ENDPOINT_URL'] = args.endpoint_url
+
+    import boto3
+    from jobdata import s3
+
+    try:
+        setup = boto3.client('s3')
+        setup.create_bucket(Bucket=BUCKET)
+        setup.put_object(Bucket=BUCKET, Key=KEY, Body=b'PAR1')
+
+        s3.reset_metrics()
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            client = boto3.client('s3')
+            s3.instrument(client)
+            _page_run(client)
+        _report('per page client', args.runs, time.perf_counter() - start, s3.metrics())
+
+        s3.reset_metrics()
+        start = time.perf_counter()
+        client = s3.get_s3_client()
+        s3.instrument(client)
+        for _ in range(args.runs):
+            _page_run(client)
+        _report('shared client  ', args.runs, time.perf_counter() - start, s3.metrics())
+    finally:
+        if server:
+            server.kill()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Salary percentiles: rescanning the rows vs merging per-day KLL sketches.
+
+Builds a synthetic snapshot, sketches it with ``jobdata.sketches``, then
+answers random selections (some job categories, experience values and a run
+of days) both on the rows and by merging cell sketches. Counts, means, min and
+max must match the rows and the quartiles must be within ``--max-error`` of
+their rank (as a fraction of the count). Also checks that, with a capacity
+large enough that nothing is compacted, the sketches give the exact box
+statistics of ``jobdata.boxes`` (over every day and over the last month, as
+the statistics page asks for them), and that sketching two halves of the days
+and adding them stays within the error bound. Exits non-zero on a failure.
+
+    python benchmarks/bench_sketches.py --rows 100000 1000000
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import synthetic
+
+QUANTILES = [0.25, 0.5, 0.75]
+
+# The projection the statistics page sketches
+COLUMNS = ['job_category', 'experience', 'experience_bool', 'avg_salary', 'max_salary', 'date_creation',
+           'extracted_date']
+
+
+def _selections(data, n, rng):
+    categories = data['job_category'].unique().tolist()
+    days = np.sort(data['effective_date'].dt.normalize().dropna().unique())
+    for _ in range(n):
+        chosen = None if rng.random() < 0.3 else rng.choice(categories, rng.integers(1, 4), replace=False).tolist()
+        experience = None if rng.random() < 0.5 else list(range(int(rng.integers(0, 6)), 12))
+        length = int(rng.choice([1, 7, 30, 365]))
+        start = int(rng.integers(0, max(len(days) - length, 1)))
+        yield {'job_category': chosen, 'experience_years': experience, 'days': days[start:start + length]}
+
+
+def _row_values(data, selection):
+    # What a page would have to do: filter every row, then sort
+    rows = data[data['salary_in_range']]
+    if selection['job_category'] is not None:
+        rows = rows[rows['job_category'].isin(selection['job_category'])]
+    if selection['experience_years'] is not None:
+        rows = rows[rows['experience_years'].isin(selection['experience_years'])]
+    rows = rows[rows['effective_date'].dt.normalize().isin(selection['days'])]
+    return rows['avg_salary_rounded'].dropna().to_numpy(np.float64)
+
+
+def _rank_error(values, estimates):
+    # How far, as a fraction of the count, each estimate is from its quantile
+    # (less the one rank an interpolated quantile may lie off)
+    values = np.sort(values)
+    low = np.searchsorted(values, estimates, side='left') / len(values)
+    high = np.searchsorted(values, estimates, side='right') / len(values)
+    targets = np.asarray(QUANTILES)
+    error = np.maximum(low - targets, 0) + np.maximum(targets - high, 0)
+    return float(np.max(np.maximum(error - 1 / len(values), 0)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--max-error', type=float, default=0.02)
+    args = parser.parse_args()
+
+    from jobdata import boxes, sketches
+
+    failures = 0
+    for n_rows in args.rows:
+        data = synthetic.read_jobdata(n_rows, columns=COLUMNS)
+
+        start = time.perf_counter()
+        sketched = sketches.build(data)
+        build_time = time.perf_counter() - start
+        print(f"{n_rows:,} rows: {len(sketched.tables['salary']):,} salary cells sketched in "
+              f"{build_time * 1000:.0f} ms, {sketched.nbytes / 1024 ** 2:.1f} MiB")
+
+        # Nothing compacted: the box statistics of the statistics page
+        exact = sketches.build(data, k=n_rows)
+        days = data['effective_date'].dt.normalize()
+        last_day = days.max()
+        last_month = pd.date_range(last_day - pd.DateOffset(months=1), last_day, inclusive='right')
+        for period, rows in [(None, data), (last_month, data[days.isin(last_month)])]:
+            expected = boxes.build(rows)
+            for name, measure, by in [('experience_by_category', 'experience', 'job_category'),
+                                      ('salary_by_category', 'salary', 'job_category'),
+                                      ('salary_by_experience', 'salary', 'experience_years')]:
+                if name == 'salary_by_experience':
+                    result = exact.box_stats(measure, by, experience_years=expected[name].index.tolist(), days=period)
+                else:
+                    result = exact.box_stats(measure, by, days=period)
+                try:
+                    pd.testing.assert_frame_equal(result, expected[name], check_exact=False, rtol=1e-12)
+                except AssertionError as error:
+                    failures += 1
+                    print(f"  MISMATCH {name}: {error}")
+
+        # Two halves of the days, sketched apart and added
+        middle = days.quantile(0.5)
+        history = sketches.build(data[days < middle]) + sketches.build(data[~(days < middle)])
+
+        rows_time = merge_time = worst = 0
+        for selection in _selections(data, args.queries, np.random.default_rng(n_rows)):
+            start = time.perf_counter()
+            values = _row_values(data, selection)
+            np.quantile(values, QUANTILES, method='hazen') if len(values) else None
+            rows_time += time.perf_counter() - start
+            start = time.perf_counter()
+            summary = sketched.summary('salary', quantiles=QUANTILES, **selection)
+            merge_time += time.perf_counter() - start
+            if not len(values):
+                failures += summary['count'] != 0
+                continue
+            combined = history.summary('salary', quantiles=QUANTILES, **selection)
+            for result in (summary, combined):
+                error = _rank_error(values, result['quantiles'].to_numpy())
+                worst = max(worst, error)
+                same = (result['count'] == len(values) and result['min'] == values.min()
+                        and result['max'] == values.max() and np.isclose(result['mean'], values.mean(), rtol=1e-12))
+                if error > args.max_error or not same:
+                    failures += 1
+                    print(f"  MISMATCH for {len(values)} salaries: rank error {error:.4f}, "
+                          f"count {result['count']}, min {result['min']}, max {result['max']}")
+
+        print(f"  per query: rows {rows_time / args.queries * 1000:8.2f} ms   "
+              f"sketches {merge_time / args.queries * 1000:6.2f} ms   worst rank error {worst:.4f}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
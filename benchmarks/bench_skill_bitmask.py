@@ -0,0 +1,47 @@
+"""Skill queries: DataFrame ``.any(axis=1)`` vs the packed skill bitmask.
+
+Reads a synthetic snapshot through ``jobdata.loader.read_frame``, then
+times any-of / all-of / count-of queries over a handful of selected skills,
+both as the column-wise pandas reduction the pages used and through
+``jobdata.skills`` on the ``skill_bits_*`` columns. Results are checked to be
+identical.
+
+    python benchmarks/bench_skill_bitmask.py --rows 100000 1000000
+"""
+import argparse
+
+import synthetic
+
+SELECTED = ['python', 'sql', 'spark', 'aws', 'airflow']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    from jobdata import skills
+
+    for n_rows in args.rows:
+        data = synthetic.read_jobdata(n_rows)
+        queries = [
+            ('any-of', lambda: data[SELECTED].any(axis=1).to_numpy(),
+             lambda: skills.any_of(data, SELECTED)),
+            ('all-of', lambda: data[SELECTED].all(axis=1).to_numpy(),
+             lambda: skills.all_of(data, SELECTED)),
+            ('count-of', lambda: data[SELECTED].sum(axis=1).to_numpy(),
+             lambda: skills.count_of(data, SELECTED)),
+        ]
+        print(f"{n_rows:,} rows, {len(SELECTED)} selected skills")
+        for label, columns, bitmask in queries:
+            columns_time, expected = synthetic.best(columns, args.repeat)
+            bitmask_time, result = synthetic.best(bitmask, args.repeat)
+            assert (result == expected).all(), label
+            print(f"  {label:9} columns {columns_time * 1000:8.2f} ms   "
+                  f"bitmask {bitmask_time * 1000:7.2f} ms   "
+                  f"x{columns_time / bitmask_time:.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Skill-driven row selection: boolean DataFrame masks vs the inverted index.
+
+Reads a synthetic snapshot through ``jobdata.loader.read_frame`` and selects
+"postings with any of these skills, 0-2 years of experience and a salary"
+(the home page's impostor section) three ways:
+
+- ``columns``: boolean masks over the skill, experience and salary columns
+- ``bitmask``: ``skills.any_of`` on the packed ``skill_bits_*`` columns
+- ``index``: set operations on ``jobdata.skill_index.SkillIndex``
+
+The selected row positions must be identical. Also reports the index's build
+time and size.
+
+    python benchmarks/bench_skill_index.py --rows 100000 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+import synthetic
+
+QUERIES = [
+    ('1 skill', ['dbt']),
+    ('5 skills', ['python', 'sql', 'spark', 'aws', 'airflow']),
+    ('all skills', synthetic.SKILLS_COLUMNS),
+]
+EXPERIENCE = (0, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    from jobdata import skill_index, skills
+
+    low, high = EXPERIENCE
+    for n_rows in args.rows:
+        data = synthetic.read_jobdata(n_rows)
+        start = time.perf_counter()
+        index = skill_index.build(data)
+        build_time = time.perf_counter() - start
+        print(f"{n_rows:,} rows: index built in {build_time * 1000:.0f} ms, {index.nbytes / 1024 ** 2:.1f} MiB")
+
+        def in_range():
+            return (data['experience'] >= low) & (data['experience'] <= high) & (data['avg_salary'] > 0)
+
+        for label, selected in QUERIES:
+            approaches = [
+                ('columns', lambda: np.flatnonzero((data[selected].any(axis=1) & in_range()).to_numpy())),
+                ('bitmask', lambda: np.flatnonzero(skills.any_of(data, selected) & in_range().to_numpy())),
+                ('index', lambda: (index.any_of(selected) & index.experience_between(low, high)
+                                   & index.with_salary).to_array()),
+            ]
+            timings = []
+            expected = None
+            for name, fn in approaches:
+                elapsed, rows = synthetic.best(fn, args.repeat)
+                if expected is None:
+                    expected = rows
+                assert np.array_equal(rows, expected), (label, name)
+                timings.append(f"{name} {elapsed * 1000:7.2f} ms")
+            print(f"  {label:10} {len(expected):>8,} rows   " + "   ".join(timings))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Synthetic jobdata frames shaped like the daily France Travail extracts."""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+SKILLS_COLUMNS = [
+    'sql', 'python', 'pyspark', 'azure', 'aws', 'gcp', 'etl', 'airflow', 'kafka', 'spark',
+    'power_bi', 'tableau', 'snowflake', 'docker', 'kubernetes', 'git', 'data_warehouse',
+    'hadoop', 'mlops', 'data_lake', 'bigquery', 'databricks', 'dbt', 'mlflow', 'java',
+    'scala', 'sas', 'matlab', 'power_query', 'looker', 'apache', 'hive', 'terraform',
+    'jenkins', 'gitlab', 'machine_learning', 'deep_learning', 'nlp', 'api', 'pipeline',
+    'data_governance', 'erp', 'ssis', 'ssas', 'ssrs', 'ssms', 'postgre', 'mysql', 'mongodb',
+    'cloud', 'synapse', 'blobstorage', 'azure_devops', 'fabric', 'glue', 'redshift', 's3',
+    'lambda', 'emr', 'athena', 'kinesis', 'rds', 'sagemaker'
+]
+
+# The projection market_data.py reads its rows, KPIs and maps from
+MARKET_COLUMNS = [
+    'job_category', 'year', 'month', 'avg_salary', 'experience', 'experience_bool', 'contract_type',
+    'company_field', 'date_creation', 'extracted_date', 'latitude', 'longitude',
+]
+
+JOB_CATEGORIES = [
+    'Data Engineer', 'Data Analyst', 'Data Scientist', 'BI Developer', 'ML Engineer',
+    'Data Architect', 'Data Manager', 'Other'
+]
+
+
+def make_jobdata(n_rows, seed=0, start='2023-10-01', end=None):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp(start)
+    end = pd.Timestamp(end) if end else pd.Timestamp.now().normalize()
+
+    created = start + pd.to_timedelta(rng.integers(0, (end - start).days + 1, n_rows), unit='D')
+    extracted = created + pd.to_timedelta(rng.integers(0, 5, n_rows), unit='D')
+    extracted = extracted.where(extracted <= end, end)
+
+    experience = rng.integers(0, 12, n_rows).astype(float)
+    experience[rng.random(n_rows) < 0.3] = np.nan
+    min_salary = rng.normal(45000, 12000, n_rows).round(-2)
+    max_salary = min_salary + rng.integers(0, 20000, n_rows)
+    no_salary = rng.random(n_rows) < 0.4
+    min_salary[no_salary] = np.nan
+    max_salary[no_salary] = np.nan
+    max_salary[rng.random(n_rows) < 0.01] = 500000
+
+    data = pd.DataFrame({
+        'id': np.arange(n_rows).astype(str),
+        'job_category': rng.choice(JOB_CATEGORIES, n_rows),
+        'contract_type': rng.choice(['CDI', 'CDD', 'MIS', 'LIB'], n_rows, p=[0.6, 0.25, 0.1, 0.05]),
+        'company_field': rng.choice([f'field_{i}' for i in range(30)], n_rows),
+        'date_creation': created.strftime('%Y-%m-%d'),
+        'extracted_date': extracted.strftime('%Y-%m-%d'),
+        'year': created.year.astype('int64'),
+        'month': created.month.astype('int64'),
+        'latitude': rng.normal(46.5, 2, n_rows).round(2),
+        'longitude': rng.normal(2.5, 2, n_rows).round(2),
+        'experience': experience,
+        'experience_bool': np.where(np.isnan(experience), 'N', 'Y'),
+        'min_salary': min_salary,
+        'max_salary': max_salary,
+        'avg_salary': (min_salary + max_salary) / 2,
+    })
+    skill_rates = rng.random(len(SKILLS_COLUMNS)) * 0.4
+    for rate, col in zip(skill_rates, SKILLS_COLUMNS):
+        data[col] = np.where(rng.random(n_rows) < rate, 'Y', 'N')
+    return data
+
+
+def write_jobdata(path, n_rows, seed=0, row_group_size=100_000):
+    make_jobdata(n_rows, seed).to_parquet(path, row_group_size=row_group_size)
+    return path
+
+
+def read_jobdata(n_rows, seed=0, data=None, columns=None, filters=None):
+    """A synthetic snapshot (``data``, or ``make_jobdata(n_rows, seed)``) as
+    the app holds it: written to parquet and read back with
+    ``jobdata.loader.read_frame``."""
+    from jobdata.loader import read_frame
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'jobdata.parquet')
+        (make_jobdata(n_rows, seed) if data is None else data).to_parquet(path)
+        return read_frame(path, columns, filters)
+
+
+def best(fn, repeat):
+    """Fastest of ``repeat`` runs of ``fn`` in seconds, and its result."""
+    elapsed = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = min(elapsed, time.perf_counter() - start)
+    return elapsed, result
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The app imports ``jobdata`` from app/; the synthetic extracts are shared
+# with the benchmarks
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'app'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
@@ -0,0 +1,32 @@
+"""Rollups of a snapshot without dated postings answer empty series."""
+import pandas as pd
+import pytest
+
+from jobdata import rollups
+from jobdata.cube import AGGREGATES, Cube
+
+
+def _cube(**rows):
+    tables = {}
+    for name, (dimensions, measures) in AGGREGATES.items():
+        tables[name] = pd.DataFrame(rows.get(name, []), columns=dimensions + measures)
+    return Cube(tables)
+
+
+@pytest.mark.parametrize('rows', [
+    {},
+    # Postings whose dates are all missing
+    {'postings_by_day': [(2024, 'Data Engineer', pd.NaT, 3)]},
+])
+@pytest.mark.parametrize('grain', list(rollups.GRAINS))
+def test_empty_cube(rows, grain):
+    data_rollups = rollups.build(_cube(**rows))
+
+    jobs = data_rollups['jobs_by_category'].query(grain, filters=[('year', '>', 2023)])
+    assert jobs.empty
+    assert jobs.index.name == 'effective_date'
+
+    skills = data_rollups['skills'].query(grain, columns=['sql', 'python'])
+    assert skills.empty
+    assert list(skills.columns) == ['sql', 'python']
+    assert skills.index.name == 'date_creation'
@@ -0,0 +1,202 @@
+"""N simultaneous cold loads must cost exactly one fetch.
+
+Every test starts N threads behind a barrier on a cold process, against a
+folder of jobdata files served through a storage that counts its calls.
+"""
+import threading
+import time
+from collections import Counter
+
+import joblib
+import pytest
+
+import synthetic
+from jobdata import disk_cache, listing, loader
+from jobdata import storage as storage_module
+from jobdata.singleflight import SingleFlight
+
+N_THREADS = 16
+SNAPSHOT_KEY = 'data/jobdata_20250101.parquet'
+MODEL_KEY = 'models/model.joblib'
+
+
+class CountingStorage(storage_module.LocalStorage):
+    def __init__(self, root):
+        super().__init__(root)
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, name, key):
+        with self._lock:
+            self.calls[name, key] += 1
+
+    def list(self, prefix='', start_after=None):
+        self._count('list', prefix)
+        return super().list(prefix, start_after)
+
+    def head(self, key, if_none_match=None):
+        self._count('head', key)
+        return super().head(key, if_none_match)
+
+    def get(self, key, if_match=None):
+        self._count('get', key)
+        return super().get(key, if_match)
+
+    def get_range(self, key, start, end, if_match=None):
+        self._count('get_range', key)
+        return super().get_range(key, start, end, if_match)
+
+
+class LateFlight(SingleFlight):
+    """Callers after the first of each key only reach the flight once it is
+    over: the window between missing a cache and joining its flight."""
+
+    def __init__(self):
+        super().__init__()
+        self._over = {}
+        self._over_lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._over_lock:
+            first = key not in self._over
+            over = self._over.setdefault(key, threading.Event())
+        if not first:
+            over.wait()
+            return super().do(key, fn)
+        try:
+            return super().do(key, fn)
+        finally:
+            over.set()
+
+
+def _run(target, n=N_THREADS):
+    barrier = threading.Barrier(n)
+    results, errors = [None] * n, []
+
+    def worker(i):
+        barrier.wait()
+        try:
+            results[i] = target(i)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors, errors
+    return results
+
+
+def _slow(fn, counter, name, delay=0.2):
+    # Keep the first load running while the other callers check the cache
+    def wrapped(*args, **kwargs):
+        counter[name] += 1
+        time.sleep(delay)
+        return fn(*args, **kwargs)
+    return wrapped
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    bucket = tmp_path / 'bucket'
+    (bucket / 'data').mkdir(parents=True)
+    (bucket / 'models').mkdir()
+    synthetic.make_jobdata(2000).to_parquet(bucket / SNAPSHOT_KEY)
+    with open(bucket / MODEL_KEY, 'wb') as f:
+        joblib.dump({'kind': 'stand-in model'}, f)
+
+    counting = CountingStorage(bucket)
+    monkeypatch.setattr(storage_module, '_storage', counting)
+    monkeypatch.setattr(disk_cache, 'CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(disk_cache, '_flights', SingleFlight())
+    monkeypatch.setattr(disk_cache, '_validated', (None, None))
+    monkeypatch.setattr(listing, 'FILE_PREFIX', 'data/')
+    monkeypatch.setattr(listing, '_flights', SingleFlight())
+    monkeypatch.setattr(listing, '_files_by_date', {})
+    monkeypatch.setattr(listing, '_latest_date', None)
+    monkeypatch.setattr(listing, '_refreshed_at', None)
+    monkeypatch.setattr(loader, 'S3_MODEL_PATH', MODEL_KEY)
+    monkeypatch.setattr(loader, '_current', loader._new_snapshot(None))
+    monkeypatch.setattr(loader, '_flights', SingleFlight())
+    monkeypatch.setattr(loader, '_models', {})
+    monkeypatch.setattr(loader, '_serve_published', False)
+    return counting
+
+
+def test_singleflight_runs_once():
+    flights, calls = SingleFlight(), Counter()
+
+    def load():
+        calls['load'] += 1
+        time.sleep(0.2)
+        return object()
+
+    results = _run(lambda i: flights.do('key', load))
+    assert calls['load'] == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_singleflight_shares_errors():
+    flights, calls = SingleFlight(), Counter()
+
+    def load():
+        calls['load'] += 1
+        time.sleep(0.2)
+        raise OSError('boom')
+
+    def target(i):
+        with pytest.raises(OSError):
+            flights.do('key', load)
+
+    _run(target)
+    assert calls['load'] == 1
+
+
+def test_cold_loads_fetch_once(storage):
+    def target(i):
+        # Half the sessions ask for the full frame, half for a projection
+        data = loader.load_data() if i % 2 else loader.load_data(columns=['extracted_date'])
+        return data, loader.load_model_from_s3()
+
+    results = _run(target)
+    assert storage.calls == Counter({
+        ('list', 'data/'): 1, ('head', SNAPSHOT_KEY): 1, ('get', SNAPSHOT_KEY): 1, ('get', MODEL_KEY): 1,
+    })
+    assert len({id(model) for _, model in results}) == 1
+
+
+def test_late_callers_do_not_load_again(storage, monkeypatch):
+    # Every caller misses the cache, but all except the first reach the
+    # flight only after the first load was done and the flight released
+    monkeypatch.setattr(loader, '_flights', LateFlight())
+    reads = Counter()
+    monkeypatch.setattr(loader, 'read_snapshot', _slow(loader.read_snapshot, reads, 'frame'))
+    monkeypatch.setattr(loader, 'read_cube', _slow(loader.read_cube, reads, 'cube'))
+    build = _slow(lambda data: object(), reads, 'derived')
+    snapshot = loader._snapshot(listing.latest_key())
+
+    frames = _run(lambda i: loader._frame(snapshot, None, None))
+    derived = _run(lambda i: loader._derived(snapshot, 'test', None, None, build))
+    cubes = _run(lambda i: loader._cube(snapshot))
+    rollups = _run(lambda i: loader._rollups(snapshot))
+
+    assert reads == Counter({'frame': 1, 'cube': 1, 'derived': 1})
+    for results in (frames, derived, cubes, rollups):
+        assert all(result is results[0] for result in results)
+    assert storage.calls[('get', SNAPSHOT_KEY)] == 1
+
+
+def test_late_callers_do_not_revalidate(storage, monkeypatch):
+    # Readers of other projections of the snapshot reuse the copy the first
+    # one validated, even if they only reach the flight once it is over
+    monkeypatch.setattr(disk_cache, '_flights', LateFlight())
+    fetches = Counter()
+    monkeypatch.setattr(disk_cache, '_fetch', _slow(disk_cache._fetch, fetches, 'fetch'))
+
+    paths = _run(lambda i: disk_cache.fetch(SNAPSHOT_KEY))
+
+    assert fetches == Counter({'fetch': 1})
+    assert len(set(paths)) == 1
+    assert storage.calls == Counter({('head', SNAPSHOT_KEY): 1, ('get', SNAPSHOT_KEY): 1})